@@ -1,99 +1,12 @@
 import streamlit as st
-import requests
-import json
 from datetime import datetime, timedelta
-import pandas as pd
-from openai import OpenAI
-import re
-from urllib.parse import urlparse
-from serpapi import GoogleSearch
-from bs4 import BeautifulSoup
-import time
-
-# 简单的链接验证函数
-def validate_url(url):
-    """验证URL是否有效"""
-    if not url or url.strip() == "":
-        return False, "空链接"
-    
-    # 检查URL格式
-    try:
-        parsed = urlparse(url)
-        if not parsed.scheme or not parsed.netloc:
-            return False, "无效的URL格式"
-    except:
-        return False, "URL解析失败"
-    
-    # 检查是否是常见的无效链接模式
-    invalid_patterns = [
-        r'example\.com',
-        r'placeholder\.com',
-        r'test\.com',
-        r'sample\.com',
-        r'news\.cnstock\.com.*202508',  # 您提到的无效链接模式
-        r'www\.cs\.com\.cn.*202508'     # 您提到的无效链接模式
-    ]
-    
-    for pattern in invalid_patterns:
-        if re.search(pattern, url, re.IGNORECASE):
-            return False, "无效链接模式"
-    
-    return True, "链接格式有效"
-
-def process_and_validate_result(result):
-    """后处理验证API返回结果中的链接"""
-    if not result or result.startswith("❌"):
-        return result
-    
-    # 检查是否包含明显的虚假链接模式
-    fake_patterns = [
-        r'content_\d{6,}\.html?',  # content_123456.html
-        r'/\d{10,}\.html?',        # /1234567890.html
-        r'0{8,}',                  # 连续8个或更多零
-        r'content_\d+\.htm',       # content_数字.htm
-        r'/202\d{1}/\d{8,}\.html', # /2025/12345678.html
-    ]
-    
-    contains_fake_link = False
-    for pattern in fake_patterns:
-        if re.search(pattern, result):
-            contains_fake_link = True
-            break
-    
-    if contains_fake_link:
-        # 如果检测到虚假链接，替换为警告信息
-        warning_msg = """
-⚠️ 检测到可能的虚假链接，系统无法提供真实可访问的新闻链接。
-
-可能的原因：
-1. 联网搜索功能未正常工作
-2. 搜索结果中没有包含有效的新闻链接
-3. 当前时间范围内缺少相关新闻
-
-建议：
-- 尝试调整关键词或时间范围
-- 稍后重试搜索
-- 联系技术支持检查联网搜索功能
-        """
-        
-        if st.session_state.language == "en":
-            warning_msg = """
-⚠️ Detected potentially fake links. The system cannot provide real accessible news links.
-
-Possible reasons:
-1. Web search functionality not working properly
-2. Search results contain no valid news links
-3. Lack of relevant news in current time range
-
-Suggestions:
-- Try adjusting keywords or time range
-- Retry search later
-- Contact technical support to check web search functionality
-            """
-        
-        return warning_msg
-    
-    return result
+from pipeline import (
+    KEYWORDS_MAPPING, COMPANIES_MAPPING, configure_api_keys, search_baidu_news, analyze_news_with_openai,
+    extract_search_parameters, extract_search_terms_from_prompt,
+    convert_time_to_date_range, start_prefetch_scheduler, HISTORY_PAGE_SIZE, save_history_entry, count_history_entries,
+    list_history_entries, get_history_entry, start_trace, summarize_trace, get_slowest_spans, trace_to_json, trace_to_otlp
+)
+import json
 
 # 国际化配置
 LANGUAGES = {
@@ -185,78 +98,6 @@ LANGUAGES = {
     }
 }
 
-# 中英文关键词映射
-KEYWORDS_MAPPING = {
-    "en": [
-        "Lithium", "Cobalt", "Nickel", "Graphite", "Manganese", "Copper", "Aluminum", "Zinc", "Gallium", "Germanium", 
-        "Rare Earth", "Tungsten", "Titanium", "Vanadium", "Antimony", "Beryllium", "Zirconium", "Tantalum", "Niobium",
-        "Arsenic", "Barite", "Bismuth", "Cerium", "Cesium", "Chromium", "Dysprosium", "Erbium", "Europium", "Fluorite", 
-        "Gadolinium", "Hafnium", "Holmium", "Indium", "Iridium", "Lanthanum", "Lutetium", "Magnesium", "Neodymium", 
-        "Palladium", "Platinum", "Praseodymium", "Rhodium", "Rubidium", "Ruthenium", "Samarium", "Scandium", "Tellurium", 
-        "Terbium", "Thulium", "Tin", "Ytterbium", "Yttrium", "China-US Critical Minerals", "Geopolitical Competition Critical Minerals",
-        "China-Africa Critical Minerals", "EU-China-Africa Geopolitical Competition", "Belt and Road Initiative, China and Africa", 
-        "Rare Earth US, China Rare Earth", "Rare Earth China-Africa", "EU-China-Africa Critical Minerals", 
-        "Refining Africa and China Critical Minerals", "China-Congo Cobalt Industry"
-    ],
-    "zh": [
-        "锂", "钴", "镍", "石墨", "锰", "铜", "铝", "锌", "镓", "锗", "稀土", "钨", "钛", "钒", "锑", "铍", "锆", "钽", "铌",
-        "砷", "重晶石", "铋", "铈", "铯", "铬", "镝", "铒", "铕", "萤石", "钆", "铪", "钬", "铟", "铱", "镧", "镥", "镁", 
-        "钕", "钯", "铂", "镨", "铑", "铷", "钌", "钐", "钪", "碲", "铽", "铥", "锡", "镱", "钇", "中美关键矿产", "地缘政治竞争的关键矿产",
-        "中非关键矿产", "欧盟、中国、非洲地缘政治竞争", "一带一路倡议,中国和非洲", "稀土美国，中国稀土", "稀土中国-非洲，稀土中非", 
-        "欧盟-中国-非洲关键矿产", "提炼非洲和中国的关键矿产", "中国-刚果钴业"
-    ]
-}
-
-# 中英文公司映射
-COMPANIES_MAPPING = {
-    "en": {
-        "CMOC China Molybdenum / Luoyang Molybdenum Industry": "Luoyang Molybdenum Group",
-        "Zijin": "Zijin Mining Group Co., Ltd.",
-        "Chengxin Lithium (Chengxin Lithium Group / Chengxin)": "Chengdu Chengxin Lithium Industry Co., Ltd.",
-        "Tsingshan Holding group": "Tsingshan Holding Group Co., Ltd.",
-        "Huayou Cobalt": "Zhejiang Huayou Cobalt Co., Ltd.",
-        "Sinomine Resources Group": "Sinomine Resources Group Co., Ltd.",
-        "Sinohydro Corporation": "Sinohydro Corporation",
-        "Sichuan Yahua Industrial Group": "Sichuan Yahua Industrial Group Co., Ltd.",
-        "Chinalco (Aluminum Corporation of China)": "Aluminum Corporation of China Limited",
-        "China Minmetals Corporation": "China Minmetals Corporation",
-        "China Hongqiao group": "China Hongqiao Group Limited",
-        "China Non Metals Mining Group": "China Nonferrous Metal Mining Group Co., Ltd.",
-        "Jiangxi Copper Company": "Jiangxi Copper Co., Ltd.",
-        "Baiyin Nonferrous Group (BNMC)": "Baiyin Nonferrous Group Co., Ltd.",
-        "Hunan Nonferrous Metals Group": "Hunan Nonferrous Metals Holding Group Co., Ltd.",
-        "Tibet Huayu Mining": "Tibet Huayu Mining Co., Ltd.",
-        "Ganfeng Lithium": "Ganfeng Lithium Co., Ltd.",
-        "Tibet Everest Resources": "Tibet Summit Resources Co., Ltd.",
-        "BYD": "BYD Co., Ltd.",
-        "Tianqi Lithium": "Tianqi Lithium Corporation",
-        "CATL": "Contemporary Amperex Technology Co., Limited"
-    },
-    "zh": {
-        "CMOC China Molybdenum / Luoyang Molybdenum Industry": "洛钼集团",
-        "Zijin": "紫金矿业集团股份有限公司",
-        "Chengxin Lithium (Chengxin Lithium Group / Chengxin)": "成都成鑫锂业股份有限公司",
-        "Tsingshan Holding group": "青山控股集团有限公司",
-        "Huayou Cobalt": "浙江华友钴业股份有限公司",
-        "Sinomine Resources Group": "中矿资源集团股份有限公司",
-        "Sinohydro Corporation": "中国水利水电建设集团公司",
-        "Sichuan Yahua Industrial Group": "四川雅化实业集团股份有限公司 (雅化集团)",
-        "Chinalco (Aluminum Corporation of China)": "中国铝业集团有限公司 (中国铝业 / 中铝)",
-        "China Minmetals Corporation": "中国五矿集团有限公司 (五矿集团)",
-        "China Hongqiao group": "中国宏桥集团有限公司",
-        "China Non Metals Mining Group": "中国有色矿业集团有限公司",
-        "Jiangxi Copper Company": "江西铜业集团有限公司 (江西铜业)",
-        "Baiyin Nonferrous Group (BNMC)": "白银有色集团股份有限公司 (白银有色)",
-        "Hunan Nonferrous Metals Group": "湖南有色金属控股集团有限公司 (湖南有色)",
-        "Tibet Huayu Mining": "西藏华钰矿业股份有限公司 (华钰矿业)",
-        "Ganfeng Lithium": "赣丰锂业",
-        "Tibet Everest Resources": "西藏珠峰资源股份有限公司",
-        "BYD": "比亚迪股份有限公司 (比亚迪)",
-        "Tianqi Lithium": "天齐锂业股份有限公司 (天齐锂业)",
-        "CATL": "宁德时代新能源科技股份有限公司 (宁德时代)"
-    }
-}
-
 # 配置页面
 st.set_page_config(
     page_title="Critical Minerals News Analysis System",
@@ -283,67 +124,51 @@ with st.sidebar:
         st.session_state.language = selected_language[0]
         st.rerun()
     
-    # 初始化历史记录
-    if 'search_history' not in st.session_state:
-        st.session_state.search_history = []
-    
     # 历史记录管理函数
-    def add_to_history(keywords, companies, time_option, result, prompt):
-        """添加搜索结果到历史记录"""
-        current_date = datetime.now()
-        date_str = current_date.strftime('%Y-%m-%d %H:%M')
-        
-        # 构建标题
-        keywords_str = ", ".join(keywords) if keywords else ("无关键词" if st.session_state.language == "zh" else "No Keywords")
-        companies_str = ", ".join(companies) if companies else ("无公司" if st.session_state.language == "zh" else "No Companies")
-        
-        if st.session_state.language == "zh":
-            title = f"{date_str} - {keywords_str} - {companies_str}"
-        else:
-            title = f"{date_str} - {keywords_str} - {companies_str}"
-        
-        # 创建历史记录项
-        history_item = {
-            'id': len(st.session_state.search_history),
-            'title': title,
-            'date': date_str,
-            'keywords': keywords,
-            'companies': companies,
-            'time_option': time_option,
-            'result': result,
-            'prompt': prompt,
-            'language': st.session_state.language
-        }
-        
-        # 添加到历史记录开头
-        st.session_state.search_history.insert(0, history_item)
-        
-        # 保持最多10条记录
-        if len(st.session_state.search_history) > 10:
-            st.session_state.search_history = st.session_state.search_history[:10]
-    
-
+    def add_to_history(keywords, companies, time_option, result, prompt, trace=None):
+        """添加搜索结果（及执行追踪）到持久化历史记录"""
+        try:
+            save_history_entry(keywords, companies, time_option, result, prompt, st.session_state.language, trace=trace)
+        except Exception as e:
+            print(f"History write failed: {str(e)}")
     
-    # 历史记录选择器
+    # 历史记录选择器（按页懒加载，只读取标题等摘要信息）
     st.markdown("---")
     st.subheader("📚 搜索历史" if st.session_state.language == "zh" else "📚 Search History")
     
-    if st.session_state.search_history:
+    history_query = st.text_input(
+        "全文搜索历史记录" if st.session_state.language == "zh" else "Full-text search history",
+        key="history_query"
+    )
+    history_total = count_history_entries(history_query)
+    
+    if history_total:
+        page_count = (history_total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        history_page = 1
+        if page_count > 1:
+            history_page = st.number_input(
+                f"页码（共{page_count}页）" if st.session_state.language == "zh" else f"Page (of {page_count})",
+                min_value=1, max_value=page_count, value=1, step=1
+            )
+        history_entries = list_history_entries((history_page - 1) * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE, history_query)
+        history_titles = {item['id']: item['title'] for item in history_entries}
+        
         # 创建历史记录选择器
-        history_titles = [item['title'] for item in st.session_state.search_history]
-        selected_history = st.selectbox(
+        selected_history_id = st.selectbox(
             "选择历史记录" if st.session_state.language == "zh" else "Select History Record",
-            options=history_titles,
+            options=list(history_titles),
+            format_func=lambda history_id: history_titles[history_id],
             index=0
         )
         
-        # 保存选中的历史记录到session state
-        selected_item = next((item for item in st.session_state.search_history if item['title'] == selected_history), None)
-        if selected_item:
-            st.session_state.selected_history_item = selected_item
+        # 保存选中的历史记录ID到session state，详情在历史Tab中按需加载
+        st.session_state.selected_history_id = selected_history_id
     else:
-        st.info("暂无搜索历史" if st.session_state.language == "zh" else "No search history yet")
-        st.session_state.selected_history_item = None
+        st.info(
+            ("没有匹配的历史记录" if history_query else "暂无搜索历史") if st.session_state.language == "zh"
+            else ("No matching history records" if history_query else "No search history yet")
+        )
+        st.session_state.selected_history_id = None
 
 # 获取当前语言
 lang = LANGUAGES[st.session_state.language]
@@ -375,6 +200,12 @@ except Exception as e:
     st.error(f"❌ 读取配置文件失败: {e}")
     st.stop()
 
+configure_api_keys(SERPAPI_API_KEY, OPENAI_API_KEY)
+
+# 后台定期预取关注列表（在 secrets.toml 中设置 PREFETCH_ENABLED = true 启用，进程内只启动一次）
+if st.secrets.get("PREFETCH_ENABLED", False):
+    start_prefetch_scheduler()
+
 # 预定义数据
 KEYWORDS = [
     "锂", "钴", "镍", "石墨", "锰", "铜", "铝", "锌", "镓", "锗", "稀土", "钨", "钛", "钒", "锑", "铍", "锆", "钽", "铌",
@@ -549,764 +380,80 @@ Please provide the English version with the exact same format and structure."""
     
     return prompt
 
-def search_baidu_news(keywords, companies, time_option, custom_start_date=None, custom_end_date=None):
-    """使用SerpApi搜索百度新闻（第一步）"""
-    try:
-        # 构建搜索查询
-        search_terms = []
-        
-        # 添加关键词
-        if keywords:
-            search_terms.extend(keywords)
-        
-        # 添加公司名称
-        if companies:
-            # 获取当前语言的公司映射
-            current_companies_mapping = COMPANIES_MAPPING[st.session_state.language]
-            for company in companies:
-                if company in current_companies_mapping:
-                    # 使用预定义公司的中文名称进行搜索
-                    search_terms.append(current_companies_mapping[company])
-                else:
-                    # 使用自定义公司名称
-                    search_terms.append(company)
-        
-        # 构建搜索查询字符串
-        query = " OR ".join(search_terms) if search_terms else "关键矿产"
-        
-        # 添加时间范围限制
-        current_date = datetime.now()
-        if time_option == "2_weeks":
-            start_date = current_date - timedelta(weeks=2)
-            date_range = f" {start_date.strftime('%Y年%m月%d日')}..{current_date.strftime('%Y年%m月%d日')}"
-        elif time_option == "2_days":
-            start_date = current_date - timedelta(days=2)
-            date_range = f" {start_date.strftime('%Y年%m月%d日')}..{current_date.strftime('%Y年%m月%d日')}"
-        elif time_option == "custom" and custom_start_date and custom_end_date:
-            date_range = f" {custom_start_date.strftime('%Y年%m月%d日')}..{custom_end_date.strftime('%Y年%m月%d日')}"
-        else:
-            date_range = ""
-        
-        # 最终搜索查询
-        final_query = query + date_range
-        
-        # 使用SerpApi搜索百度新闻
-        search = GoogleSearch({
-            "engine": "baidu_news",
-            "q": final_query,
-            "api_key": SERPAPI_API_KEY,
-            "medium":1,
-            "rtt":4,
-            "num": 8  # 获取前8条结果
-        })
-        
-        results = search.get_dict()
-        
-        # 处理搜索结果
-        if "organic_results" in results and results["organic_results"]:
-            return results["organic_results"]  # 返回原始搜索结果
-        else:
-            return None  # 返回None表示未找到结果
-            
-    except Exception as e:
-        raise Exception(f"搜索失败: {str(e)}")
-
-def scrape_web_content(url, max_retries=3):
-    """抓取网页内容"""
-    try:
-        # 设置请求头，模拟浏览器访问
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        for attempt in range(max_retries):
-            try:
-                # 发送请求
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                # 检查响应内容类型
-                content_type = response.headers.get('content-type', '').lower()
-                if 'text/html' not in content_type:
-                    return f"❌ 无法获取HTML内容，内容类型: {content_type}"
-                
-                # 解析HTML
-                soup = BeautifulSoup(response.content, 'lxml')
-                
-                # 移除脚本和样式标签
-                for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-                    script.decompose()
-                
-                # 尝试多种选择器来找到主要内容
-                content_selectors = [
-                    'article',
-                    '.article-content',
-                    '.content',
-                    '.news-content',
-                    '.post-content',
-                    '.entry-content',
-                    'main',
-                    '.main-content',
-                    '#content',
-                    '.article-body',
-                    '.news-body'
-                ]
-                
-                content_text = ""
-                for selector in content_selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        content_text = ' '.join([elem.get_text(strip=True) for elem in elements])
-                        if len(content_text) > 100:  # 确保内容足够长
-                            break
-                
-                # 如果没有找到特定内容区域，尝试获取body内容
-                if not content_text or len(content_text) < 100:
-                    body = soup.find('body')
-                    if body:
-                        content_text = body.get_text(strip=True)
-                
-                # 清理文本
-                if content_text:
-                    # 移除多余的空白字符
-                    content_text = re.sub(r'\s+', ' ', content_text)
-                    # 限制长度（避免过长的内容）
-                    if len(content_text) > 5000:
-                        content_text = content_text[:5000] + "..."
-                    return content_text
-                else:
-                    return "❌ 无法提取网页内容"
-                    
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    time.sleep(1)  # 等待1秒后重试
-                    continue
-                else:
-                    return f"❌ 网络请求失败: {str(e)}"
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                else:
-                    return f"❌ 解析失败: {str(e)}"
-                    
-    except Exception as e:
-        return f"❌ 抓取失败: {str(e)}"
-
-def fix_html_rendering(content):
-    """修复HTML渲染问题，确保HTML标签被正确显示"""
-    import html
+def create_result_renderer():
+    """创建分析结果渲染回调：首次调用时显示结果标题，之后原地刷新内容（用于流式输出）"""
+    placeholder = []
     
-    # 如果内容被HTML转义了，先解码
-    if '&lt;' in content or '&gt;' in content or '&amp;' in content:
-        content = html.unescape(content)
+    def render(content):
+        if not placeholder:
+            st.subheader(lang["analysis_results"])
+            placeholder.append(st.empty())
+        placeholder[0].markdown(f'<div style="font-size: 18px;">{content}</div>', unsafe_allow_html=True)
     
-    # 确保span标签格式正确
-    content = content.replace('&lt;span', '<span')
-    content = content.replace('&lt;/span&gt;', '</span>')
-    content = content.replace('&quot;', '"')
-    
-    return content
+    return render
 
-def normalize_publish_time(publish_time):
-    """将发布时间统一转换为 %Y-%m-%d 格式"""
-    if not publish_time:
-        return None
-    
-    current_date = datetime.now()
-    current_year = current_date.year
-    
-    # 处理"今天"的情况
-    if "今天" in publish_time:
-        return current_date.strftime('%Y-%m-%d')
-    
-    # 处理"昨天"的情况
-    elif "昨天" in publish_time:
-        return (current_date - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    # 处理"X天前"的情况
-    elif "天前" in publish_time:
-        try:
-            days_ago = int(publish_time.replace("天前", "").strip())
-            target_date = current_date - timedelta(days=days_ago)
-            return target_date.strftime('%Y-%m-%d')
-        except ValueError:
-            return None
-    
-    # 处理"X月X日"格式（如 "9月27日"）
-    elif "月" in publish_time and "日" in publish_time:
-        try:
-            # 提取月份和日期
-            parts = publish_time.replace("月", " ").replace("日", "").split()
-            if len(parts) >= 2:
-                month = int(parts[0])
-                day = int(parts[1])
-                
-                # 创建日期，假设是当前年份
-                target_date = datetime(current_year, month, day)
-                
-                # 如果日期在未来（比如现在是10月，但日期是9月），则认为是去年
-                if target_date > current_date:
-                    target_date = datetime(current_year - 1, month, day)
-                
-                return target_date.strftime('%Y-%m-%d')
-        except (ValueError, IndexError):
-            return None
-    
-    # 处理标准日期格式（如 "2025-10-03 18:51"）
-    else:
-        try:
-            # 尝试解析 "YYYY-MM-DD HH:MM" 格式
-            news_date = datetime.strptime(publish_time.split()[0], '%Y-%m-%d')
-            return news_date.strftime('%Y-%m-%d')
-        except (ValueError, IndexError):
-            # 如果解析失败，尝试直接使用 "YYYY-MM-DD" 格式
-            try:
-                news_date = datetime.strptime(publish_time, '%Y-%m-%d')
-                return news_date.strftime('%Y-%m-%d')
-            except ValueError:
-                return None
-
-def analyze_news_with_openai(news_results, keywords, companies, start_date, end_date):
-    """使用OpenAI分析新闻搜索结果，重新根据时间范围进行筛选处理"""
-    
-    # 将 start_date 和 end_date 转换为 date 对象进行比较
-    if isinstance(start_date, datetime):
-        start_date_obj = start_date.date()
-    else:
-        start_date_obj = start_date
-    
-    if isinstance(end_date, datetime):
-        end_date_obj = end_date.date()
+def show_compaction_stats(token_stats):
+    """显示提示词精简前后的token数"""
+    if st.session_state.language == "zh":
+        st.caption(f"✂️ 提示词精简：{token_stats['original_tokens']} → {token_stats['compacted_tokens']} tokens（节省 {token_stats['saved_tokens']}）")
     else:
-        end_date_obj = end_date
-    
-    # Filter news_results by Publish Time
-    filtered_news = []
-    
-    for news_item in news_results:
-        publish_time = news_item.get('date', '')
-        
-        # 规范化发布时间格式
-        standardized_date = normalize_publish_time(publish_time)
-        
-        if standardized_date:
-            try:
-                news_date = datetime.strptime(standardized_date, '%Y-%m-%d').date()
-                
-                # 使用 date 对象进行比较
-                if start_date_obj <= news_date <= end_date_obj:
-                    filtered_news.append(news_item)
-            except ValueError:
-                continue  # Skip if date cannot be parsed
-
-    # Check if any news collected after filtering
-    if not filtered_news:
-        return ("未找到符合时间范围的新闻" if st.session_state.language == "zh" else "No news found within the time range")
-
-    # Proceed to analyze with OpenAI
-    try:
-        # The rest of the code remains the same, analysis continues...
-        enhanced_news_results = []
-        for i, news_item in enumerate(filtered_news):
-            enhanced_item = news_item.copy()
-            news_url = news_item.get('link', '')
-            if news_url and validate_url(news_url)[0]:
-                if st.session_state.language == "zh":
-                    progress_text = f"🔍 正在抓取第{i+1}条新闻内容..."
-                else:
-                    progress_text = f"🔍 Scraping content for news item {i+1}..."
-                if hasattr(st, 'info'):
-                    st.info(progress_text)
-
-                full_text = scrape_web_content(news_url)
-                enhanced_item['full_text'] = full_text
-            else:
-                enhanced_item['full_text'] = "❌ 无效链接或无法访问"
-            enhanced_news_results.append(enhanced_item)
-
-        # Rebuild the prompt for language-specific analysis
-        current_lang = st.session_state.language if hasattr(st, 'session_state') and 'language' in st.session_state else "zh"
-        
-        if current_lang == "zh":
-            analysis_prompt = f"""你是一个专业的新闻分析师。请根据以下百度新闻搜索结果，为每条新闻提供详细的分析和格式化输出。
-
-重要说明：
-1. 请确保所有输出内容都是中文，包括标题、摘要、全文等所有字段
-2. 请直接输出HTML格式，不要转义HTML标签
-3. 使用以下HTML格式来标记字段标题：<span style="color: #ff0000; font-weight: bold;">**字段名**</span>
-
-搜索关键词：{', '.join(keywords) if keywords else '无'}
-搜索公司：{', '.join(companies) if companies else '无'}
-
-请为每条新闻提供以下7个字段的详细分析：
-
-1. 标题：新闻的完整标题（保持原标题，如果是英文标题则翻译为中文）
-2. 相关性：相关性评分（0-1，1为最相关），基于与关键词和公司的匹配度
-3. 来源：新闻来源（必须来自中国媒体）
-4. 来源链接：原始新闻文章的URL链接
-5. 发布时间：具体发布时间（年-月-日 时:分）
-6. 摘要：新闻的简要概述（100-200字，必须用中文）
-7. 全文：新闻的完整内容（如果抓取成功，请将抓取到的内容翻译为中文；如果抓取失败，请基于标题和摘要生成合理的中文内容）
-
-新闻搜索结果（包含抓取的完整内容）：
-{json.dumps(enhanced_news_results, ensure_ascii=False, indent=2)}
-
-输出格式示例：
-<span style="color: #ff0000; font-weight: bold;">**标题**</span>: [新闻标题]
-
-<span style="color: #ff0000; font-weight: bold;">**相关性**</span>: [0-1分值]
-
-<span style="color: #ff0000; font-weight: bold;">**来源**</span>: [新闻来源]
-
-<span style="color: #ff0000; font-weight: bold;">**来源链接**</span>: [URL链接]
-
-<span style="color: #ff0000; font-weight: bold;">**发布时间**</span>: [时间]
-
-<span style="color: #ff0000; font-weight: bold;">**摘要**</span>: [摘要内容]
-
-<span style="color: #ff0000; font-weight: bold;">**全文**</span>: [全文内容]
-
----
-
-请严格按照上述格式输出，不要转义HTML标签。"""
-        else:
-            analysis_prompt = f"""You are a professional news analyst. Please analyze the following Baidu news search results and provide detailed analysis for each news item.
-
-IMPORTANT Instructions:
-1. Please ensure ALL output content is in English, including titles, summaries, full text, and all other fields
-2. Please output HTML format directly, do NOT escape HTML tags
-3. Use this HTML format for field headers: <span style="color: #ff0000; font-weight: bold;">**Field Name**</span>
-
-Search Keywords: {', '.join(keywords) if keywords else 'None'}
-Search Companies: {', '.join(companies) if companies else 'None'}
-
-Please provide detailed analysis for each news item with the following 7 fields:
-
-1. Title: Complete news title (translate Chinese titles to English if necessary)
-2. Relevance: Relevance score (0-1, 1 being most relevant), based on match with keywords and companies
-3. Source: News source (must be from Chinese media, keep original Chinese name)
-4. Source Link: URL link to the original news article
-5. Publish Time: Specific publication time (YYYY-MM-DD HH:MM)
-6. Summary: Brief overview (100-200 words, must be in English)
-7. Full Text: Complete news content (if scraping successful, translate the scraped content to English; if scraping failed, generate reasonable English content based on title and snippet)
-
-News search results (with scraped full content):
-{json.dumps(enhanced_news_results, ensure_ascii=False, indent=2)}
-
-Output format example:
-<span style="color: #ff0000; font-weight: bold;">**Title**</span>: [News title]
-
-<span style="color: #ff0000; font-weight: bold;">**Relevance**</span>: [0-1 score]
-
-<span style="color: #ff0000; font-weight: bold;">**Source**</span>: [News source]
-
-<span style="color: #ff0000; font-weight: bold;">**Source Link**</span>: [URL link]
-
-<span style="color: #ff0000; font-weight: bold;">**Publish Time**</span>: [Time]
-
-<span style="color: #ff0000; font-weight: bold;">**Summary**</span>: [Summary content]
-
-<span style="color: #ff0000; font-weight: bold;">**Full Text**</span>: [Full text content]
-
----
-
-Please strictly follow the above format and do NOT escape HTML tags."""
-        
-        # 调用OpenAI API进行分析
-        analysis_result = call_openai_api(analysis_prompt)
-        
-        # 修复HTML渲染问题
-        analysis_result = fix_html_rendering(analysis_result)
-        
-        return analysis_result
-    except Exception as e:
-        return format_news_results(news_results, keywords, companies)
-
-def format_news_results(news_results, keywords, companies):
-    """格式化新闻搜索结果"""
-    formatted_results = []
-    
-    # 获取当前语言设置
-    current_lang = st.session_state.language if hasattr(st, 'session_state') and hasattr(st.session_state, 'language') else "zh"
-    
-    for i, news in enumerate(news_results[:5]):  # 限制显示前5条新闻
-        # 计算相关性评分
-        relevance_score = calculate_relevance_score(news, keywords, companies)
-        
-        # 根据语言设置格式化单条新闻
-        if current_lang == "zh":
-            news_item = f"""<span style="color: #ff0000; font-weight: bold;">**Title（标题）**</span>: {news.get('title', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Relevance（相关性）**</span>: {relevance_score:.2f}
-
-<span style="color: #ff0000; font-weight: bold;">**Source（来源）**</span>: {news.get('source', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Source Link（来源链接）**</span>: {news.get('link', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Publish Time（发布时间）**</span>: {news.get('date', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Summary（摘要）**</span>: {news.get('snippet', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Full Text（全文）**</span>: {news.get('snippet', 'N/A')}
-
----
-"""
-        else:
-            news_item = f"""<span style="color: #ff0000; font-weight: bold;">**Title**</span>: {news.get('title', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Relevance**</span>: {relevance_score:.2f}
-
-<span style="color: #ff0000; font-weight: bold;">**Source**</span>: {news.get('source', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Source Link**</span>: {news.get('link', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Publish Time**</span>: {news.get('date', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Summary**</span>: {news.get('snippet', 'N/A')}
-
-<span style="color: #ff0000; font-weight: bold;">**Full Text**</span>: {news.get('snippet', 'N/A')}
-
----
-"""
-        formatted_results.append(news_item)
-    
-    return "\n".join(formatted_results)
-
-def calculate_relevance_score(news, keywords, companies):
-    """计算新闻相关性评分"""
-    score = 0.0
-    title = news.get('title', '').lower()
-    snippet = news.get('snippet', '').lower()
-    content = f"{title} {snippet}"
-    
-    # 关键词匹配
-    if keywords:
-        keyword_matches = sum(1 for keyword in keywords if keyword.lower() in content)
-        score += (keyword_matches / len(keywords)) * 0.6
-    
-    # 公司匹配
-    if companies:
-        company_matches = 0
-        current_companies_mapping = COMPANIES_MAPPING[st.session_state.language]
-        for company in companies:
-            if company in current_companies_mapping:
-                company_name = current_companies_mapping[company].lower()
-                if company_name in content:
-                    company_matches += 1
-            else:
-                if company.lower() in content:
-                    company_matches += 1
-        score += (company_matches / len(companies)) * 0.4
-    
-    # 确保评分在0-1之间
-    return min(max(score, 0.1), 1.0)
+        st.caption(f"✂️ Prompt compaction: {token_stats['original_tokens']} → {token_stats['compacted_tokens']} tokens (saved {token_stats['saved_tokens']})")
+
+def show_performance_panel(trace, key):
+    """在可折叠面板中显示执行追踪：各阶段耗时、最慢的网页抓取和模型调用，并提供JSON/OpenTelemetry导出"""
+    if not trace or not trace["spans"]:
+        return
+    is_zh = st.session_state.language == "zh"
+    total_seconds = (trace["end_time"] or trace["start_time"]) - trace["start_time"]
+    with st.expander("⏱️ 性能分析" if is_zh else "⏱️ Performance", expanded=False):
+        st.caption(
+            f"总耗时 {total_seconds:.2f} 秒，共 {len(trace['spans'])} 个步骤" if is_zh
+            else f"Total {total_seconds:.2f} s across {len(trace['spans'])} steps"
+        )
+        st.markdown("**各阶段耗时 / Stage Timings**")
+        st.dataframe(summarize_trace(trace), use_container_width=True, hide_index=True)
+        
+        slowest_scrapes = get_slowest_spans(trace, {"scrape.url"})
+        if slowest_scrapes:
+            st.markdown("**最慢的网页抓取 / Slowest Scrapes**")
+            st.dataframe(slowest_scrapes, use_container_width=True, hide_index=True)
+        
+        llm_calls = get_slowest_spans(trace, {"llm.call"})
+        if llm_calls:
+            st.markdown("**模型调用 / LLM Calls**")
+            st.dataframe(llm_calls, use_container_width=True, hide_index=True)
+        
+        col_json, col_otlp = st.columns(2)
+        with col_json:
+            st.download_button(
+                "⬇️ 导出JSON" if is_zh else "⬇️ Export JSON",
+                data=trace_to_json(trace), file_name=f"trace-{trace['trace_id']}.json",
+                mime="application/json", key=f"{key}_trace_json"
+            )
+        with col_otlp:
+            st.download_button(
+                "⬇️ 导出OpenTelemetry" if is_zh else "⬇️ Export OpenTelemetry",
+                data=json.dumps(trace_to_otlp(trace), ensure_ascii=False), file_name=f"trace-{trace['trace_id']}.otlp.json",
+                mime="application/json", key=f"{key}_trace_otlp"
+            )
 
-def extract_search_terms_from_prompt(prompt):
-    """从自定义prompt中提取关键词和公司信息"""
-    keywords = []
-    companies = []
-    
-    # 获取当前语言的关键词和公司列表
-    current_keywords = KEYWORDS_MAPPING[st.session_state.language]
-    current_companies = list(COMPANIES_MAPPING[st.session_state.language].keys())
-    
-    prompt_lower = prompt.lower()
-    
-    # 提取关键词
-    for keyword in current_keywords:
-        if keyword.lower() in prompt_lower:
-            keywords.append(keyword)
+def analyze_news(news_results, keywords, companies, start_date, end_date, on_update=None):
+    """以当前界面语言调用分析流水线，并在页面上显示抓取进度和精简统计"""
+    progress_bar = []
     
-    # 提取公司
-    for company in current_companies:
-        if company.lower() in prompt_lower:
-            companies.append(company)
-    
-    # 如果没有找到预定义的关键词或公司，使用一些通用关键词
-    if not keywords and not companies:
-        keywords = ["关键矿产", "矿业"] if st.session_state.language == "zh" else ["critical minerals", "mining"]
-    
-    return keywords, companies
-
-def extract_keywords_and_time_with_chatgpt(prompt, model="gpt-4o"):
-    """使用ChatGPT从自定义prompt中提取核心关键词和时间信息"""
-    try:
-        # 构建提取prompt
+    def report_progress(completed, total, item_number):
+        if not progress_bar:
+            progress_bar.append(st.progress(0.0))
         if st.session_state.language == "zh":
-            extraction_prompt = f"""你是一个专业的文本分析助手。请从以下用户输入的prompt中提取核心搜索关键词和时间信息。
-
-用户输入的prompt: "{prompt}"
-
-请按照以下JSON格式返回结果：
-{{
-    "keywords": ["核心关键词"],
-    "time_description": "时间描述",
-    "time_type": "relative|absolute|none",
-    "time_value": "具体时间值",
-    "explanation": "提取过程的简要说明"
-}}
-
-提取规则：
-1. keywords: 只提取最核心的1-2个关键词，必须是关键矿产、矿业、公司、投资、项目等相关的核心词汇
-   - 例如："I searched for Chinese top news on critical minerals in the last 2 days" 只提取 "critical minerals"
-   - 例如："Latest news about Zijin Mining lithium projects" 只提取 "Zijin Mining" 和 "lithium"
-   - 不要提取"news"、"latest"、"top"、"Chinese"等修饰词
-2. time_description: 原始prompt中的时间描述（如"最近2天"、"last 2 days"等）
-3. time_type: "relative"表示相对时间，"absolute"表示绝对时间，"none"表示无时间限制
-4. time_value: 如果是相对时间，提取数字和单位（如"2 days"、"1 week"等）
-5. explanation: 简要说明提取的核心关键词和时间信息
-
-请确保：
-- 只提取最核心的关键词，数量控制在1-2个
-- 关键词要具体且相关，不要包含修饰词
-- 时间信息要准确
-- JSON格式要正确
-- 如果prompt中没有明确的时间信息，time_type设为"none"
-"""
+            progress_text = f"🔍 已抓取 {completed}/{total} 条新闻内容（第{item_number}条完成）"
         else:
-            extraction_prompt = f"""You are a professional text analysis assistant. Please extract core search keywords and time information from the following user prompt.
-
-User prompt: "{prompt}"
-
-Please return the result in the following JSON format:
-{{
-    "keywords": ["core keyword"],
-    "time_description": "time description",
-    "time_type": "relative|absolute|none",
-    "time_value": "specific time value",
-    "explanation": "brief explanation of extraction process"
-}}
-
-Extraction rules:
-1. keywords: Extract only the most core 1-2 keywords related to critical minerals, mining, companies, investments, projects, etc.
-   - Example: "I searched for Chinese top news on critical minerals in the last 2 days" → extract only "critical minerals"
-   - Example: "Latest news about Zijin Mining lithium projects" → extract only "Zijin Mining" and "lithium"
-   - Do NOT extract modifiers like "news", "latest", "top", "Chinese", etc.
-2. time_description: Original time description in the prompt (e.g., "last 2 days", "recent week", etc.)
-3. time_type: "relative" for relative time, "absolute" for absolute time, "none" for no time limit
-4. time_value: If relative time, extract number and unit (e.g., "2 days", "1 week", etc.)
-5. explanation: Brief explanation of extracted core keywords and time information
-
-Please ensure:
-- Extract only the most core keywords, limit to 1-2 keywords
-- Keywords should be specific and relevant, exclude modifiers
-- Time information is accurate
-- JSON format is correct
-- If no clear time information in prompt, set time_type to "none"
-"""
-        
-        # 调用OpenAI API
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": extraction_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=1000,
-            stream=False
-        )
-        
-        response_text = completion.choices[0].message.content
-        
-        # 解析JSON响应
-        import json
-        try:
-            # 尝试提取JSON部分
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            if json_start != -1 and json_end != -1:
-                json_str = response_text[json_start:json_end]
-                result = json.loads(json_str)
-                
-                # 验证必要字段
-                if all(key in result for key in ['keywords', 'time_description', 'time_type', 'time_value', 'explanation']):
-                    return result
-                else:
-                    raise ValueError("Missing required fields in JSON response")
-            else:
-                raise ValueError("No valid JSON found in response")
-                
-        except (json.JSONDecodeError, ValueError) as e:
-            # 如果JSON解析失败，返回默认值
-            return {
-                "keywords": ["关键矿产", "矿业"] if st.session_state.language == "zh" else ["critical minerals", "mining"],
-                "time_description": "无时间限制" if st.session_state.language == "zh" else "no time limit",
-                "time_type": "none",
-                "time_value": "",
-                "explanation": f"JSON解析失败，使用默认关键词: {str(e)}"
-            }
-            
-    except Exception as e:
-        # 如果API调用失败，返回默认值
-        return {
-            "keywords": ["关键矿产", "矿业"] if st.session_state.language == "zh" else ["critical minerals", "mining"],
-            "time_description": "无时间限制" if st.session_state.language == "zh" else "no time limit",
-            "time_type": "none",
-            "time_value": "",
-            "explanation": f"API调用失败，使用默认关键词: {str(e)}"
-        }
-
-def convert_time_to_date_range(time_description, time_type, time_value):
-    """将时间描述转换为具体的日期范围"""
-    try:
-        current_date = datetime.now()
-        
-        if time_type == "none" or not time_value:
-            # 默认使用最近6个月
-            start_date = current_date - timedelta(days=180)  # 约6个月
-            end_date = current_date
-            return start_date, end_date, "最近6个月" if st.session_state.language == "zh" else "last 6 months"
-        
-        elif time_type == "relative":
-            # 处理相对时间
-            time_value_lower = time_value.lower().strip()
-            
-            # 处理天数
-            if "day" in time_value_lower:
-                try:
-                    days = int(''.join(filter(str.isdigit, time_value_lower)))
-                    start_date = current_date - timedelta(days=days)
-                    end_date = current_date
-                    time_desc = f"最近{days}天" if st.session_state.language == "zh" else f"last {days} days"
-                    return start_date, end_date, time_desc
-                except ValueError:
-                    pass
-            
-            # 处理周数
-            elif "week" in time_value_lower:
-                try:
-                    weeks = int(''.join(filter(str.isdigit, time_value_lower)))
-                    start_date = current_date - timedelta(weeks=weeks)
-                    end_date = current_date
-                    time_desc = f"最近{weeks}周" if st.session_state.language == "zh" else f"last {weeks} weeks"
-                    return start_date, end_date, time_desc
-                except ValueError:
-                    pass
-            
-            # 处理月数
-            elif "month" in time_value_lower:
-                try:
-                    months = int(''.join(filter(str.isdigit, time_value_lower)))
-                    start_date = current_date - timedelta(days=months * 30)  # 近似处理
-                    end_date = current_date
-                    time_desc = f"最近{months}个月" if st.session_state.language == "zh" else f"last {months} months"
-                    return start_date, end_date, time_desc
-                except ValueError:
-                    pass
-            
-            # 处理小时
-            elif "hour" in time_value_lower:
-                try:
-                    hours = int(''.join(filter(str.isdigit, time_value_lower)))
-                    start_date = current_date - timedelta(hours=hours)
-                    end_date = current_date
-                    time_desc = f"最近{hours}小时" if st.session_state.language == "zh" else f"last {hours} hours"
-                    return start_date, end_date, time_desc
-                except ValueError:
-                    pass
-        
-        # 如果无法解析，使用默认值
-        start_date = current_date - timedelta(days=180)  # 约6个月
-        end_date = current_date
-        return start_date, end_date, "最近6个月" if st.session_state.language == "zh" else "last 6 months"
-        
-    except Exception as e:
-        # 异常情况下使用默认值
-        current_date = datetime.now()
-        start_date = current_date - timedelta(days=180)  # 约6个月
-        end_date = current_date
-        return start_date, end_date, "最近6个月" if st.session_state.language == "zh" else "last 6 months"
-
-def translate_keywords_to_chinese(keywords, model="gpt-4o"):
-    """将英文关键字翻译成中文"""
-    try:
-        if not keywords:
-            return []
-        
-        # 检查是否包含英文字符
-        has_english = any(any(c.isalpha() and ord(c) < 128 for c in keyword) for keyword in keywords)
-        if not has_english:
-            # 如果没有英文字符，直接返回原关键字
-            return keywords
-        
-        # 构建翻译prompt
-        keywords_str = ", ".join(keywords)
-        translation_prompt = f"""请将以下英文关键词翻译成中文，保持专业术语的准确性：
-
-英文关键词: {keywords_str}
-
-翻译要求：
-1. 保持关键词的专业性和准确性
-2. 如果是矿业、矿产相关的专业术语，请使用标准的中文翻译
-3. 如果是公司名称，请使用该公司的官方中文名称
-4. 只返回翻译后的中文关键词，用逗号分隔
-5. 不要添加任何解释或其他内容
-
-请直接返回翻译结果："""
-        
-        # 调用OpenAI API进行翻译
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": translation_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=500,
-            stream=False
-        )
-        
-        response_text = completion.choices[0].message.content.strip()
-        
-        # 解析翻译结果
-        translated_keywords = [keyword.strip() for keyword in response_text.split(',') if keyword.strip()]
-        
-        # 如果翻译失败或结果为空，返回原关键字
-        if not translated_keywords:
-            return keywords
-        
-        return translated_keywords
-        
-    except Exception as e:
-        # 如果翻译失败，返回原关键字
-        print(f"Translation failed: {str(e)}")
-        return keywords
-
-def call_openai_api(prompt, model="gpt-4o"):
-    """调用OpenAI API (用于语言转换和内容分析)"""
-    try:
-        # 初始化OpenAI客户端
-        client = OpenAI(
-            api_key=OPENAI_API_KEY,
-        )
-        
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=4096,
-            stream=False
-        )
-        
-        return completion.choices[0].message.content
-        
-    except Exception as e:
-        error_msg = str(e)
-        if "401" in error_msg or "unauthorized" in error_msg.lower():
-            return "❌ API调用失败: 您的OpenAI API密钥已过期或无效，请检查API密钥设置。"
-        elif "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-            return "❌ API调用失败: 已达到OpenAI API调用配额限制，请稍后再试。"
-        else:
-            return f"❌ API调用失败: {error_msg}"
+            progress_text = f"🔍 Scraped {completed}/{total} news items (item {item_number} finished)"
+        progress_bar[0].progress(completed / total, text=progress_text)
+    
+    return analyze_news_with_openai(
+        news_results, keywords, companies, start_date, end_date, on_update=on_update,
+        language=st.session_state.language, on_scrape_progress=report_progress, on_compaction=show_compaction_stats
+    )
 
 def main():
     st.title(lang["title"])
@@ -1435,73 +582,70 @@ def main():
                     with st.expander(lang["generated_prompt"], expanded=False):
                         st.markdown(f'<div style="font-size: 18px;">{news_prompt}</div>', unsafe_allow_html=True)
                     
-                    # 第一步：使用SerpApi搜索百度新闻
-                    st.info("🔍 第一步：正在使用SerpApi搜索百度新闻..." if st.session_state.language == "zh" else "🔍 Step 1: Searching Baidu News with SerpApi...")
-                    try:
-                        news_results = search_baidu_news(selected_keywords, selected_companies, time_option, custom_start_date, custom_end_date)
-                        
-                        if news_results:
-                            # 计算实际的时间范围用于过滤
-                            current_date = datetime.now()
-                            if time_option == "2_weeks":
-                                filter_start_date = current_date - timedelta(weeks=2)
-                                filter_end_date = current_date
-                            elif time_option == "2_days":
-                                filter_start_date = current_date - timedelta(days=2)
-                                filter_end_date = current_date
-                            elif time_option == "custom" and custom_start_date and custom_end_date:
-                                filter_start_date = datetime.combine(custom_start_date, datetime.min.time())
-                                filter_end_date = datetime.combine(custom_end_date, datetime.max.time())
-                            else:
-                                # 默认使用最近2周
-                                filter_start_date = current_date - timedelta(weeks=2)
-                                filter_end_date = current_date
+                    # 记录各阶段耗时（搜索、抓取、过滤、模型调用）
+                    with start_trace("news_filtering", time_option=time_option) as trace:
+                        # 第一步：使用SerpApi搜索百度新闻
+                        st.info("🔍 第一步：正在使用SerpApi搜索百度新闻..." if st.session_state.language == "zh" else "🔍 Step 1: Searching Baidu News with SerpApi...")
+                        try:
+                            news_results = search_baidu_news(selected_keywords, selected_companies, time_option, custom_start_date, custom_end_date, paginate=(time_option == "custom"), language=st.session_state.language)
                             
-                            # 显示时间范围信息
-                            if st.session_state.language == "zh":
-                                st.info(f"📅 过滤时间范围: {filter_start_date.strftime('%Y-%m-%d')} 至 {filter_end_date.strftime('%Y-%m-%d')}")
+                            if news_results:
+                                # 计算实际的时间范围用于过滤
+                                current_date = datetime.now()
+                                if time_option == "2_weeks":
+                                    filter_start_date = current_date - timedelta(weeks=2)
+                                    filter_end_date = current_date
+                                elif time_option == "2_days":
+                                    filter_start_date = current_date - timedelta(days=2)
+                                    filter_end_date = current_date
+                                elif time_option == "custom" and custom_start_date and custom_end_date:
+                                    filter_start_date = datetime.combine(custom_start_date, datetime.min.time())
+                                    filter_end_date = datetime.combine(custom_end_date, datetime.max.time())
+                                else:
+                                    # 默认使用最近2周
+                                    filter_start_date = current_date - timedelta(weeks=2)
+                                    filter_end_date = current_date
+                                
+                                # 显示时间范围信息
+                                if st.session_state.language == "zh":
+                                    st.info(f"📅 过滤时间范围: {filter_start_date.strftime('%Y-%m-%d')} 至 {filter_end_date.strftime('%Y-%m-%d')}")
+                                else:
+                                    st.info(f"📅 Filter time range: {filter_start_date.strftime('%Y-%m-%d')} to {filter_end_date.strftime('%Y-%m-%d')}")
+                                
+                                # 第二步：使用OpenAI进行格式化输出
+                                st.info("🤖 第二步：正在使用OpenAI进行格式化输出..." if st.session_state.language == "zh" else "🤖 Step 2: Formatting output with OpenAI...")
+                                render_result = create_result_renderer()
+                                final_result = analyze_news(news_results, selected_keywords, selected_companies, filter_start_date, filter_end_date, on_update=render_result)
+                                
+                                # 显示分析结果
+                                render_result(final_result)
+                                
+                                # 保存结果到session state
+                                st.session_state.last_news_result = final_result
+                                st.session_state.last_prompt = news_prompt
                             else:
-                                st.info(f"📅 Filter time range: {filter_start_date.strftime('%Y-%m-%d')} to {filter_end_date.strftime('%Y-%m-%d')}")
-                            
-                            # 第二步：使用OpenAI进行格式化输出
-                            st.info("🤖 第二步：正在使用OpenAI进行格式化输出..." if st.session_state.language == "zh" else "🤖 Step 2: Formatting output with OpenAI...")
-                            final_result = analyze_news_with_openai(news_results, selected_keywords, selected_companies, filter_start_date, filter_end_date)
-                            
-                            # 显示分析结果
-                            st.subheader(lang["analysis_results"])
-                            st.markdown(f'<div style="font-size: 18px;">{final_result}</div>', unsafe_allow_html=True)
-                            
-                            # 保存结果到session state
-                            st.session_state.last_news_result = final_result
-                            st.session_state.last_prompt = news_prompt
-                            
-                            # 添加到历史记录
-                            add_to_history(selected_keywords, selected_companies, time_option, final_result, news_prompt)
-                        else:
-                            # 如果未找到新闻
-                            error_msg = "❌ 未找到相关新闻，请尝试调整搜索条件或时间范围。" if st.session_state.language == "zh" else "❌ No relevant news found, please try adjusting search conditions or time range."
+                                # 如果未找到新闻
+                                error_msg = "❌ 未找到相关新闻，请尝试调整搜索条件或时间范围。" if st.session_state.language == "zh" else "❌ No relevant news found, please try adjusting search conditions or time range."
+                                st.subheader(lang["analysis_results"])
+                                st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
+                                
+                                # 保存结果到session state
+                                st.session_state.last_news_result = error_msg
+                                st.session_state.last_prompt = news_prompt
+                                
+                        except Exception as e:
+                            # 如果搜索失败
+                            error_msg = f"❌ 搜索失败: {str(e)}"
                             st.subheader(lang["analysis_results"])
                             st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
                             
                             # 保存结果到session state
                             st.session_state.last_news_result = error_msg
                             st.session_state.last_prompt = news_prompt
-                        
-                            # 添加到历史记录
-                            add_to_history(selected_keywords, selected_companies, time_option, error_msg, news_prompt)
-                            
-                    except Exception as e:
-                        # 如果搜索失败
-                        error_msg = f"❌ 搜索失败: {str(e)}"
-                        st.subheader(lang["analysis_results"])
-                        st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
-                        
-                        # 保存结果到session state
-                        st.session_state.last_news_result = error_msg
-                        st.session_state.last_prompt = news_prompt
-                        
-                        # 添加到历史记录
-                        add_to_history(selected_keywords, selected_companies, time_option, error_msg, news_prompt)
+
+                    # 添加到历史记录（附带执行追踪）
+                    add_to_history(selected_keywords, selected_companies, time_option, st.session_state.last_news_result, news_prompt, trace)
+                    show_performance_panel(trace, "tab1")
         
         # 显示上次分析结果
         if 'last_news_result' in st.session_state:
@@ -1568,151 +712,159 @@ def main():
                 st.markdown(f'<div style="font-size: 16px; color: #ff4b4b;">{lang["error_no_prompt"]}</div>', unsafe_allow_html=True)
             else:
                 with st.spinner(lang["analyzing"]):
-                    # 第一步：使用ChatGPT提取关键词和时间信息
-                    st.info("🧠 第一步：正在使用ChatGPT分析Prompt..." if st.session_state.language == "zh" else "🧠 Step 1: Analyzing prompt with ChatGPT...")
-                    
-                    try:
-                        # 使用ChatGPT提取关键词和时间信息
-                        extraction_result = extract_keywords_and_time_with_chatgpt(custom_prompt, model_option)
-                        
-                        # 显示提取结果
-                        st.success("✅ Prompt分析完成！" if st.session_state.language == "zh" else "✅ Prompt analysis completed!")
-                        
-                        # 第三步：翻译关键字为中文
-                        st.info("🔄 第三步：正在翻译关键字为中文..." if st.session_state.language == "zh" else "🔄 Step 3: Translating keywords to Chinese...")
-                        
-                        # 翻译关键字
-                        original_keywords = extraction_result["keywords"]
-                        translated_keywords = translate_keywords_to_chinese(original_keywords, model_option)
-                        
-                        # 显示翻译结果
-                        st.success("✅ 关键字翻译完成！" if st.session_state.language == "zh" else "✅ Keywords translation completed!")
-                        
-                        # 创建三列显示提取的参数
-                        col_extract1, col_extract2, col_extract3 = st.columns(3)
-                        
-                        with col_extract1:
-                            st.markdown("**🔑 原始关键词 / Original Keywords:**")
-                            original_display = ", ".join(original_keywords) if original_keywords else ("无" if st.session_state.language == "zh" else "None")
-                            st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{original_display}</div>', unsafe_allow_html=True)
-                        
-                        with col_extract2:
-                            st.markdown("**🇨🇳 中文关键词 / Chinese Keywords:**")
-                            translated_display = ", ".join(translated_keywords) if translated_keywords else ("无" if st.session_state.language == "zh" else "None")
-                            st.markdown(f'<div style="background-color: #e8f5e8; padding: 10px; border-radius: 5px; margin: 5px 0;">{translated_display}</div>', unsafe_allow_html=True)
-                        
-                        with col_extract3:
-                            st.markdown("**⏰ 时间范围 / Time Range:**")
-                            time_display = extraction_result["time_description"] if extraction_result["time_description"] else ("无时间限制" if st.session_state.language == "zh" else "No time limit")
-                            st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{time_display}</div>', unsafe_allow_html=True)
+                    # 记录各阶段耗时（Prompt解析、搜索、抓取、模型调用）
+                    with start_trace("custom_prompt", model=model_option) as trace:
+                        history_keywords, history_companies = [], []
+                        # 第一步：使用ChatGPT提取关键词和时间信息
+                        st.info("🧠 第一步：正在分析Prompt..." if st.session_state.language == "zh" else "🧠 Step 1: Analyzing prompt...")
                         
-                        # 显示提取说明
-                        with st.expander("📝 提取说明 / Extraction Explanation", expanded=False):
-                            st.markdown(f'<div style="font-size: 14px;">{extraction_result["explanation"]}</div>', unsafe_allow_html=True)
-                        
-                        # 第四步：转换时间为具体日期范围
-                        st.info("📅 第四步：正在转换时间范围..." if st.session_state.language == "zh" else "📅 Step 4: Converting time range...")
-                        
-                        filter_start_date, filter_end_date, time_desc = convert_time_to_date_range(
-                            extraction_result["time_description"],
-                            extraction_result["time_type"],
-                            extraction_result["time_value"]
-                        )
-                        
-                        # 显示具体的时间范围
-                        st.success(f"📅 搜索时间范围: {filter_start_date.strftime('%Y-%m-%d')} 至 {filter_end_date.strftime('%Y-%m-%d')}" if st.session_state.language == "zh" else f"📅 Search time range: {filter_start_date.strftime('%Y-%m-%d')} to {filter_end_date.strftime('%Y-%m-%d')}")
-                        
-                        # 第五步：使用SerpApi搜索百度新闻
-                        st.info("🔍 第五步：正在使用SerpApi搜索百度新闻..." if st.session_state.language == "zh" else "🔍 Step 5: Searching Baidu News with SerpApi...")
-                        
-                        # 使用翻译后的中文关键词进行搜索
-                        news_results = search_baidu_news(translated_keywords, [], "custom", filter_start_date, filter_end_date)
-                        
-                        if news_results:
-                            # 第六步：使用OpenAI进行格式化输出
-                            st.info("🤖 第六步：正在使用OpenAI进行格式化输出..." if st.session_state.language == "zh" else "🤖 Step 6: Formatting output with OpenAI...")
-                            final_result = analyze_news_with_openai(news_results, translated_keywords, [], filter_start_date, filter_end_date)
+                        try:
+                            # 优先使用本地规则提取关键词和时间信息，置信度不足时使用ChatGPT
+                            extraction_result, extraction_path, extraction_seconds = extract_search_parameters(custom_prompt, model_option, st.session_state.language)
                             
-                            # 显示分析结果
-                            st.subheader(lang["analysis_results"])
-                            st.markdown(f'<div style="font-size: 18px;">{final_result}</div>', unsafe_allow_html=True)
+                            # 显示提取结果
+                            st.success("✅ Prompt分析完成！" if st.session_state.language == "zh" else "✅ Prompt analysis completed!")
+                            if extraction_path == "local":
+                                st.caption(f"⚡ 本地规则解析，耗时 {extraction_seconds * 1000:.1f} 毫秒" if st.session_state.language == "zh" else f"⚡ Parsed locally in {extraction_seconds * 1000:.1f} ms")
+                            else:
+                                st.caption(f"🧠 ChatGPT解析，耗时 {extraction_seconds:.2f} 秒" if st.session_state.language == "zh" else f"🧠 Parsed with ChatGPT in {extraction_seconds:.2f} s")
                             
-                            # 保存结果到session state
-                            st.session_state.last_custom_result = final_result
-                            st.session_state.last_custom_prompt = custom_prompt
-                            st.session_state.last_extraction_result = extraction_result
-                            st.session_state.last_translated_keywords = translated_keywords
-                            st.session_state.last_time_range = {
-                                "start_date": filter_start_date,
-                                "end_date": filter_end_date,
-                                "description": time_desc
-                            }
-                        else:
-                            # 如果未找到新闻
-                            error_msg = "❌ 未找到相关新闻，请尝试调整搜索条件或时间范围。" if st.session_state.language == "zh" else "❌ No relevant news found, please try adjusting search conditions or time range."
-                            st.subheader(lang["analysis_results"])
-                            st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
+                            # 第三步：中文搜索词已在提取时一并给出，无需再次调用模型翻译
+                            original_keywords = extraction_result["keywords"]
+                            translated_keywords = extraction_result["search_terms"]
+                            history_keywords = original_keywords
                             
-                            # 保存结果到session state
-                            st.session_state.last_custom_result = error_msg
-                            st.session_state.last_custom_prompt = custom_prompt
-                            st.session_state.last_extraction_result = extraction_result
-                            st.session_state.last_translated_keywords = translated_keywords
-                            st.session_state.last_time_range = {
-                                "start_date": filter_start_date,
-                                "end_date": filter_end_date,
-                                "description": time_desc
-                            }
+                            # 创建三列显示提取的参数
+                            col_extract1, col_extract2, col_extract3 = st.columns(3)
                             
-                    except Exception as e:
-                        # 如果提取失败，使用传统方法
-                        st.warning("⚠️ ChatGPT提取失败，使用传统方法..." if st.session_state.language == "zh" else "⚠️ ChatGPT extraction failed, using traditional method...")
-                        
-                        # 使用传统方法提取关键词
-                        extracted_keywords, extracted_companies = extract_search_terms_from_prompt(custom_prompt)
-                        
-                        # 显示提取的关键词
-                        st.markdown("**🔑 提取的关键词 / Extracted Keywords:**")
-                        keywords_display = ", ".join(extracted_keywords) if extracted_keywords else ("无" if st.session_state.language == "zh" else "None")
-                        st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{keywords_display}</div>', unsafe_allow_html=True)
-                        
-                        # 使用默认时间范围
-                        current_date = datetime.now()
-                        filter_start_date = current_date - timedelta(days=180)  # 约6个月
-                        filter_end_date = current_date
-                        
-                        st.markdown("**⏰ 时间范围 / Time Range:**")
-                        st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">最近6个月 / Last 6 months</div>', unsafe_allow_html=True)
-                        
-                        try:
-                            news_results = search_baidu_news(extracted_keywords, extracted_companies, "custom", filter_start_date, filter_end_date)
+                            with col_extract1:
+                                st.markdown("**🔑 原始关键词 / Original Keywords:**")
+                                original_display = ", ".join(original_keywords) if original_keywords else ("无" if st.session_state.language == "zh" else "None")
+                                st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{original_display}</div>', unsafe_allow_html=True)
+                            
+                            with col_extract2:
+                                st.markdown("**🇨🇳 中文关键词 / Chinese Keywords:**")
+                                translated_display = ", ".join(translated_keywords) if translated_keywords else ("无" if st.session_state.language == "zh" else "None")
+                                st.markdown(f'<div style="background-color: #e8f5e8; padding: 10px; border-radius: 5px; margin: 5px 0;">{translated_display}</div>', unsafe_allow_html=True)
+                            
+                            with col_extract3:
+                                st.markdown("**⏰ 时间范围 / Time Range:**")
+                                time_display = extraction_result["time_description"] if extraction_result["time_description"] else ("无时间限制" if st.session_state.language == "zh" else "No time limit")
+                                st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{time_display}</div>', unsafe_allow_html=True)
+                            
+                            # 显示提取说明
+                            with st.expander("📝 提取说明 / Extraction Explanation", expanded=False):
+                                st.markdown(f'<div style="font-size: 14px;">{extraction_result["explanation"]}</div>', unsafe_allow_html=True)
+                            
+                            # 第四步：转换时间为具体日期范围
+                            st.info("📅 第四步：正在转换时间范围..." if st.session_state.language == "zh" else "📅 Step 4: Converting time range...")
+                            
+                            filter_start_date, filter_end_date, time_desc = convert_time_to_date_range(
+                                extraction_result["time_description"],
+                                extraction_result["time_type"],
+                                extraction_result["time_value"],
+                                st.session_state.language
+                            )
+                            
+                            # 显示具体的时间范围
+                            st.success(f"📅 搜索时间范围: {filter_start_date.strftime('%Y-%m-%d')} 至 {filter_end_date.strftime('%Y-%m-%d')}" if st.session_state.language == "zh" else f"📅 Search time range: {filter_start_date.strftime('%Y-%m-%d')} to {filter_end_date.strftime('%Y-%m-%d')}")
+                            
+                            # 第五步：使用SerpApi搜索百度新闻
+                            st.info("🔍 第五步：正在使用SerpApi搜索百度新闻..." if st.session_state.language == "zh" else "🔍 Step 5: Searching Baidu News with SerpApi...")
+                            
+                            # 使用翻译后的中文关键词进行搜索
+                            news_results = search_baidu_news(translated_keywords, [], "custom", filter_start_date, filter_end_date, paginate=True, language=st.session_state.language)
                             
                             if news_results:
-                                final_result = analyze_news_with_openai(news_results, extracted_keywords, extracted_companies, filter_start_date, filter_end_date)
+                                # 第六步：使用OpenAI进行格式化输出
+                                st.info("🤖 第六步：正在使用OpenAI进行格式化输出..." if st.session_state.language == "zh" else "🤖 Step 6: Formatting output with OpenAI...")
+                                render_result = create_result_renderer()
+                                final_result = analyze_news(news_results, translated_keywords, [], filter_start_date, filter_end_date, on_update=render_result)
                                 
                                 # 显示分析结果
-                                st.subheader(lang["analysis_results"])
-                                st.markdown(f'<div style="font-size: 18px;">{final_result}</div>', unsafe_allow_html=True)
+                                render_result(final_result)
                                 
                                 # 保存结果到session state
                                 st.session_state.last_custom_result = final_result
                                 st.session_state.last_custom_prompt = custom_prompt
+                                st.session_state.last_extraction_result = extraction_result
+                                st.session_state.last_translated_keywords = translated_keywords
+                                st.session_state.last_time_range = {
+                                    "start_date": filter_start_date,
+                                    "end_date": filter_end_date,
+                                    "description": time_desc
+                                }
                             else:
+                                # 如果未找到新闻
                                 error_msg = "❌ 未找到相关新闻，请尝试调整搜索条件或时间范围。" if st.session_state.language == "zh" else "❌ No relevant news found, please try adjusting search conditions or time range."
                                 st.subheader(lang["analysis_results"])
                                 st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
                                 
+                                # 保存结果到session state
                                 st.session_state.last_custom_result = error_msg
                                 st.session_state.last_custom_prompt = custom_prompt
+                                st.session_state.last_extraction_result = extraction_result
+                                st.session_state.last_translated_keywords = translated_keywords
+                                st.session_state.last_time_range = {
+                                    "start_date": filter_start_date,
+                                    "end_date": filter_end_date,
+                                    "description": time_desc
+                                }
                                 
-                        except Exception as e2:
-                            # 如果搜索失败
-                            error_msg = f"❌ 搜索失败: {str(e2)}"
-                            st.subheader(lang["analysis_results"])
-                            st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
+                        except Exception:
+                            # 如果提取失败，使用传统方法
+                            st.warning("⚠️ ChatGPT提取失败，使用传统方法..." if st.session_state.language == "zh" else "⚠️ ChatGPT extraction failed, using traditional method...")
+                            
+                            # 使用传统方法提取关键词
+                            extracted_keywords, extracted_companies = extract_search_terms_from_prompt(custom_prompt, st.session_state.language)
+                            history_keywords, history_companies = extracted_keywords, extracted_companies
+                            
+                            # 显示提取的关键词
+                            st.markdown("**🔑 提取的关键词 / Extracted Keywords:**")
+                            keywords_display = ", ".join(extracted_keywords) if extracted_keywords else ("无" if st.session_state.language == "zh" else "None")
+                            st.markdown(f'<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">{keywords_display}</div>', unsafe_allow_html=True)
+                            
+                            # 使用默认时间范围
+                            current_date = datetime.now()
+                            filter_start_date = current_date - timedelta(days=180)  # 约6个月
+                            filter_end_date = current_date
+                            
+                            st.markdown("**⏰ 时间范围 / Time Range:**")
+                            st.markdown('<div style="background-color: #f0f2f6; padding: 10px; border-radius: 5px; margin: 5px 0;">最近6个月 / Last 6 months</div>', unsafe_allow_html=True)
                             
-                            st.session_state.last_custom_result = error_msg
-                            st.session_state.last_custom_prompt = custom_prompt
+                            try:
+                                news_results = search_baidu_news(extracted_keywords, extracted_companies, "custom", filter_start_date, filter_end_date, paginate=True, language=st.session_state.language)
+                                
+                                if news_results:
+                                    render_result = create_result_renderer()
+                                    final_result = analyze_news(news_results, extracted_keywords, extracted_companies, filter_start_date, filter_end_date, on_update=render_result)
+                                    
+                                    # 显示分析结果
+                                    render_result(final_result)
+                                    
+                                    # 保存结果到session state
+                                    st.session_state.last_custom_result = final_result
+                                    st.session_state.last_custom_prompt = custom_prompt
+                                else:
+                                    error_msg = "❌ 未找到相关新闻，请尝试调整搜索条件或时间范围。" if st.session_state.language == "zh" else "❌ No relevant news found, please try adjusting search conditions or time range."
+                                    st.subheader(lang["analysis_results"])
+                                    st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
+                                    
+                                    st.session_state.last_custom_result = error_msg
+                                    st.session_state.last_custom_prompt = custom_prompt
+                                    
+                            except Exception as e2:
+                                # 如果搜索失败
+                                error_msg = f"❌ 搜索失败: {str(e2)}"
+                                st.subheader(lang["analysis_results"])
+                                st.markdown(f'<div style="font-size: 18px;">{error_msg}</div>', unsafe_allow_html=True)
+                                
+                                st.session_state.last_custom_result = error_msg
+                                st.session_state.last_custom_prompt = custom_prompt
+                    
+                    # 添加到历史记录（附带执行追踪，与tab1一致）
+                    add_to_history(history_keywords, history_companies, "custom", st.session_state.last_custom_result, custom_prompt, trace)
+                    show_performance_panel(trace, "tab2")
         
         # 显示上次分析结果
         if 'last_custom_result' in st.session_state:
@@ -1757,11 +909,10 @@ def main():
     with tab3:
         st.header("📚 Search History" if st.session_state.language == "en" else "📚 搜索历史")
         
-        if st.session_state.search_history:
-            if 'selected_history_item' in st.session_state and st.session_state.selected_history_item:
+        if history_total:
+            history_item = get_history_entry(st.session_state.selected_history_id) if st.session_state.get('selected_history_id') else None
+            if history_item:
                 # 显示选中的历史记录详情
-                history_item = st.session_state.selected_history_item
-                
                 # 基本信息
                 st.subheader("📋 Historical Search Result Details" if st.session_state.language == "en" else "📋 Historical Search Result Details")
                 
@@ -1781,6 +932,9 @@ def main():
                 # 显示Prompt
                 with st.expander("📝 生成的Prompt" if st.session_state.language == "zh" else "📝 Generated Prompt", expanded=False):
                     st.markdown(f'<div style="font-size: 16px;">{history_item["prompt"]}</div>', unsafe_allow_html=True)
+                
+                # 显示该次搜索的执行追踪
+                show_performance_panel(history_item["trace"], f"history_{history_item['id']}")
             else:
                 st.info("请在侧边栏选择一条历史记录以查看详情" if st.session_state.language == "zh" else "Please select a history record in the sidebar to view details")
         else:
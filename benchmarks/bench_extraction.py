@@ -0,0 +1,97 @@
+"""正文提取微基准：对比原 BeautifulSoup + CSS选择器方案与 lxml 文本密度/站点规则方案
+
+用法：
+    python benchmarks/bench_extraction.py [HTML文件 ...] [--repeat N]
+
+未指定文件时使用生成的大型门户新闻页面。
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline
+
+LEGACY_SELECTORS = [
+    'article', '.article-content', '.content', '.news-content', '.post-content', '.entry-content',
+    'main', '.main-content', '#content', '.article-body', '.news-body'
+]
+
+def extract_with_beautifulsoup(content):
+    """原实现：完整构建 BeautifulSoup 树，依次尝试11个CSS选择器"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'lxml')
+    for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        script.decompose()
+    content_text = ""
+    for selector in LEGACY_SELECTORS:
+        elements = soup.select(selector)
+        if elements:
+            content_text = ' '.join([elem.get_text(strip=True) for elem in elements])
+            if len(content_text) > 100:
+                break
+    if not content_text or len(content_text) < 100:
+        body = soup.find('body')
+        if body:
+            content_text = body.get_text(strip=True)
+    return re.sub(r'\s+', ' ', content_text)
+
+def build_portal_page(paragraphs=40, nav_links=600, related_links=200):
+    """生成结构类似大型中文新闻门户的页面（大量导航、推荐链接和脚本，正文无常见class）"""
+    nav = "".join(f'<li><a href="/channel/{i}.html">频道{i}</a></li>' for i in range(nav_links))
+    related = "".join(f'<li><a href="/news/{i}.shtml">相关新闻标题{i}：矿业市场动态</a></li>' for i in range(related_links))
+    body = "".join(
+        f"<p>第{i}段：刚果（金）钴矿出口政策调整后，多家中国企业表示将加快在当地的加工产能建设，"
+        f"以应对关键矿产供应链的不确定性。业内人士指出，锂、镍等金属价格近期波动明显。</p>"
+        for i in range(paragraphs)
+    )
+    scripts = "<script>var x = 1;</script>" * 50
+    return f"""<html><head><meta charset="utf-8"><title>新闻</title>{scripts}</head><body>
+<div id="top"><ul>{nav}</ul></div>
+<div class="layout"><div class="left"><div class="main_text" id="detail_2025">{body}</div></div>
+<div class="right"><ul>{related}</ul></div></div>
+<div class="bottom">版权所有</div></body></html>""".encode("utf-8")
+
+def time_it(func, repeat):
+    """返回平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="要测试的HTML文件")
+    parser.add_argument("--repeat", type=int, default=20, help="每种方案的重复次数")
+    args = parser.parse_args()
+    
+    pages = [(path, open(path, "rb").read()) for path in args.files] or [("generated-portal", build_portal_page())]
+    
+    # 使用临时规则库，避免影响本地缓存
+    pipeline.EXTRACTION_RULES_PATH = os.path.join(tempfile.mkdtemp(), "extraction_rules.db")
+    
+    print(f"{'page':<24}{'size KB':>10}{'bs4 ms':>10}{'cold ms':>10}{'warm ms':>10}{'speedup':>10}")
+    for name, content in pages:
+        url = f"https://bench.example/{os.path.basename(name)}"
+        encoding = pipeline.detect_html_encoding(content)
+        
+        def cold():
+            pipeline.save_extraction_rule("bench.example", None)
+            pipeline.extract_main_content(content, url, encoding)
+        
+        legacy_ms = time_it(lambda: extract_with_beautifulsoup(content), args.repeat)
+        cold_ms = time_it(cold, args.repeat)
+        pipeline.extract_main_content(content, url, encoding)  # 学习站点规则
+        warm_ms = time_it(lambda: pipeline.extract_main_content(content, url, encoding), args.repeat)
+        print(f"{name[:23]:<24}{len(content) / 1024:>10.1f}{legacy_ms:>10.2f}{cold_ms:>10.2f}{warm_ms:>10.2f}{legacy_ms / warm_ms:>9.1f}x")
+        
+        legacy_text = extract_with_beautifulsoup(content)
+        new_text = pipeline.extract_main_content(content, url, encoding)
+        print(f"{'':<24}legacy chars={len(legacy_text)}  new chars={len(new_text)}  rule={pipeline.get_extraction_rule('bench.example')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""离线端到端基准：在本地桩服务上测量 搜索 → 抓取 → 分析 各阶段的耗时、吞吐量和内存
+
+使用 fixtures/ 下录制的百度新闻搜索结果和新闻网页样本，SerpApi 与 OpenAI 均由本地桩服务代替，
+无需任何API密钥。每个阶段都在全新的缓存目录下运行（冷缓存）。
+
+end_to_end_staged / end_to_end_pipelined 两行对比分阶段执行和流水线执行（搜索 → 抓取 → 分析）的总耗时，
+可用 --slow-site 模拟个别较慢的站点。
+模型调用默认使用与生产环境相同的每分钟token预算，相邻阶段在同一分钟内共享预算，
+后面的阶段可能因限流而变慢；用 --llm-tpm 可按账户等级调整。
+
+用法：
+    python benchmarks/bench_pipeline.py [--counts 10,50,100] [--llm-latency 0.5] [--llm-tps 80]
+                                        [--page-latency 0.05] [--slow-site www.stcn.com=3] [--stream]
+                                        [--no-memory] [--json out.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stubs  # noqa: E402
+import pipeline  # noqa: E402
+
+CACHE_PATH_NAMES = [
+    "SEARCH_CACHE_PATH", "ARTICLE_CACHE_PATH", "LLM_CACHE_PATH", "EXTRACTION_RULES_PATH",
+    "GLOSSARY_PATH", "PREFETCH_PATH", "HISTORY_PATH"
+]
+SEARCH_KEYWORDS = ["关键矿产", "锂", "钴"]
+MIN_MICRO_SECONDS = 0.2     # 微基准阶段至少累计运行的时间，避免计时误差
+
+def use_fresh_caches():
+    """将流水线的所有SQLite缓存指向新的临时目录，并清空进程内的规则缓存"""
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    for name in CACHE_PATH_NAMES:
+        setattr(pipeline, name, os.path.join(cache_dir, os.path.basename(getattr(pipeline, name))))
+    pipeline._extraction_rules = None
+    return cache_dir
+
+def measure(func, track_memory):
+    """运行一次 func，返回 (结果, 耗时秒, 峰值内存MiB或None)"""
+    use_fresh_caches()
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def repeat_until(func, min_seconds=MIN_MICRO_SECONDS):
+    """重复运行 func 直到累计时间超过 min_seconds，返回执行次数"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        runs += 1
+        if time.perf_counter() - start >= min_seconds:
+            return runs
+
+def run_stage(name, count, func, items, track_memory):
+    """计时一个阶段；需要内存数据时在全新缓存下再运行一次并启用 tracemalloc（避免影响计时）"""
+    result, elapsed, _ = measure(func, False)
+    peak = measure(func, True)[2] if track_memory else None
+    return result, {
+        "stage": name,
+        "results": count,
+        "items": items(result) if callable(items) else items,
+        "seconds": elapsed,
+        "items_per_second": (items(result) if callable(items) else items) / elapsed if elapsed else 0.0,
+        "peak_mib": peak
+    }
+
+def per_call(row, runs):
+    """将重复运行的微基准换算为单次处理全部条目的耗时和吞吐量"""
+    row["seconds"] /= runs
+    row["items_per_second"] = row["items"] / row["seconds"] if row["seconds"] else 0.0
+    return row
+
+def benchmark(count, args, page_servers):
+    """对给定结果数运行所有阶段，返回各阶段的统计"""
+    recorded = stubs.load_recorded_search()
+    results = stubs.expand_search_results(recorded, count, page_servers)
+    serpapi_stub = stubs.start_serpapi_stub(results, latency=args.search_latency)
+    rows = []
+    try:
+        from serpapi.serp_api_client import SerpApiClient
+        SerpApiClient.BACKEND = serpapi_stub.base_url
+
+        news, row = run_stage(
+            "search_baidu_news", count,
+            lambda: pipeline.search_baidu_news(SEARCH_KEYWORDS, [], "2_days", fan_out=False) or [],
+            len, args.memory
+        )
+        rows.append(row)
+
+        links = [item["link"] for item in news]
+        _, row = run_stage("scrape_web_content", count, lambda: pipeline.scrape_web_contents(links), len(links), args.memory)
+        rows.append(row)
+
+        dates = [item.get("date", "") for item in news]
+
+        def normalize_dates():
+            return repeat_until(lambda: [pipeline.normalize_publish_time(date) for date in dates])
+
+        runs, row = run_stage("normalize_publish_time", count, normalize_dates, len(dates), args.memory)
+        rows.append(per_call(row, runs))
+
+        def score_relevance():
+            return repeat_until(lambda: [pipeline.calculate_relevance_score(item, SEARCH_KEYWORDS, []) for item in news])
+
+        runs, row = run_stage("calculate_relevance_score", count, score_relevance, len(news), args.memory)
+        rows.append(per_call(row, runs))
+
+        today = datetime.date.today()
+        on_update = (lambda content: None) if args.stream else None
+
+        def analyze():
+            return pipeline.analyze_news_with_openai(
+                news, SEARCH_KEYWORDS, [], today - datetime.timedelta(days=3), today, on_update=on_update
+            )
+
+        analysis, row = run_stage(
+            "analyze_news_with_openai", count, analyze,
+            lambda analysis: analysis.count("**Title**"), args.memory
+        )
+        rows.append(row)
+        
+        for mode, pipelined in (("staged", False), ("pipelined", True)):
+            def end_to_end():
+                search_results = pipeline.search_baidu_news(SEARCH_KEYWORDS, [], "2_days", fan_out=False) or []
+                return pipeline.analyze_news_with_openai(
+                    search_results, SEARCH_KEYWORDS, [], today - datetime.timedelta(days=3), today,
+                    on_update=on_update, pipelined=pipelined
+                )
+            
+            _, row = run_stage(
+                f"end_to_end_{mode}", count, end_to_end,
+                lambda analysis: analysis.count("**Title**"), args.memory
+            )
+            rows.append(row)
+    finally:
+        serpapi_stub.stop()
+    return rows
+
+def print_rows(rows):
+    print(f"{'stage':<28}{'results':>8}{'items':>8}{'wall s':>11}{'items/s':>12}{'peak MiB':>10}")
+    for row in rows:
+        peak = f"{row['peak_mib']:.2f}" if row["peak_mib"] is not None else "-"
+        print(f"{row['stage']:<28}{row['results']:>8}{row['items']:>8}{row['seconds']:>11.4f}"
+              f"{row['items_per_second']:>12.1f}{peak:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", default="10,50,100", help="逗号分隔的搜索结果数")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="OpenAI桩服务首个token前的延迟（秒）")
+    parser.add_argument("--llm-tps", type=float, default=80.0, help="OpenAI桩服务的生成速度（token/秒）")
+    parser.add_argument("--llm-tpm", type=int, help="覆盖每分钟token预算（默认使用 LLM_TOKENS_PER_MINUTE，与生产环境的限流一致）")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="SerpApi桩服务的响应延迟（秒）")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="网页桩服务的响应延迟（秒）")
+    parser.add_argument("--slow-site", action="append", default=[], metavar="DOMAIN=SECONDS",
+                        help="为指定站点单独设置响应延迟，可重复指定")
+    parser.add_argument("--stream", action="store_true", help="以流式方式调用分析接口")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="不测量内存（减少一半运行时间）")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    site_latency = {domain: float(seconds) for domain, seconds in (value.split("=", 1) for value in args.slow_site)}
+    page_servers = stubs.start_page_servers(latency=args.page_latency, site_latency=site_latency)
+    openai_stub = stubs.start_openai_stub(latency=args.llm_latency, tokens_per_second=args.llm_tps)
+    os.environ["OPENAI_BASE_URL"] = f"{openai_stub.base_url}/v1"
+    pipeline.configure_api_keys(serpapi_api_key="offline-benchmark", openai_api_key="offline-benchmark")
+    if args.llm_tpm:
+        pipeline.LLM_TOKENS_PER_MINUTE = args.llm_tpm
+
+    all_rows = []
+    try:
+        for count in [int(value) for value in args.counts.split(",") if value.strip()]:
+            all_rows.extend(benchmark(count, args, page_servers))
+    finally:
+        openai_stub.stop()
+        for server in page_servers.values():
+            server.stop()
+
+    print_rows(all_rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_rows, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""离线基准测试使用的本地HTTP桩服务：新闻网页、SerpApi百度新闻接口、OpenAI兼容接口
+
+所有服务只监听 127.0.0.1，端口由系统分配，在后台线程中运行。
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+class StubServer:
+    """在后台线程中运行的 ThreadingHTTPServer"""
+
+    def __init__(self, handler_class):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """不输出访问日志的请求处理基类"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, content_type, body, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_page_servers(pages_dir=os.path.join(FIXTURES_DIR, "pages"), latency=0.0, site_latency=None):
+    """为每个站点的网页样本目录启动一个服务（不同端口即不同站点，便于测试按站点限流和规则缓存）
+
+    返回 {站点域名: 服务}，按请求路径的文件名返回该站点对应的样本页面。
+    site_latency 为 {站点域名: 延迟秒数}，用于模拟个别较慢的站点。
+    """
+    servers = {}
+    for domain in sorted(os.listdir(pages_dir)):
+        site_dir = os.path.join(pages_dir, domain)
+        if not os.path.isdir(site_dir):
+            continue
+        pages = {}
+        for filename in os.listdir(site_dir):
+            with open(os.path.join(site_dir, filename), "rb") as f:
+                pages[filename] = f.read()
+
+        class PageHandler(QuietHandler):
+            site_pages = pages
+            page_latency = (site_latency or {}).get(domain, latency)
+
+            def do_GET(self):
+                if self.page_latency:
+                    time.sleep(self.page_latency)
+                page = self.site_pages.get(os.path.basename(urlparse(self.path).path))
+                if page is None:
+                    self.send_body(404, "text/plain", b"not found")
+                    return
+                charset = "gbk" if b'charset="gb2312"' in page[:512] else "utf-8"
+                self.send_body(200, f"text/html; charset={charset}", page)
+
+        servers[domain] = StubServer(PageHandler).start()
+    return servers
+
+def load_recorded_search(path=os.path.join(FIXTURES_DIR, "serpapi", "baidu_news.json")):
+    """读取录制的 baidu_news 响应"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def expand_search_results(recorded, count, page_servers):
+    """将录制结果循环扩展到 count 条，并把链接改写到本地网页服务（保留站点和页面对应关系）"""
+    organic_results = recorded["organic_results"]
+    results = []
+    for i in range(count):
+        item = dict(organic_results[i % len(organic_results)])
+        link = urlparse(item["link"])
+        item["position"] = i + 1
+        item["link"] = f"{page_servers[link.netloc].base_url}{link.path}?n={i}"
+        results.append(item)
+    return results
+
+def start_serpapi_stub(results, latency=0.0):
+    """启动SerpApi桩服务：/search 未带 pn 时像录制响应一样返回全部结果，带 pn 时按 pn/num 分页返回"""
+
+    class SerpApiHandler(QuietHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            params = parse_qs(urlparse(self.path).query)
+            if "pn" in params:
+                offset = int(params["pn"][0])
+                page = results[offset:offset + int(params.get("num", ["10"])[0])]
+            else:
+                page = results
+            body = json.dumps({
+                "search_metadata": {"status": "Success"},
+                "search_parameters": {key: values[0] for key, values in params.items() if key != "api_key"},
+                "organic_results": page
+            }, ensure_ascii=False).encode("utf-8")
+            self.send_body(200, "application/json; charset=utf-8", body)
+
+    return StubServer(SerpApiHandler).start()
+
+def build_analysis_section(item):
+    """按分析Prompt要求的格式为一条新闻生成输出"""
+    fields = [
+        ("Title", item.get("title", "")),
+        ("Relevance", "0.80"),
+        ("Source", item.get("source", "")),
+        ("Source Link", item.get("link", "")),
+        ("Publish Time", item.get("date", "")),
+        ("Summary", item.get("snippet", "")),
+        ("Full Text", item.get("full_text", item.get("snippet", ""))[:600]),
+    ]
+    lines = [f'<span style="color: #ff0000; font-weight: bold;">**{name}**</span>: {value}' for name, value in fields]
+    return "\n\n".join(lines) + "\n\n---"
+
+def start_openai_stub(latency=0.5, tokens_per_second=80.0, chars_per_token=2.0):
+    """启动OpenAI兼容的 /v1/chat/completions 桩服务
+
+    latency 为首个token前的等待秒数，tokens_per_second 为生成速度；
+    分析请求按Prompt中每行一条的新闻JSON生成对应条数的输出，其余请求返回空的结构化结果。
+    """
+
+    class OpenAIHandler(QuietHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+            items = []
+            for line in prompt.splitlines():
+                if line.startswith('{"title"'):
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        pass
+            if items:
+                content = "\n\n".join(build_analysis_section(item) for item in items)
+            else:
+                content = json.dumps({
+                    "keywords": ["关键矿产"], "search_terms": ["关键矿产"], "time_description": "",
+                    "time_type": "none", "time_value": "", "explanation": "stub"
+                }, ensure_ascii=False)
+            completion_tokens = max(int(len(content) / chars_per_token), 1)
+            prompt_tokens = max(int(len(prompt) / chars_per_token), 1)
+
+            time.sleep(latency)
+            if request.get("stream"):
+                self.stream_content(request, content, completion_tokens)
+            else:
+                time.sleep(completion_tokens / tokens_per_second)
+                body = json.dumps({
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_body(200, "application/json", body)
+
+        def stream_content(self, request, content, completion_tokens):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            chunks = re.findall(r".{1,8}", content, re.DOTALL)
+            delay = completion_tokens / tokens_per_second / max(len(chunks), 1)
+            for chunk in chunks:
+                event = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                time.sleep(delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return StubServer(OpenAIHandler).start()
@@ -0,0 +1,3586 @@
+"""新闻检索与分析流水线（搜索 → 抓取 → 分析），不依赖Streamlit，可供批处理任务直接调用
+
+pandas、openai、lxml、serpapi 等较重的依赖在首次使用时才导入，以加快冷启动。
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import json
+import codecs
+import hashlib
+from datetime import datetime, timedelta
+import random
+import math
+from collections import deque
+import re
+import os
+import sys
+import sqlite3
+import zlib
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+import time
+import threading
+import itertools
+import functools
+import contextvars
+import asyncio
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+DEFAULT_LANGUAGE = "zh"  # 未指定语言时的默认界面语言
+
+# API密钥（默认读取环境变量，可通过 configure_api_keys 覆盖）
+SERPAPI_API_KEY = os.environ.get("SERPAPI_API_KEY")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
+def configure_api_keys(serpapi_api_key=None, openai_api_key=None):
+    """设置流水线使用的API密钥，未传入的密钥保持不变"""
+    global SERPAPI_API_KEY, OPENAI_API_KEY
+    if serpapi_api_key:
+        SERPAPI_API_KEY = serpapi_api_key
+    if openai_api_key:
+        OPENAI_API_KEY = openai_api_key
+
+# 执行追踪（各阶段耗时记录，可导出为JSON或OpenTelemetry OTLP/JSON格式）
+TRACE_SERVICE_NAME = "mineral-news"
+TRACE_SLOWEST_SPANS = 10            # 性能面板中列出的最慢步骤数
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+@contextmanager
+def start_trace(name, **attributes):
+    """开始一次追踪，期间调用的流水线函数都会记录耗时（含线程池中的任务）"""
+    trace = {
+        "trace_id": os.urandom(16).hex(),
+        "name": name,
+        "start_time": time.time(),
+        "end_time": None,
+        "attributes": attributes,
+        "spans": []
+    }
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace["end_time"] = time.time()
+
+def start_span(name, **attributes):
+    """在当前追踪中创建一个子步骤（不切换当前步骤），未开启追踪时返回None"""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    return {
+        "span_id": os.urandom(8).hex(),
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "start_time": time.time(),
+        "end_time": None,
+        "duration_ms": None,
+        "attributes": attributes,
+        "trace": trace
+    }
+
+def end_span(span, error=None):
+    """结束步骤并写入追踪记录"""
+    if span is None:
+        return
+    if error is not None:
+        span["attributes"]["error"] = str(error)
+    span["end_time"] = time.time()
+    span["duration_ms"] = round((span["end_time"] - span["start_time"]) * 1000, 2)
+    trace = span.pop("trace")
+    trace["spans"].append(span)
+
+@contextmanager
+def use_span(span):
+    """在代码块内将 span 设为当前步骤，其中创建的步骤都作为它的子步骤"""
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+@contextmanager
+def trace_span(name, **attributes):
+    """记录代码块的耗时；未开启追踪时几乎没有开销"""
+    span = start_span(name, **attributes)
+    if span is None:
+        yield None
+        return
+    try:
+        with use_span(span):
+            yield span
+    except BaseException as e:
+        end_span(span, e)
+        raise
+    end_span(span)
+
+def traced(name, **attributes):
+    """装饰器：将函数的每次调用记录为一个步骤"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_span_attributes(**attributes):
+    """为当前步骤补充属性（如缓存命中、token数），未开启追踪时忽略"""
+    span = _current_span.get()
+    if span is not None:
+        span["attributes"].update(attributes)
+
+def bind_trace_context(func):
+    """包装提交到线程池的函数，使其在调用方的追踪上下文中运行"""
+    context = contextvars.copy_context()
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # 每次调用使用独立的副本，同一上下文不能在多个线程中同时进入
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def summarize_trace(trace):
+    """按步骤名称汇总追踪记录：次数、总耗时、最长耗时，按首次出现的时间排序"""
+    stages = {}
+    for span in sorted(trace["spans"], key=lambda span: span["start_time"]):
+        stage = stages.setdefault(span["name"], {"stage": span["name"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        stage["count"] += 1
+        stage["total_ms"] = round(stage["total_ms"] + span["duration_ms"], 2)
+        stage["max_ms"] = max(stage["max_ms"], span["duration_ms"])
+        if "error" in span["attributes"]:
+            stage["errors"] += 1
+    return list(stages.values())
+
+def get_slowest_spans(trace, names=None, limit=TRACE_SLOWEST_SPANS):
+    """返回耗时最长的若干步骤（可按名称筛选），属性展开为列"""
+    spans = [span for span in trace["spans"] if names is None or span["name"] in names]
+    spans.sort(key=lambda span: span["duration_ms"], reverse=True)
+    return [{"name": span["name"], "duration_ms": span["duration_ms"], **span["attributes"]} for span in spans[:limit]]
+
+def trace_to_json(trace):
+    """将追踪记录序列化为JSON字符串"""
+    return json.dumps(trace, ensure_ascii=False, default=str)
+
+def _to_otlp_value(value):
+    """将属性值转换为OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def trace_to_otlp(trace):
+    """转换为OpenTelemetry OTLP/JSON格式（ExportTraceServiceRequest），可直接发送到OTLP/HTTP收集器"""
+    def to_nanos(timestamp):
+        return str(int(timestamp * 1_000_000_000))
+    
+    def to_attributes(attributes):
+        return [{"key": key, "value": _to_otlp_value(value)} for key, value in attributes.items() if value is not None]
+    
+    root_span_id = trace["trace_id"][:16]
+    spans = [{
+        "traceId": trace["trace_id"],
+        "spanId": root_span_id,
+        "name": trace["name"],
+        "kind": 1,
+        "startTimeUnixNano": to_nanos(trace["start_time"]),
+        "endTimeUnixNano": to_nanos(trace["end_time"] or trace["start_time"]),
+        "attributes": to_attributes(trace["attributes"]),
+        "status": {"code": 1}
+    }]
+    for span in trace["spans"]:
+        error = span["attributes"].get("error")
+        spans.append({
+            "traceId": trace["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span["parent_id"] or root_span_id,
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": to_nanos(span["start_time"]),
+            "endTimeUnixNano": to_nanos(span["end_time"]),
+            "attributes": to_attributes(span["attributes"]),
+            "status": {"code": 2, "message": str(error)} if error else {"code": 1}
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": to_attributes({"service.name": TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "pipeline"}, "spans": spans}]
+        }]
+    }
+
+# 简单的链接验证函数
+def validate_url(url):
+    """验证URL是否有效"""
+    if not url or url.strip() == "":
+        return False, "空链接"
+    
+    # 检查URL格式
+    try:
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            return False, "无效的URL格式"
+    except:
+        return False, "URL解析失败"
+    
+    # 检查是否是常见的无效链接模式
+    invalid_patterns = [
+        r'example\.com',
+        r'placeholder\.com',
+        r'test\.com',
+        r'sample\.com',
+        r'news\.cnstock\.com.*202508',  # 您提到的无效链接模式
+        r'www\.cs\.com\.cn.*202508'     # 您提到的无效链接模式
+    ]
+    
+    for pattern in invalid_patterns:
+        if re.search(pattern, url, re.IGNORECASE):
+            return False, "无效链接模式"
+    
+    return True, "链接格式有效"
+
+def process_and_validate_result(result, language=DEFAULT_LANGUAGE):
+    """后处理验证API返回结果中的链接"""
+    if not result or result.startswith("❌"):
+        return result
+    
+    # 检查是否包含明显的虚假链接模式
+    fake_patterns = [
+        r'content_\d{6,}\.html?',  # content_123456.html
+        r'/\d{10,}\.html?',        # /1234567890.html
+        r'0{8,}',                  # 连续8个或更多零
+        r'content_\d+\.htm',       # content_数字.htm
+        r'/202\d{1}/\d{8,}\.html', # /2025/12345678.html
+    ]
+    
+    contains_fake_link = False
+    for pattern in fake_patterns:
+        if re.search(pattern, result):
+            contains_fake_link = True
+            break
+    
+    if contains_fake_link:
+        # 如果检测到虚假链接，替换为警告信息
+        warning_msg = """
+⚠️ 检测到可能的虚假链接，系统无法提供真实可访问的新闻链接。
+
+可能的原因：
+1. 联网搜索功能未正常工作
+2. 搜索结果中没有包含有效的新闻链接
+3. 当前时间范围内缺少相关新闻
+
+建议：
+- 尝试调整关键词或时间范围
+- 稍后重试搜索
+- 联系技术支持检查联网搜索功能
+        """
+        
+        if language == "en":
+            warning_msg = """
+⚠️ Detected potentially fake links. The system cannot provide real accessible news links.
+
+Possible reasons:
+1. Web search functionality not working properly
+2. Search results contain no valid news links
+3. Lack of relevant news in current time range
+
+Suggestions:
+- Try adjusting keywords or time range
+- Retry search later
+- Contact technical support to check web search functionality
+            """
+        
+        return warning_msg
+    
+    return result
+
+
+# 中英文关键词映射
+KEYWORDS_MAPPING = {
+    "en": [
+        "Lithium", "Cobalt", "Nickel", "Graphite", "Manganese", "Copper", "Aluminum", "Zinc", "Gallium", "Germanium", 
+        "Rare Earth", "Tungsten", "Titanium", "Vanadium", "Antimony", "Beryllium", "Zirconium", "Tantalum", "Niobium",
+        "Arsenic", "Barite", "Bismuth", "Cerium", "Cesium", "Chromium", "Dysprosium", "Erbium", "Europium", "Fluorite", 
+        "Gadolinium", "Hafnium", "Holmium", "Indium", "Iridium", "Lanthanum", "Lutetium", "Magnesium", "Neodymium", 
+        "Palladium", "Platinum", "Praseodymium", "Rhodium", "Rubidium", "Ruthenium", "Samarium", "Scandium", "Tellurium", 
+        "Terbium", "Thulium", "Tin", "Ytterbium", "Yttrium", "China-US Critical Minerals", "Geopolitical Competition Critical Minerals",
+        "China-Africa Critical Minerals", "EU-China-Africa Geopolitical Competition", "Belt and Road Initiative, China and Africa", 
+        "Rare Earth US, China Rare Earth", "Rare Earth China-Africa", "EU-China-Africa Critical Minerals", 
+        "Refining Africa and China Critical Minerals", "China-Congo Cobalt Industry"
+    ],
+    "zh": [
+        "锂", "钴", "镍", "石墨", "锰", "铜", "铝", "锌", "镓", "锗", "稀土", "钨", "钛", "钒", "锑", "铍", "锆", "钽", "铌",
+        "砷", "重晶石", "铋", "铈", "铯", "铬", "镝", "铒", "铕", "萤石", "钆", "铪", "钬", "铟", "铱", "镧", "镥", "镁", 
+        "钕", "钯", "铂", "镨", "铑", "铷", "钌", "钐", "钪", "碲", "铽", "铥", "锡", "镱", "钇", "中美关键矿产", "地缘政治竞争的关键矿产",
+        "中非关键矿产", "欧盟、中国、非洲地缘政治竞争", "一带一路倡议,中国和非洲", "稀土美国，中国稀土", "稀土中国-非洲，稀土中非", 
+        "欧盟-中国-非洲关键矿产", "提炼非洲和中国的关键矿产", "中国-刚果钴业"
+    ]
+}
+
+# 中英文公司映射
+COMPANIES_MAPPING = {
+    "en": {
+        "CMOC China Molybdenum / Luoyang Molybdenum Industry": "Luoyang Molybdenum Group",
+        "Zijin": "Zijin Mining Group Co., Ltd.",
+        "Chengxin Lithium (Chengxin Lithium Group / Chengxin)": "Chengdu Chengxin Lithium Industry Co., Ltd.",
+        "Tsingshan Holding group": "Tsingshan Holding Group Co., Ltd.",
+        "Huayou Cobalt": "Zhejiang Huayou Cobalt Co., Ltd.",
+        "Sinomine Resources Group": "Sinomine Resources Group Co., Ltd.",
+        "Sinohydro Corporation": "Sinohydro Corporation",
+        "Sichuan Yahua Industrial Group": "Sichuan Yahua Industrial Group Co., Ltd.",
+        "Chinalco (Aluminum Corporation of China)": "Aluminum Corporation of China Limited",
+        "China Minmetals Corporation": "China Minmetals Corporation",
+        "China Hongqiao group": "China Hongqiao Group Limited",
+        "China Non Metals Mining Group": "China Nonferrous Metal Mining Group Co., Ltd.",
+        "Jiangxi Copper Company": "Jiangxi Copper Co., Ltd.",
+        "Baiyin Nonferrous Group (BNMC)": "Baiyin Nonferrous Group Co., Ltd.",
+        "Hunan Nonferrous Metals Group": "Hunan Nonferrous Metals Holding Group Co., Ltd.",
+        "Tibet Huayu Mining": "Tibet Huayu Mining Co., Ltd.",
+        "Ganfeng Lithium": "Ganfeng Lithium Co., Ltd.",
+        "Tibet Everest Resources": "Tibet Summit Resources Co., Ltd.",
+        "BYD": "BYD Co., Ltd.",
+        "Tianqi Lithium": "Tianqi Lithium Corporation",
+        "CATL": "Contemporary Amperex Technology Co., Limited"
+    },
+    "zh": {
+        "CMOC China Molybdenum / Luoyang Molybdenum Industry": "洛钼集团",
+        "Zijin": "紫金矿业集团股份有限公司",
+        "Chengxin Lithium (Chengxin Lithium Group / Chengxin)": "成都成鑫锂业股份有限公司",
+        "Tsingshan Holding group": "青山控股集团有限公司",
+        "Huayou Cobalt": "浙江华友钴业股份有限公司",
+        "Sinomine Resources Group": "中矿资源集团股份有限公司",
+        "Sinohydro Corporation": "中国水利水电建设集团公司",
+        "Sichuan Yahua Industrial Group": "四川雅化实业集团股份有限公司 (雅化集团)",
+        "Chinalco (Aluminum Corporation of China)": "中国铝业集团有限公司 (中国铝业 / 中铝)",
+        "China Minmetals Corporation": "中国五矿集团有限公司 (五矿集团)",
+        "China Hongqiao group": "中国宏桥集团有限公司",
+        "China Non Metals Mining Group": "中国有色矿业集团有限公司",
+        "Jiangxi Copper Company": "江西铜业集团有限公司 (江西铜业)",
+        "Baiyin Nonferrous Group (BNMC)": "白银有色集团股份有限公司 (白银有色)",
+        "Hunan Nonferrous Metals Group": "湖南有色金属控股集团有限公司 (湖南有色)",
+        "Tibet Huayu Mining": "西藏华钰矿业股份有限公司 (华钰矿业)",
+        "Ganfeng Lithium": "赣丰锂业",
+        "Tibet Everest Resources": "西藏珠峰资源股份有限公司",
+        "BYD": "比亚迪股份有限公司 (比亚迪)",
+        "Tianqi Lithium": "天齐锂业股份有限公司 (天齐锂业)",
+        "CATL": "宁德时代新能源科技股份有限公司 (宁德时代)"
+    }
+}
+
+
+# 本地缓存目录（SQLite持久化，跨会话共享）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+_db_connections = {}
+_db_lock = threading.Lock()
+
+def get_db_connection(path, schema=None):
+    """获取（并缓存）SQLite连接，供多线程共享使用；首次连接时执行建表语句"""
+    with _db_lock:
+        conn = _db_connections.get(path)
+        if conn is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if schema:
+                conn.executescript(schema)
+                conn.commit()
+            _db_connections[path] = conn
+        return conn
+
+def evict_lru_entries(conn, table, key_column, max_bytes):
+    """表内条目总大小超过上限时，按 last_accessed 淘汰最久未访问的条目（调用方持有锁）"""
+    total_size = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+    if total_size <= max_bytes:
+        return
+    # 淘汰到上限的90%，避免每次写入都触发淘汰
+    target_size = max_bytes * 0.9
+    for key, size in conn.execute(f"SELECT {key_column}, size FROM {table} ORDER BY last_accessed ASC").fetchall():
+        if total_size <= target_size:
+            break
+        conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+        total_size -= size
+
+# 搜索结果缓存配置（按时间选项设置有效期，节省SerpApi配额）
+SEARCH_CACHE_PATH = os.path.join(CACHE_DIR, "search_cache.db")
+SEARCH_CACHE_TTL_SECONDS = {
+    "2_days": 10 * 60,            # 最近2天：新闻更新快，缓存10分钟
+    "2_weeks": 60 * 60,           # 最近2周：缓存1小时
+    "custom": 60 * 60,            # 包含今天的自定义区间：缓存1小时
+    "custom_historical": 7 * 24 * 3600   # 完全在过去的自定义区间：结果基本不变，缓存7天
+}
+
+SEARCH_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    cache_key TEXT PRIMARY KEY,
+    results TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache(expires_at);
+"""
+
+def get_search_cache_ttl(time_option, custom_end_date=None):
+    """根据时间选项获取搜索缓存有效期（秒）"""
+    if time_option == "custom" and custom_end_date:
+        end_date = custom_end_date.date() if isinstance(custom_end_date, datetime) else custom_end_date
+        if end_date < datetime.now().date():
+            return SEARCH_CACHE_TTL_SECONDS["custom_historical"]
+    return SEARCH_CACHE_TTL_SECONDS.get(time_option, SEARCH_CACHE_TTL_SECONDS["2_days"])
+
+def make_search_cache_key(params):
+    """根据搜索参数（不含API密钥）生成缓存键"""
+    key_params = {k: v for k, v in params.items() if k != "api_key"}
+    return hashlib.sha256(json.dumps(key_params, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def get_cached_search(params):
+    """读取缓存的搜索结果，返回 (是否命中, 结果)"""
+    try:
+        conn = get_db_connection(SEARCH_CACHE_PATH, SEARCH_CACHE_SCHEMA)
+        with _db_lock:
+            row = conn.execute(
+                "SELECT results FROM search_cache WHERE cache_key = ? AND expires_at > ?",
+                (make_search_cache_key(params), time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Search cache read failed: {str(e)}")
+        return False, None
+
+def save_cached_search(params, results, ttl):
+    """写入搜索结果缓存，并清理过期条目"""
+    try:
+        conn = get_db_connection(SEARCH_CACHE_PATH, SEARCH_CACHE_SCHEMA)
+        now = time.time()
+        with _db_lock:
+            conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (cache_key, results, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (make_search_cache_key(params), json.dumps(results, ensure_ascii=False), now, now + ttl)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Search cache write failed: {str(e)}")
+
+# 分组并发搜索配置（选择较多时拆分为多个子查询并发执行）
+SEARCH_FANOUT_THRESHOLD = 6         # 搜索词超过该数量时自动启用分组搜索
+SEARCH_FANOUT_GROUP_SIZE = 3        # 每个子查询包含的搜索词数量
+SEARCH_FANOUT_MAX_WORKERS = 4       # 子查询最大并发数
+SEARCH_FANOUT_MAX_PAGES = 5         # 每个子查询最多翻页数（每页 SEARCH_PAGE_SIZE 条，结果早于时间窗口时提前停止）
+SERPAPI_MIN_INTERVAL_SECONDS = 0.25 # 相邻两次SerpApi请求的最小间隔（限速）
+SEARCH_MAX_RESULTS = 200            # 合并后保留的最大结果数
+
+_serpapi_rate_lock = threading.Lock()
+_serpapi_last_request = 0.0
+
+def wait_for_serpapi_slot():
+    """限速：确保相邻两次SerpApi请求之间至少间隔 SERPAPI_MIN_INTERVAL_SECONDS 秒"""
+    global _serpapi_last_request
+    with _serpapi_rate_lock:
+        wait_seconds = _serpapi_last_request + SERPAPI_MIN_INTERVAL_SECONDS - time.time()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        _serpapi_last_request = time.time()
+
+def build_search_terms(keywords, companies, language=DEFAULT_LANGUAGE):
+    """将关键词和公司转换为搜索词列表（预定义公司使用映射后的名称）"""
+    search_terms = []
+    
+    # 添加关键词
+    if keywords:
+        search_terms.extend(keywords)
+    
+    # 添加公司名称
+    if companies:
+        # 获取当前语言的公司映射
+        current_companies_mapping = COMPANIES_MAPPING[language]
+        for company in companies:
+            if company in current_companies_mapping:
+                # 使用预定义公司的中文名称进行搜索
+                search_terms.append(current_companies_mapping[company])
+            else:
+                # 使用自定义公司名称
+                search_terms.append(company)
+    
+    return search_terms
+
+def build_search_date_range(time_option, custom_start_date=None, custom_end_date=None):
+    """构建附加在查询后的时间范围字符串"""
+    current_date = datetime.now()
+    if time_option == "2_weeks":
+        start_date = current_date - timedelta(weeks=2)
+        return f" {start_date.strftime('%Y年%m月%d日')}..{current_date.strftime('%Y年%m月%d日')}"
+    elif time_option == "2_days":
+        start_date = current_date - timedelta(days=2)
+        return f" {start_date.strftime('%Y年%m月%d日')}..{current_date.strftime('%Y年%m月%d日')}"
+    elif time_option == "custom" and custom_start_date and custom_end_date:
+        return f" {custom_start_date.strftime('%Y年%m月%d日')}..{custom_end_date.strftime('%Y年%m月%d日')}"
+    else:
+        return ""
+
+@traced("serpapi.query")
+def run_baidu_news_query(final_query, cache_ttl, page_offset=0, page_size=8, api_key=None):
+    """执行单个百度新闻查询（优先使用缓存），返回原始结果列表或None"""
+    params = {
+        "engine": "baidu_news",
+        "q": final_query,
+        "api_key": api_key or SERPAPI_API_KEY,
+        "medium":1,
+        "rtt":4,
+        "num": page_size  # 默认获取前8条结果
+    }
+    if page_offset:
+        params["pn"] = page_offset  # 结果偏移量，用于翻页
+    
+    # 相同查询在有效期内直接使用缓存结果
+    hit, organic_results = get_cached_search(params)
+    set_span_attributes(query=final_query, page_offset=page_offset, cache_hit=hit)
+    if not hit:
+        wait_start = time.perf_counter()
+        wait_for_serpapi_slot()
+        request_start = time.perf_counter()
+        from serpapi import GoogleSearch
+        results = GoogleSearch(params).get_dict()
+        organic_results = results.get("organic_results") or None
+        set_span_attributes(
+            rate_limit_wait_ms=round((request_start - wait_start) * 1000, 2),
+            request_ms=round((time.perf_counter() - request_start) * 1000, 2)
+        )
+        # 接口报错（如密钥无效、配额不足）的结果不缓存
+        if "error" not in results or organic_results:
+            save_cached_search(params, organic_results, cache_ttl)
+        else:
+            set_span_attributes(error=results["error"])
+    
+    set_span_attributes(results=len(organic_results or []))
+    return organic_results
+
+# 分页搜索配置（自定义时间区间等需要更深结果集时使用）
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGES = 5
+
+def iter_baidu_news_pages(final_query, cache_ttl, window_start=None, max_pages=SEARCH_MAX_PAGES, api_key=None):
+    """逐页获取百度新闻结果的生成器
+
+    结果按时间倒序排列，当某一页最旧的新闻已早于 window_start 时停止翻页，
+    避免为注定被时间过滤掉的页面消耗配额。
+    """
+    window_start_date = window_start.date() if isinstance(window_start, datetime) else window_start
+    for page_index in range(max_pages):
+        page = run_baidu_news_query(final_query, cache_ttl, page_index * SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, api_key)
+        if not page:
+            return
+        yield page
+        
+        # 不足一页说明已经没有更多结果
+        if len(page) < SEARCH_PAGE_SIZE:
+            return
+        
+        # 本页最旧的新闻已超出时间窗口，后续页面只会更旧
+        if window_start_date:
+            page_dates = [d for d in normalize_publish_times([item.get('date', '') for item in page]) if d]
+            if page_dates and min(page_dates) < window_start_date:
+                return
+
+def merge_search_results(result_lists):
+    """合并多个子查询的结果，按链接和标题去重，记录每条结果被命中的子查询数"""
+    merged = []
+    seen = {}
+    for results in result_lists:
+        for item in results or []:
+            link_key = normalize_url(item['link']) if item.get('link') else None
+            title_key = re.sub(r'\W+', '', item.get('title', '')).lower() or None
+            existing = seen.get(link_key) if link_key else None
+            if existing is None and title_key:
+                existing = seen.get(title_key)
+            if existing is not None:
+                existing['query_hits'] += 1
+                continue
+            merged_item = item.copy()
+            merged_item['query_hits'] = 1
+            merged.append(merged_item)
+            for key in (link_key, title_key):
+                if key:
+                    seen[key] = merged_item
+    return merged
+
+def rank_search_results(results, keywords, companies, language=DEFAULT_LANGUAGE):
+    """按相关性评分和命中子查询数对合并结果排序（同分保持原顺序）"""
+    scores = score_news_batch(results, keywords, companies, language)
+    order = sorted(
+        range(len(results)),
+        key=lambda i: (-scores[i]["score"], -results[i].get('query_hits', 1))
+    )
+    return [results[i] for i in order]
+
+def run_grouped_queries(search_terms, date_range, cache_ttl, api_key=None, window_start=None):
+    """将搜索词按 SEARCH_FANOUT_GROUP_SIZE 分组并发查询，返回各子查询的结果列表
+
+    每个子查询逐页获取（最多 SEARCH_FANOUT_MAX_PAGES 页），各页结果按顺序拼接并去掉页间重复的链接，
+    使 merge_search_results 统计的 query_hits 仍是命中的子查询数。
+    """
+    groups = [
+        search_terms[i:i + SEARCH_FANOUT_GROUP_SIZE]
+        for i in range(0, len(search_terms), SEARCH_FANOUT_GROUP_SIZE)
+    ]
+    
+    def query_group(group):
+        pages = iter_baidu_news_pages(" OR ".join(group) + date_range, cache_ttl, window_start,
+                                      max_pages=SEARCH_FANOUT_MAX_PAGES, api_key=api_key)
+        results = {}
+        for page in pages:
+            for item in page:
+                results.setdefault(normalize_url(item['link']) if item.get('link') else id(item), item)
+        return list(results.values())
+    
+    with ThreadPoolExecutor(max_workers=min(SEARCH_FANOUT_MAX_WORKERS, len(groups))) as executor:
+        return list(executor.map(bind_trace_context(query_group), groups))
+
+@traced("search")
+def search_baidu_news(keywords, companies, time_option, custom_start_date=None, custom_end_date=None, fan_out=None, paginate=False,
+                      language=DEFAULT_LANGUAGE, api_key=None):
+    """使用SerpApi搜索百度新闻（第一步）
+
+    fan_out 为 None 时，搜索词超过 SEARCH_FANOUT_THRESHOLD 个则自动拆分为子查询并发搜索。
+    paginate 为 True 且未拆分子查询时，返回逐页获取结果的迭代器（首页已获取），
+    可直接传给 analyze_news_with_openai 逐页过滤。
+    api_key 未传入时使用 SERPAPI_API_KEY。
+    """
+    try:
+        # 构建搜索查询
+        search_terms = build_search_terms(keywords, companies, language)
+        date_range = build_search_date_range(time_option, custom_start_date, custom_end_date)
+        cache_ttl = get_search_cache_ttl(time_option, custom_end_date)
+        window_start = custom_start_date if time_option == "custom" else None
+        
+        # 预取存储中已有新鲜结果的搜索词直接使用，只为其余搜索词发起实时查询
+        if not paginate and search_terms and time_option in PREFETCH_MAX_AGE_SECONDS:
+            prefetched = {term: get_prefetched_results(term, time_option) for term in search_terms}
+            missing_terms = [term for term, results in prefetched.items() if results is None]
+            set_span_attributes(terms=len(search_terms), prefetched_terms=len(search_terms) - len(missing_terms))
+            if len(missing_terms) < len(search_terms):
+                result_lists = [results for results in prefetched.values() if results is not None]
+                if missing_terms:
+                    result_lists += run_grouped_queries(missing_terms, date_range, cache_ttl, api_key, window_start)
+                organic_results = merge_search_results(result_lists)
+                organic_results = rank_search_results(organic_results, keywords, companies, language)[:SEARCH_MAX_RESULTS]
+                return organic_results or None
+        
+        if fan_out is None:
+            fan_out = len(search_terms) > SEARCH_FANOUT_THRESHOLD
+        set_span_attributes(terms=len(search_terms), fan_out=fan_out, paginate=paginate)
+        
+        if not fan_out:
+            # 构建搜索查询字符串
+            query = " OR ".join(search_terms) if search_terms else "关键矿产"
+            if paginate:
+                pages = iter_baidu_news_pages(query + date_range, cache_ttl, window_start, api_key=api_key)
+                first_page = next(pages, None)
+                return itertools.chain([first_page], pages) if first_page else None
+            organic_results = run_baidu_news_query(query + date_range, cache_ttl, api_key=api_key)
+        else:
+            # 拆分为多个子查询并发执行，再合并去重排序
+            result_lists = run_grouped_queries(search_terms, date_range, cache_ttl, api_key, window_start)
+            organic_results = merge_search_results(result_lists)
+            organic_results = rank_search_results(organic_results, keywords, companies, language)[:SEARCH_MAX_RESULTS]
+        
+        # 处理搜索结果
+        if organic_results:
+            return organic_results  # 返回原始搜索结果
+        else:
+            return None  # 返回None表示未找到结果
+            
+    except Exception as e:
+        raise Exception(f"搜索失败: {str(e)}")
+
+# 关注列表后台预取配置（定期为预定义关键词和公司执行搜索和抓取，交互查询优先使用预取结果）
+PREFETCH_PATH = os.path.join(CACHE_DIR, "prefetch.db")
+PREFETCH_INTERVAL_SECONDS = {
+    "2_days": 25 * 60,            # 最近2天：每25分钟预取一次（两轮轮完关注列表，留出余量）
+    "2_weeks": 150 * 60           # 最近2周：每2.5小时预取一次
+}
+PREFETCH_MAX_AGE_SECONDS = {
+    "2_days": 60 * 60,            # 预取结果超过该时间后不再直接使用，改为实时查询
+    "2_weeks": 6 * 3600
+}
+PREFETCH_MAX_WORKERS = 4            # 预取搜索的并发数（仍受SerpApi限速约束）
+PREFETCH_POLL_SECONDS = 60          # 调度线程检查是否到期的间隔
+PREFETCH_SWEEP_MARGIN_SECONDS = 10 * 60     # 轮完关注列表的时间比最长有效期至少提前的余量（轮询延迟、查询耗时）
+PREFETCH_DAILY_QUERY_BUDGET = None # 每天预取最多消耗的SerpApi查询数，None 时按关注列表大小和预取间隔计算
+PREFETCH_SCRAPE_CHUNK_SIZE = 50     # 预取抓取每批的链接数
+PREFETCH_SCRAPE_DEADLINE_SECONDS = 300  # 每批抓取的总时限（后台任务不受交互时限约束）
+PREFETCH_FAILURE_BACKOFF_SECONDS = 5 * 60   # 预取失败后的首次重试等待，之后每次失败加倍（不超过预取间隔）
+
+PREFETCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefetched_results (
+    term TEXT NOT NULL,
+    time_option TEXT NOT NULL,
+    results TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (term, time_option)
+);
+CREATE TABLE IF NOT EXISTS prefetch_runs (
+    time_option TEXT PRIMARY KEY,
+    completed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prefetch_quota (
+    day TEXT PRIMARY KEY,
+    queries INTEGER NOT NULL
+);
+"""
+
+_prefetch_thread = None
+_prefetch_stop = threading.Event()
+_prefetch_thread_lock = threading.Lock()
+
+def build_watchlist_aliases():
+    """英文关键词和公司搜索名称 → 对应的中文搜索词，两种语言的同一搜索词只预取一次"""
+    aliases = dict(zip(KEYWORDS_MAPPING["en"], KEYWORDS_MAPPING["zh"]))
+    for company, en_name in COMPANIES_MAPPING["en"].items():
+        aliases[en_name] = COMPANIES_MAPPING["zh"].get(company, en_name)
+    return {en_term: zh_term for en_term, zh_term in aliases.items() if en_term != zh_term}
+
+WATCHLIST_ALIASES = build_watchlist_aliases()
+
+def get_prefetch_term(term):
+    """获取搜索词在预取存储中对应的搜索词（英文搜索词使用对应的中文搜索词）"""
+    return WATCHLIST_ALIASES.get(term, term)
+
+def get_watchlist_terms():
+    """获取需要预取的搜索词：预定义关键词和公司的中文搜索名称（英文搜索词映射到相同的中文搜索词）"""
+    terms = list(KEYWORDS_MAPPING["zh"]) + list(COMPANIES_MAPPING["zh"].values())
+    return list(dict.fromkeys(get_prefetch_term(term) for term in terms))
+
+def get_prefetched_results(term, time_option):
+    """读取搜索词的预取结果，未预取或已过期返回None"""
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            row = conn.execute(
+                "SELECT results FROM prefetched_results WHERE term = ? AND time_option = ? AND fetched_at > ?",
+                (get_prefetch_term(term), time_option, time.time() - PREFETCH_MAX_AGE_SECONDS[time_option])
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Prefetch store read failed: {str(e)}")
+        return None
+
+def save_prefetched_results(term, time_option, results):
+    """写入搜索词的预取结果"""
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO prefetched_results (term, time_option, results, fetched_at) VALUES (?, ?, ?, ?)",
+                (get_prefetch_term(term), time_option, json.dumps(results, ensure_ascii=False), time.time())
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Prefetch store write failed: {str(e)}")
+
+def get_last_prefetch_time(time_option):
+    """获取某个时间选项最近一次完成预取的时间戳，从未预取返回0"""
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            row = conn.execute("SELECT completed_at FROM prefetch_runs WHERE time_option = ?", (time_option,)).fetchone()
+        return row[0] if row else 0.0
+    except sqlite3.Error:
+        return 0.0
+
+def select_stale_terms(terms, time_option, limit):
+    """按预取时间从旧到新（未预取的最先）选出最多 limit 个搜索词，多轮预取轮流覆盖整个关注列表"""
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            fetched_at = dict(conn.execute(
+                "SELECT term, fetched_at FROM prefetched_results WHERE time_option = ?", (time_option,)
+            ).fetchall())
+    except sqlite3.Error:
+        fetched_at = {}
+    return sorted(terms, key=lambda term: fetched_at.get(term, 0.0))[:max(limit, 0)]
+
+def get_prefetch_cycle_size(term_count, time_option):
+    """每轮查询的搜索词数：保证在 PREFETCH_MAX_AGE_SECONDS 内轮完整个关注列表，预取结果不会在刷新前过期"""
+    usable_age = PREFETCH_MAX_AGE_SECONDS[time_option] - PREFETCH_SWEEP_MARGIN_SECONDS
+    cycles_per_sweep = max(usable_age // PREFETCH_INTERVAL_SECONDS[time_option], 1)
+    return math.ceil(term_count / cycles_per_sweep)
+
+def get_prefetch_daily_budget(term_count, time_options=tuple(PREFETCH_INTERVAL_SECONDS)):
+    """每日查询预算：未设置 PREFETCH_DAILY_QUERY_BUDGET 时取按预取计划每天需要的查询数"""
+    if PREFETCH_DAILY_QUERY_BUDGET is not None:
+        return PREFETCH_DAILY_QUERY_BUDGET
+    return sum(
+        get_prefetch_cycle_size(term_count, time_option) * math.ceil(24 * 3600 / PREFETCH_INTERVAL_SECONDS[time_option])
+        for time_option in time_options
+    )
+
+def reserve_prefetch_queries(count, daily_budget):
+    """从当天的预取查询预算中预留最多 count 次查询，返回实际可用的次数"""
+    day = datetime.now().strftime("%Y-%m-%d")
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            row = conn.execute("SELECT queries FROM prefetch_quota WHERE day = ?", (day,)).fetchone()
+            used = row[0] if row else 0
+            granted = max(min(count, daily_budget - used), 0)
+            conn.execute("DELETE FROM prefetch_quota WHERE day != ?", (day,))
+            conn.execute("INSERT OR REPLACE INTO prefetch_quota (day, queries) VALUES (?, ?)", (day, used + granted))
+            conn.commit()
+        return granted
+    except sqlite3.Error as e:
+        print(f"Prefetch store write failed: {str(e)}")
+        return 0
+
+def run_prefetch_cycle(time_option, terms=None, api_key=None, stop_event=None):
+    """为关注列表执行一轮预取：逐个搜索词查询并保存结果，再分批抓取结果链接写入文章缓存
+
+    每轮查询预取结果最旧的 get_prefetch_cycle_size 个搜索词，并受每日查询预算约束；预算用尽时不查询，
+    也不记录本轮完成，下次轮询时再试。
+    文章缓存中已有的内容不会重复下载，因此每轮只抓取新增的链接。返回统计信息。
+    """
+    terms = list(dict.fromkeys(get_prefetch_term(term) for term in (terms or get_watchlist_terms())))
+    selected_terms = select_stale_terms(terms, time_option, get_prefetch_cycle_size(len(terms), time_option))
+    selected_terms = selected_terms[:reserve_prefetch_queries(len(selected_terms), get_prefetch_daily_budget(len(terms)))]
+    if not selected_terms:
+        return {"terms": len(terms), "queried": 0, "results": 0, "links": 0, "scraped": 0}
+    
+    date_range = build_search_date_range(time_option)
+    cache_ttl = get_search_cache_ttl(time_option)
+    
+    def fetch(term):
+        results = run_baidu_news_query(term + date_range, cache_ttl, page_size=SEARCH_PAGE_SIZE, api_key=api_key)
+        if results is not None:
+            save_prefetched_results(term, time_option, results)
+        return results or []
+    
+    with ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS) as executor:
+        result_lists = list(executor.map(fetch, selected_terms))
+    
+    links = list(dict.fromkeys(
+        item['link'] for results in result_lists for item in results
+        if item.get('link') and validate_url(item['link'])[0]
+    ))
+    new_links = [link for link in links if not (get_cached_article(link) or {}).get("fresh")]
+    # 分批抓取，每批单独计时，避免交互查询的总时限截断后台预取
+    scraped = 0
+    for i in range(0, len(new_links), PREFETCH_SCRAPE_CHUNK_SIZE):
+        if stop_event is not None and stop_event.is_set():
+            break
+        chunk = new_links[i:i + PREFETCH_SCRAPE_CHUNK_SIZE]
+        scrape_web_contents(chunk, deadline=PREFETCH_SCRAPE_DEADLINE_SECONDS)
+        scraped += len(chunk)
+    
+    try:
+        conn = get_db_connection(PREFETCH_PATH, PREFETCH_SCHEMA)
+        with _db_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO prefetch_runs (time_option, completed_at) VALUES (?, ?)",
+                (time_option, time.time())
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Prefetch store write failed: {str(e)}")
+    
+    return {
+        "terms": len(terms),
+        "queried": len(selected_terms),
+        "results": sum(len(results) for results in result_lists),
+        "links": len(links),
+        "scraped": scraped
+    }
+
+def get_prefetch_retry_delay(failures, time_option):
+    """连续失败 failures 次后的重试等待：从 PREFETCH_FAILURE_BACKOFF_SECONDS 起每次加倍，不超过预取间隔"""
+    return min(PREFETCH_FAILURE_BACKOFF_SECONDS * 2 ** (failures - 1), PREFETCH_INTERVAL_SECONDS[time_option])
+
+def run_prefetch_loop(time_options=tuple(PREFETCH_INTERVAL_SECONDS), stop_event=None, api_key=None):
+    """按 PREFETCH_INTERVAL_SECONDS 定期执行预取，直到 stop_event 被设置
+
+    某轮预取失败时记录失败时间，按指数退避延后重试，避免每次轮询都重新消耗配额。
+    """
+    stop_event = stop_event or threading.Event()
+    failures = {}       # 时间选项 → (连续失败次数, 最近失败时间)
+    while not stop_event.is_set():
+        for time_option in time_options:
+            if time.time() - get_last_prefetch_time(time_option) < PREFETCH_INTERVAL_SECONDS[time_option]:
+                continue
+            failure_count, failed_at = failures.get(time_option, (0, 0.0))
+            if failure_count and time.time() - failed_at < get_prefetch_retry_delay(failure_count, time_option):
+                continue
+            try:
+                stats = run_prefetch_cycle(time_option, api_key=api_key, stop_event=stop_event)
+                failures.pop(time_option, None)
+                print(f"Prefetch {time_option} finished: {stats}")
+            except Exception as e:
+                failures[time_option] = (failure_count + 1, time.time())
+                print(f"Prefetch {time_option} failed: {str(e)}")
+            if stop_event.is_set():
+                return
+        stop_event.wait(PREFETCH_POLL_SECONDS)
+
+def start_prefetch_scheduler(time_options=tuple(PREFETCH_INTERVAL_SECONDS), api_key=None):
+    """在后台守护线程中启动预取调度（进程内只启动一次）"""
+    global _prefetch_thread
+    with _prefetch_thread_lock:
+        if _prefetch_thread is None or not _prefetch_thread.is_alive():
+            _prefetch_stop.clear()
+            _prefetch_thread = threading.Thread(
+                target=run_prefetch_loop, args=(time_options, _prefetch_stop, api_key),
+                name="watchlist-prefetch", daemon=True
+            )
+            _prefetch_thread.start()
+        return _prefetch_thread
+
+def stop_prefetch_scheduler():
+    """通知后台预取线程在当前搜索词完成后退出"""
+    _prefetch_stop.set()
+
+# 文章内容缓存配置（SQLite持久化，跨会话共享）
+ARTICLE_CACHE_PATH = os.path.join(CACHE_DIR, "article_cache.db")
+ARTICLE_CACHE_TTL_SECONDS = 6 * 3600               # 在此时间内直接使用缓存，超过后发起条件请求
+ARTICLE_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600     # 超过此时间的缓存直接删除
+ARTICLE_CACHE_MAX_BYTES = 50 * 1024 * 1024         # 缓存总大小上限，超过后按LRU淘汰
+
+# 跟踪参数，规范化URL时移除
+TRACKING_QUERY_PARAMS = {"spm", "share_token", "wfr", "isappinstalled"}
+
+def normalize_url(url):
+    """规范化URL作为缓存键：小写协议和域名，去掉默认端口、锚点和跟踪参数，并排序查询参数"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_QUERY_PARAMS
+    )
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, urlencode(query), ""))
+
+ARTICLE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS article_cache (
+    url_key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_article_cache_accessed ON article_cache(last_accessed);
+"""
+
+def _get_article_cache():
+    """获取文章缓存数据库连接"""
+    return get_db_connection(ARTICLE_CACHE_PATH, ARTICLE_CACHE_SCHEMA)
+
+def get_cached_article(url):
+    """读取缓存的文章内容，返回包含content/etag/last_modified/fresh的字典，未命中返回None"""
+    try:
+        conn = _get_article_cache()
+        url_key = normalize_url(url)
+        now = time.time()
+        with _db_lock:
+            row = conn.execute(
+                "SELECT content, etag, last_modified, fetched_at FROM article_cache WHERE url_key = ?",
+                (url_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[3] > ARTICLE_CACHE_MAX_AGE_SECONDS:
+                conn.execute("DELETE FROM article_cache WHERE url_key = ?", (url_key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE article_cache SET last_accessed = ? WHERE url_key = ?", (now, url_key))
+            conn.commit()
+        return {
+            "content": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "fresh": now - row[3] <= ARTICLE_CACHE_TTL_SECONDS
+        }
+    except sqlite3.Error as e:
+        print(f"Article cache read failed: {str(e)}")
+        return None
+
+def save_cached_article(url, content, etag=None, last_modified=None):
+    """写入文章缓存，并在超过大小上限时按最近访问时间淘汰"""
+    try:
+        conn = _get_article_cache()
+        now = time.time()
+        with _db_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO article_cache (url_key, content, etag, last_modified, fetched_at, last_accessed, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), content, etag, last_modified, now, now, len(content.encode("utf-8")))
+            )
+            _evict_article_cache(conn, now)
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Article cache write failed: {str(e)}")
+
+def refresh_cached_article(url):
+    """条件请求返回304时刷新缓存的抓取时间"""
+    try:
+        conn = _get_article_cache()
+        now = time.time()
+        with _db_lock:
+            conn.execute(
+                "UPDATE article_cache SET fetched_at = ?, last_accessed = ? WHERE url_key = ?",
+                (now, now, normalize_url(url))
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Article cache refresh failed: {str(e)}")
+
+def _evict_article_cache(conn, now):
+    """删除过期缓存，并在总大小超过上限时淘汰最久未访问的条目（调用方持有锁）"""
+    conn.execute("DELETE FROM article_cache WHERE fetched_at < ?", (now - ARTICLE_CACHE_MAX_AGE_SECONDS,))
+    evict_lru_entries(conn, "article_cache", "url_key", ARTICLE_CACHE_MAX_BYTES)
+
+# 共享HTTP会话配置（连接池复用，跨文章保持keep-alive）
+HTTP_POOL_CONNECTIONS = 20      # 缓存连接池的站点数
+HTTP_POOL_MAXSIZE = 10          # 每个站点保持的最大连接数
+HTTP_MAX_RETRIES = 2            # 连接错误和5xx/429响应的重试次数
+HTTP_BACKOFF_FACTOR = 0.5       # 重试退避系数（0.5s, 1s, ...）
+HTTP_TIMEOUT = (5, 10)          # (连接超时, 读取超时)
+SCRAPE_MAX_CHARS = 20000        # 抓取正文保留的最大字符数
+SCRAPE_MAX_BYTES = 1024 * 1024  # 每个网页最多读取的字节数（解压后），超出部分不再下载
+SCRAPE_CHUNK_SIZE = 64 * 1024   # 流式读取的块大小
+SCRAPE_HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# 仅在安装了brotli解码库时声明支持br压缩，否则无法解码响应内容
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def read_limited_body(response, max_bytes=SCRAPE_MAX_BYTES):
+    """流式读取响应正文，达到字节上限后停止读取并丢弃剩余部分"""
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(chunk_size=SCRAPE_CHUNK_SIZE):
+        chunks.append(chunk)
+        received += len(chunk)
+        if received >= max_bytes:
+            break
+    return b"".join(chunks)[:max_bytes]
+
+def get_http_session():
+    """获取进程内共享的HTTP会话，重试和退避由传输适配器处理"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.headers.update(SCRAPE_HEADERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+# 正文提取配置（lxml解析，按站点缓存命中的正文节点规则）
+EXTRACTION_RULES_PATH = os.path.join(CACHE_DIR, "extraction_rules.db")
+EXTRACT_MIN_CHARS = 100             # 正文最少字符数，不足时回退到 body 全文
+EXTRACT_MAX_LINK_DENSITY = 0.5      # 链接文字占比超过该值的节点视为导航/列表
+EXTRACT_STRIP_TAGS = ("script", "style", "noscript", "nav", "footer", "header", "aside", "iframe", "form")
+EXTRACT_PARAGRAPH_TAGS = ("p", "pre", "td", "div", "section", "article")
+
+EXTRACTION_RULES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_rules (
+    domain TEXT PRIMARY KEY,
+    rule TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?\s*([\w-]+)', re.IGNORECASE)
+TEXT_PUNCTUATION_PATTERN = re.compile(r'[，。；！？,.;!?]')
+
+_extraction_rules = None
+_extraction_rules_lock = threading.Lock()
+
+def normalize_charset(charset):
+    """规范化编码名称：GB2312/GBK 按其超集 GB18030 解码，避免生僻字乱码"""
+    charset = charset.strip().lower()
+    return "gb18030" if charset in ("gb2312", "gbk", "x-gbk") else charset
+
+def detect_html_encoding(content, content_type=""):
+    """确定HTML编码：优先使用响应头，其次是 <meta charset>，都没有时尝试UTF-8，失败则按GB18030处理"""
+    header_charset = re.search(r'charset=([\w-]+)', content_type or "", re.IGNORECASE)
+    if header_charset:
+        return normalize_charset(header_charset.group(1))
+    meta_charset = META_CHARSET_PATTERN.search(content[:4096])
+    if meta_charset:
+        return normalize_charset(meta_charset.group(1).decode("ascii", "ignore"))
+    try:
+        # 内容可能在多字节字符中间被截断，使用增量解码器忽略末尾不完整的字符
+        codecs.getincrementaldecoder("utf-8")().decode(content, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+def _load_extraction_rules():
+    """加载（并缓存在内存中）各站点的正文节点规则"""
+    global _extraction_rules
+    with _extraction_rules_lock:
+        if _extraction_rules is None:
+            try:
+                conn = get_db_connection(EXTRACTION_RULES_PATH, EXTRACTION_RULES_SCHEMA)
+                with _db_lock:
+                    _extraction_rules = dict(conn.execute("SELECT domain, rule FROM extraction_rules").fetchall())
+            except sqlite3.Error as e:
+                print(f"Extraction rule load failed: {str(e)}")
+                _extraction_rules = {}
+        return _extraction_rules
+
+def get_extraction_rule(domain):
+    """获取站点已学习的正文节点规则（XPath），没有返回None"""
+    return _load_extraction_rules().get(domain)
+
+def save_extraction_rule(domain, rule):
+    """记录站点命中的正文节点规则"""
+    rules = _load_extraction_rules()
+    with _extraction_rules_lock:
+        if rule is None:
+            rules.pop(domain, None)
+        else:
+            rules[domain] = rule
+    try:
+        conn = get_db_connection(EXTRACTION_RULES_PATH, EXTRACTION_RULES_SCHEMA)
+        with _db_lock:
+            if rule is None:
+                conn.execute("DELETE FROM extraction_rules WHERE domain = ?", (domain,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extraction_rules (domain, rule, updated_at) VALUES (?, ?, ?)",
+                    (domain, rule, time.time())
+                )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Extraction rule write failed: {str(e)}")
+
+def get_link_density(node, text_length):
+    """计算节点内链接文字占全部文字的比例"""
+    if not text_length:
+        return 1.0
+    link_length = sum(len(link.text_content()) for link in node.iter("a"))
+    return min(link_length / text_length, 1.0)
+
+def build_node_rule(node):
+    """为正文节点生成可在同站点其他页面复用的XPath规则（优先 id，其次 class，最后是节点路径）"""
+    node_id = node.get("id")
+    if node_id and '"' not in node_id and not re.search(r'\d{4,}', node_id):
+        return f'//{node.tag}[@id="{node_id}"]'
+    node_class = " ".join((node.get("class") or "").split())
+    if node_class and '"' not in node_class:
+        return f'//{node.tag}[normalize-space(@class)="{node_class}"]'
+    return node.getroottree().getpath(node)
+
+def find_content_node(tree):
+    """按文本密度为候选节点评分，返回最可能是正文的节点
+
+    每个段落按长度和标点数计分，分数累加到父节点（祖父节点计一半），
+    最后乘以 (1 - 链接密度) 以排除导航和相关链接列表。
+    """
+    scores = {}
+    for node in tree.iter(*EXTRACT_PARAGRAPH_TAGS):
+        if node.tag in ("p", "pre", "td"):
+            text = node.text_content()
+        else:
+            # div/section 等只统计直接包含的文字（如用 <br> 分段的正文）
+            text = (node.text or "") + "".join(child.tail or "" for child in node)
+        text = text.strip()
+        if len(text) < 20:
+            continue
+        score = 1 + min(len(text) / 100, 3) + len(TEXT_PUNCTUATION_PATTERN.findall(text))
+        parent = node if node.tag not in ("p", "pre", "td") else node.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+    
+    best_node, best_score = None, 0
+    for node, score in scores.items():
+        score *= 1 - get_link_density(node, len(node.text_content()))
+        if score > best_score:
+            best_node, best_score = node, score
+    return best_node
+
+def extract_main_content(content, url="", encoding=None):
+    """从HTML中提取正文文本
+
+    先尝试该站点已学习的节点规则，规则失效或没有规则时按文本密度评分选取正文节点并更新规则；
+    都找不到足够长的正文时使用 body 全文。
+    """
+    from lxml import etree, html as lxml_html
+    
+    if not content:
+        return ""
+    parser = lxml_html.HTMLParser(encoding=encoding, remove_comments=True)
+    try:
+        tree = lxml_html.fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError, LookupError):
+        tree = lxml_html.fromstring(content)
+    etree.strip_elements(tree, *EXTRACT_STRIP_TAGS, with_tail=False)
+    
+    domain = urlparse(url).netloc.lower()
+    rule = get_extraction_rule(domain) if domain else None
+    
+    # 快速路径：直接使用站点规则定位正文节点
+    if rule:
+        try:
+            nodes = tree.xpath(rule)
+        except etree.XPathError:
+            nodes = []
+        content_text = " ".join(node.text_content() for node in nodes)
+        if (len(content_text.strip()) >= EXTRACT_MIN_CHARS
+                and get_link_density(nodes[0], len(nodes[0].text_content())) < EXTRACT_MAX_LINK_DENSITY):
+            return re.sub(r'\s+', ' ', content_text).strip()
+    
+    # 文本密度评分，并记录命中的规则供后续页面使用
+    node = find_content_node(tree)
+    content_text = node.text_content() if node is not None else ""
+    if len(content_text.strip()) >= EXTRACT_MIN_CHARS:
+        if domain:
+            new_rule = build_node_rule(node)
+            if new_rule != rule:
+                save_extraction_rule(domain, new_rule)
+        return re.sub(r'\s+', ' ', content_text).strip()
+    
+    # 如果没有找到正文区域，获取body内容
+    body = tree.find(".//body")
+    content_text = (body if body is not None else tree).text_content()
+    return re.sub(r'\s+', ' ', content_text).strip()
+
+def scrape_web_content(url):
+    """抓取网页内容"""
+    try:
+        headers = {}
+        
+        # 优先使用缓存：未过期直接返回，已过期则发起条件请求
+        cached = get_cached_article(url)
+        if cached:
+            if cached["fresh"]:
+                set_span_attributes(cache="fresh")
+                return cached["content"]
+            if cached["etag"]:
+                headers['If-None-Match'] = cached["etag"]
+            if cached["last_modified"]:
+                headers['If-Modified-Since'] = cached["last_modified"]
+        
+        try:
+            # 以流式方式发送请求（连接复用和重试由共享会话负责），先根据响应头决定是否读取正文
+            request_start = time.perf_counter()
+            with get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT, stream=True) as response:
+                # 收到响应头的耗时（含DNS解析、建立连接和服务器处理）
+                set_span_attributes(
+                    cache="revalidate" if cached else "miss",
+                    status_code=response.status_code,
+                    response_ms=round((time.perf_counter() - request_start) * 1000, 2)
+                )
+                # 内容未变化，继续使用缓存
+                if response.status_code == 304 and cached:
+                    refresh_cached_article(url)
+                    return cached["content"]
+                
+                response.raise_for_status()
+                
+                # 检查响应内容类型（PDF、图片等直接放弃，不下载正文）
+                content_type = response.headers.get('content-type', '').lower()
+                if not any(html_type in content_type for html_type in SCRAPE_HTML_CONTENT_TYPES):
+                    return f"❌ 无法获取HTML内容，内容类型: {content_type}"
+                
+                download_start = time.perf_counter()
+                content = read_limited_body(response)
+                set_span_attributes(
+                    bytes=len(content),
+                    download_ms=round((time.perf_counter() - download_start) * 1000, 2)
+                )
+        except requests.exceptions.RequestException as e:
+            return f"❌ 网络请求失败: {str(e)}"
+        
+        try:
+            # 提取正文（lxml解析 + 站点规则缓存/文本密度评分；截断的HTML由lxml容错解析）
+            parse_start = time.perf_counter()
+            content_text = extract_main_content(content, url, detect_html_encoding(content, content_type))
+            set_span_attributes(parse_ms=round((time.perf_counter() - parse_start) * 1000, 2))
+            
+            # 清理文本
+            if content_text:
+                # 限制长度（避免过长的内容，发送给模型前还会按token预算精简）
+                if len(content_text) > SCRAPE_MAX_CHARS:
+                    content_text = content_text[:SCRAPE_MAX_CHARS] + "..."
+                save_cached_article(
+                    url,
+                    content_text,
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+                return content_text
+            else:
+                return "❌ 无法提取网页内容"
+        except Exception as e:
+            return f"❌ 解析失败: {str(e)}"
+                
+    except Exception as e:
+        return f"❌ 抓取失败: {str(e)}"
+
+# 并发抓取配置
+SCRAPE_MAX_WORKERS = 8          # 全局最大并发数
+SCRAPE_PER_HOST_LIMIT = 2       # 同一站点最大并发数
+SCRAPE_DEADLINE_SECONDS = 45    # 整个抓取阶段的总时限（秒）
+
+@traced("scrape")
+def scrape_web_contents(urls, max_workers=SCRAPE_MAX_WORKERS, per_host_limit=SCRAPE_PER_HOST_LIMIT,
+                        deadline=SCRAPE_DEADLINE_SECONDS, on_progress=None):
+    """并发抓取多个网页内容，按原始顺序返回抓取结果
+
+    on_progress(index, completed, total, text) 在每条抓取完成时于调用线程中回调，
+    超过总时限仍未完成的条目返回超时提示。
+    """
+    total = len(urls)
+    results = [None] * total
+    if total == 0:
+        return results
+    
+    # 为每个站点创建信号量，限制对同一站点的并发请求
+    host_semaphores = {}
+    for url in urls:
+        host = urlparse(url).netloc.lower()
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.BoundedSemaphore(per_host_limit)
+    
+    set_span_attributes(urls=total, hosts=len(host_semaphores))
+    
+    def fetch(url):
+        host = urlparse(url).netloc.lower()
+        with trace_span("scrape.url", url=url, host=host):
+            wait_start = time.perf_counter()
+            with host_semaphores[host]:
+                set_span_attributes(queue_ms=round((time.perf_counter() - wait_start) * 1000, 2))
+                result = scrape_web_content(url)
+            if result.startswith("❌"):
+                set_span_attributes(error=result)
+            return result
+    
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, total))
+    futures = {executor.submit(bind_trace_context(fetch), url): i for i, url in enumerate(urls)}
+    completed = 0
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                results[i] = f"❌ 抓取失败: {str(e)}"
+            completed += 1
+            if on_progress:
+                on_progress(i, completed, total, results[i])
+    except FuturesTimeoutError:
+        # 超过总时限，未完成的条目标记为超时
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = "❌ 抓取超时"
+        set_span_attributes(timed_out=sum(1 for result in results if result == "❌ 抓取超时"))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results
+
+def fix_html_rendering(content):
+    """修复HTML渲染问题，确保HTML标签被正确显示"""
+    import html
+    
+    # 如果内容被HTML转义了，先解码
+    if '&lt;' in content or '&gt;' in content or '&amp;' in content:
+        content = html.unescape(content)
+    
+    # 确保span标签格式正确
+    content = content.replace('&lt;span', '<span')
+    content = content.replace('&lt;/span&gt;', '</span>')
+    content = content.replace('&quot;', '"')
+    
+    return content
+
+# 百度新闻发布时间格式（预编译，批量解析时复用）
+RELATIVE_PUBLISH_TIME_PATTERN = re.compile(r'(\d+)\s*(秒|分钟|小时|天)前')
+FULL_DATE_PATTERN = re.compile(r'(\d{4})[-/年.](\d{1,2})[-/月.](\d{1,2})')
+MONTH_DAY_PATTERN = re.compile(r'(\d{1,2})月(\d{1,2})日')
+RELATIVE_UNITS = {"秒": "seconds", "分钟": "minutes", "小时": "hours", "天": "days"}
+
+def parse_publish_date(publish_time, reference_time):
+    """将单个百度新闻发布时间解析为 date 对象（相对时间以 reference_time 为准），无法解析返回None"""
+    if not publish_time:
+        return None
+    publish_time = publish_time.strip()
+    
+    # "今天"、"昨天"、"前天"
+    if "今天" in publish_time:
+        return reference_time.date()
+    if "昨天" in publish_time:
+        return (reference_time - timedelta(days=1)).date()
+    if "前天" in publish_time:
+        return (reference_time - timedelta(days=2)).date()
+    
+    # "3天前"、"5小时前"、"20分钟前"
+    match = RELATIVE_PUBLISH_TIME_PATTERN.search(publish_time)
+    if match:
+        return (reference_time - timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})).date()
+    
+    try:
+        # "2025-10-03 18:51"、"2025-10-03"、"2025年10月3日"
+        match = FULL_DATE_PATTERN.search(publish_time)
+        if match:
+            return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3))).date()
+        
+        # "9月27日"：假设是当前年份，如果日期在未来则认为是去年
+        match = MONTH_DAY_PATTERN.search(publish_time)
+        if match:
+            month, day = int(match.group(1)), int(match.group(2))
+            target_date = datetime(reference_time.year, month, day).date()
+            if target_date > reference_time.date():
+                target_date = datetime(reference_time.year - 1, month, day).date()
+            return target_date
+    except ValueError:
+        return None
+    
+    return None
+
+def normalize_publish_times(publish_times, reference_time=None):
+    """批量将发布时间解析为 date 对象，所有相对时间都以同一个参考时间计算
+
+    接受列表或 pandas Series；传入 Series 时返回同索引的 Series，否则返回列表。
+    相同的时间字符串只解析一次。
+    """
+    reference_time = reference_time or datetime.now()
+    parsed = {}
+    dates = []
+    for publish_time in publish_times:
+        key = publish_time if isinstance(publish_time, str) else ""
+        if key not in parsed:
+            parsed[key] = parse_publish_date(key, reference_time)
+        dates.append(parsed[key])
+    # 仅当调用方已加载 pandas 时才可能传入 Series，无需为此导入 pandas
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(publish_times, pd.Series):
+        return pd.Series(dates, index=publish_times.index, dtype=object)
+    return dates
+
+def normalize_publish_time(publish_time):
+    """将发布时间统一转换为 %Y-%m-%d 格式"""
+    publish_date = parse_publish_date(publish_time, datetime.now())
+    return publish_date.strftime('%Y-%m-%d') if publish_date else None
+
+def build_analysis_prompt(news_items, keywords, companies, current_lang):
+    """构建新闻分析Prompt"""
+    if current_lang == "zh":
+        analysis_prompt = f"""你是一个专业的新闻分析师。请根据以下百度新闻搜索结果，为每条新闻提供详细的分析和格式化输出。
+
+重要说明：
+1. 请确保所有输出内容都是中文，包括标题、摘要、全文等所有字段
+2. 请直接输出HTML格式，不要转义HTML标签
+3. 使用以下HTML格式来标记字段标题：<span style="color: #ff0000; font-weight: bold;">**字段名**</span>
+
+搜索关键词：{', '.join(keywords) if keywords else '无'}
+搜索公司：{', '.join(companies) if companies else '无'}
+
+请为每条新闻提供以下7个字段的详细分析：
+
+1. 标题：新闻的完整标题（保持原标题，如果是英文标题则翻译为中文）
+2. 相关性：相关性评分（0-1，1为最相关），基于与关键词和公司的匹配度
+3. 来源：新闻来源（必须来自中国媒体）
+4. 来源链接：原始新闻文章的URL链接
+5. 发布时间：具体发布时间（年-月-日 时:分）
+6. 摘要：新闻的简要概述（100-200字，必须用中文）
+7. 全文：新闻的完整内容（如果抓取成功，请将抓取到的内容翻译为中文；如果抓取失败，请基于标题和摘要生成合理的中文内容）
+
+新闻搜索结果（包含抓取的完整内容）：
+{serialize_news_items(news_items)}
+
+输出格式示例：
+<span style="color: #ff0000; font-weight: bold;">**标题**</span>: [新闻标题]
+
+<span style="color: #ff0000; font-weight: bold;">**相关性**</span>: [0-1分值]
+
+<span style="color: #ff0000; font-weight: bold;">**来源**</span>: [新闻来源]
+
+<span style="color: #ff0000; font-weight: bold;">**来源链接**</span>: [URL链接]
+
+<span style="color: #ff0000; font-weight: bold;">**发布时间**</span>: [时间]
+
+<span style="color: #ff0000; font-weight: bold;">**摘要**</span>: [摘要内容]
+
+<span style="color: #ff0000; font-weight: bold;">**全文**</span>: [全文内容]
+
+---
+
+请严格按照上述格式输出，不要转义HTML标签。"""
+    else:
+        analysis_prompt = f"""You are a professional news analyst. Please analyze the following Baidu news search results and provide detailed analysis for each news item.
+
+IMPORTANT Instructions:
+1. Please ensure ALL output content is in English, including titles, summaries, full text, and all other fields
+2. Please output HTML format directly, do NOT escape HTML tags
+3. Use this HTML format for field headers: <span style="color: #ff0000; font-weight: bold;">**Field Name**</span>
+
+Search Keywords: {', '.join(keywords) if keywords else 'None'}
+Search Companies: {', '.join(companies) if companies else 'None'}
+
+Please provide detailed analysis for each news item with the following 7 fields:
+
+1. Title: Complete news title (translate Chinese titles to English if necessary)
+2. Relevance: Relevance score (0-1, 1 being most relevant), based on match with keywords and companies
+3. Source: News source (must be from Chinese media, keep original Chinese name)
+4. Source Link: URL link to the original news article
+5. Publish Time: Specific publication time (YYYY-MM-DD HH:MM)
+6. Summary: Brief overview (100-200 words, must be in English)
+7. Full Text: Complete news content (if scraping successful, translate the scraped content to English; if scraping failed, generate reasonable English content based on title and snippet)
+
+News search results (with scraped full content):
+{serialize_news_items(news_items)}
+
+Output format example:
+<span style="color: #ff0000; font-weight: bold;">**Title**</span>: [News title]
+
+<span style="color: #ff0000; font-weight: bold;">**Relevance**</span>: [0-1 score]
+
+<span style="color: #ff0000; font-weight: bold;">**Source**</span>: [News source]
+
+<span style="color: #ff0000; font-weight: bold;">**Source Link**</span>: [URL link]
+
+<span style="color: #ff0000; font-weight: bold;">**Publish Time**</span>: [Time]
+
+<span style="color: #ff0000; font-weight: bold;">**Summary**</span>: [Summary content]
+
+<span style="color: #ff0000; font-weight: bold;">**Full Text**</span>: [Full text content]
+
+---
+
+Please strictly follow the above format and do NOT escape HTML tags."""
+    
+    return analysis_prompt
+
+# 分析模型配置
+ANALYSIS_MODEL = "gpt-4o"
+ANALYSIS_TEMPERATURE = 0.3
+ANALYSIS_MAX_TOKENS = 4096
+ANALYSIS_PER_ARTICLE_CACHE = True     # 逐条缓存分析结果，重叠的新闻无需重新分析
+
+# 流式渲染的最小刷新间隔（秒）
+STREAM_RENDER_INTERVAL = 0.1
+
+# 分批分析配置
+ANALYSIS_BATCH_TOKEN_BUDGET = 8000    # 每批新闻内容的输入token预算
+ANALYSIS_BATCH_MAX_ARTICLES = 4       # 每批最多新闻条数（受输出max_tokens限制）
+ANALYSIS_MAX_PARALLEL = 3             # 同时进行的分析请求数
+
+# 提示词精简配置
+ARTICLE_TOKEN_BUDGET = 1200           # 每条新闻全文保留的最大token数
+PROMPT_FIELDS = ["title", "source", "link", "date", "snippet", "full_text"]   # 提示词需要的字段（转载来源由代码补充，不交给模型）
+
+# 网页模板中常见的无关内容（版权声明、分享按钮、导航等）
+BOILERPLATE_PATTERN = re.compile(
+    r'责任编辑|版权所有|免责声明|本文来源|扫一扫|扫码|关注我们|分享到|点击进入|登录|注册|'
+    r'copyright|all rights reserved|上一篇|下一篇|相关阅读|热门推荐|广告',
+    re.IGNORECASE
+)
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[。！？!?；;])|(?<=\.)\s+')
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+def get_tokenizer():
+    """获取gpt-4o对应的tiktoken编码器，不可用时返回None（使用估算）"""
+    global _tokenizer
+    if tiktoken is None:
+        return None
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                _tokenizer = tiktoken.encoding_for_model("gpt-4o")
+            except Exception as e:
+                # 编码文件无法下载等情况，退回估算
+                print(f"Tokenizer unavailable, falling back to estimate: {str(e)}")
+                _tokenizer = False
+        return _tokenizer or None
+
+def estimate_tokens(text):
+    """粗略估算文本token数：中日韩字符约1个token，其他字符约4个字符1个token"""
+    cjk_chars = len(re.findall(r'[\u3000-\u9fff\uff00-\uffef]', text))
+    return cjk_chars + (len(text) - cjk_chars) // 4 + 1
+
+def count_tokens(text):
+    """计算文本token数，优先使用tiktoken"""
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text))
+    return estimate_tokens(text)
+
+def truncate_to_tokens(text, max_tokens):
+    """将文本截断到不超过 max_tokens 个token"""
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        tokens = tokenizer.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return tokenizer.decode(tokens[:max_tokens]) + "..."
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 无tokenizer时按估算比例截断字符
+    ratio = max_tokens / estimate_tokens(text)
+    return text[:int(len(text) * ratio)] + "..."
+
+def compact_text(text, seen_keys=None):
+    """去除模板化内容和重复句子，seen_keys 中已出现的句子也会被去掉"""
+    seen_keys = set(seen_keys or [])
+    kept_sentences = []
+    kept_keys = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        sentence = sentence.strip()
+        if not sentence or (BOILERPLATE_PATTERN.search(sentence) and len(sentence) < 60):
+            continue
+        key = re.sub(r'\W+', '', sentence).lower()
+        if not key or key in seen_keys:
+            continue
+        # 近似重复：较长句子已完整包含在之前保留的句子中
+        if len(key) >= 10 and any(key in kept_key for kept_key in kept_keys):
+            continue
+        seen_keys.add(key)
+        kept_keys.append(key)
+        kept_sentences.append(sentence)
+    return " ".join(kept_sentences)
+
+def compact_news_item(item, token_budget=ARTICLE_TOKEN_BUDGET):
+    """只保留提示词需要的字段，并精简全文到token预算以内"""
+    compacted = {field: item[field] for field in PROMPT_FIELDS if item.get(field)}
+    full_text = compacted.get('full_text', '')
+    if full_text and not full_text.startswith("❌"):
+        snippet_keys = [re.sub(r'\W+', '', s).lower() for s in SENTENCE_SPLIT_PATTERN.split(compacted.get('snippet', ''))]
+        full_text = compact_text(full_text, seen_keys=[k for k in snippet_keys if k])
+        compacted['full_text'] = truncate_to_tokens(full_text, token_budget)
+    return compacted
+
+@traced("compaction")
+def compact_news_items(news_items, token_budget=ARTICLE_TOKEN_BUDGET):
+    """批量精简新闻，返回 (精简后的新闻列表, token统计)"""
+    compacted_items = [compact_news_item(item, token_budget) for item in news_items]
+    original_tokens = count_tokens(json.dumps(news_items, ensure_ascii=False, indent=2))
+    compacted_tokens = count_tokens(serialize_news_items(compacted_items))
+    stats = {
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "saved_tokens": max(original_tokens - compacted_tokens, 0)
+    }
+    set_span_attributes(items=len(news_items), **stats)
+    return compacted_items, stats
+
+def serialize_news_items(news_items):
+    """紧凑序列化新闻列表（每行一条JSON，不缩进）"""
+    return "\n".join(json.dumps(item, ensure_ascii=False, separators=(',', ':')) for item in news_items)
+
+def split_news_into_batches(news_items, token_budget=ANALYSIS_BATCH_TOKEN_BUDGET, max_articles=ANALYSIS_BATCH_MAX_ARTICLES):
+    """按token预算将新闻切分为多个批次，保持原有顺序"""
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for item in news_items:
+        item_tokens = count_tokens(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+        if current_batch and (current_tokens + item_tokens > token_budget or len(current_batch) >= max_articles):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(item)
+        current_tokens += item_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+def stream_analysis_batches(prompts, max_parallel=ANALYSIS_MAX_PARALLEL):
+    """流式输出各批次分析，生成 (批次序号, 文本片段)
+
+    第一批逐token返回，其余批次在后台并发执行并按顺序整体返回。
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel - 1, len(prompts) - 1))) as executor:
+        futures = [executor.submit(bind_trace_context(call_openai_api), prompt) for prompt in prompts[1:]]
+        for chunk in call_openai_api_stream(prompts[0]):
+            yield 0, chunk
+        for batch_index, future in enumerate(futures, start=1):
+            yield batch_index, future.result()
+
+def trim_incomplete_html(content):
+    """去掉流式输出末尾尚未完整的HTML标签或实体，避免渲染出半截标签"""
+    tag_start = content.rfind('<')
+    if tag_start != -1 and content.find('>', tag_start) == -1:
+        content = content[:tag_start]
+    entity_start = content.rfind('&')
+    if entity_start != -1 and ';' not in content[entity_start:] and len(content) - entity_start <= 10:
+        content = content[:entity_start]
+    return content
+
+def run_analysis_batches(prompts, max_parallel=ANALYSIS_MAX_PARALLEL):
+    """并发执行各批次分析，按批次顺序返回各批输出"""
+    if len(prompts) == 1:
+        return [call_openai_api(prompts[0])]
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(prompts))) as executor:
+        return list(executor.map(bind_trace_context(call_openai_api), prompts))
+
+def split_analysis_sections(analysis_text):
+    """按分隔线 --- 将模型输出拆分为逐条新闻的分析片段"""
+    sections = re.split(r'\n\s*---+\s*(?:\n|$)', analysis_text.strip())
+    return [section.strip() for section in sections if section.strip()]
+
+def split_batch_result(batch_result, batch_size):
+    """将一批的模型输出拆分为逐条片段，返回 (片段列表, 是否成功按条拆分)
+
+    无法按条拆分（或调用失败）时整体保留在第一条的位置，其余为空。
+    """
+    batch_sections = split_analysis_sections(batch_result)
+    if not batch_result.startswith("❌") and len(batch_sections) == batch_size:
+        return batch_sections, True
+    return [batch_result.strip()] + [""] * (batch_size - 1), False
+
+SOURCE_FIELD_PATTERN = re.compile(r'\*\*(?:Source|来源)\*\*(?:</span>)?\s*[:：][^\n]*')
+
+def attach_alternate_sources(section, news_item, language=DEFAULT_LANGUAGE):
+    """在分析片段的来源字段后注明同时报道的其他媒体
+
+    转载来源随每次搜索结果变化，因此不交给模型生成、也不写入逐条缓存，而是在拼接结果时按当前的 also_reported_by 填写。
+    """
+    outlets = list(dict.fromkeys(
+        alternate.get('source') for alternate in news_item.get('also_reported_by') or [] if alternate.get('source')
+    ))
+    if not section or not outlets:
+        return section
+    note = f"（同时报道：{'、'.join(outlets)}）" if language == "zh" else f" (also reported by: {', '.join(outlets)})"
+    return SOURCE_FIELD_PATTERN.sub(lambda match: match.group(0) + note, section, count=1)
+
+def join_analysis_sections(sections):
+    """按顺序拼接逐条分析片段，每条以分隔线结尾（错误提示原样保留）"""
+    return "\n\n".join(
+        section if section.startswith("❌") or section.endswith("---") else f"{section}\n\n---"
+        for section in sections if section
+    )
+
+# 近似重复新闻聚类配置（同一通稿被多家媒体转载时只抓取和分析一份）
+MINHASH_PERMUTATIONS = 64           # MinHash签名长度
+MINHASH_SHINGLE_SIZE = 2            # 按字符2-gram计算特征（中文短文本更稳定）
+MINHASH_MAX_CHARS = 1000            # 全文只取前若干字符计算签名
+DEDUP_SNIPPET_MIN_SIMILARITY = 0.5  # 标题+摘要的估计Jaccard相似度阈值
+DEDUP_TEXT_MIN_SIMILARITY = 0.6     # 标题+全文的估计Jaccard相似度阈值
+DEDUP_NORMALIZE_PATTERN = re.compile(r'[\W_]+')
+
+_MINHASH_PRIME = (1 << 61) - 1
+_minhash_random = random.Random(20240601)   # 固定种子，保证签名在不同进程间一致
+MINHASH_PARAMS = [
+    (_minhash_random.randrange(1, _MINHASH_PRIME), _minhash_random.randrange(0, _MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+def compute_minhash(text):
+    """计算文本字符n-gram集合的MinHash签名，文本过短时返回None"""
+    text = DEDUP_NORMALIZE_PATTERN.sub('', (text or '')[:MINHASH_MAX_CHARS]).lower()
+    if len(text) < MINHASH_SHINGLE_SIZE:
+        return None
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for shingle in {text[i:i + MINHASH_SHINGLE_SIZE] for i in range(len(text) - MINHASH_SHINGLE_SIZE + 1)}
+    ]
+    return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in MINHASH_PARAMS)
+
+def estimate_similarity(signature_a, signature_b):
+    """由两个MinHash签名估计Jaccard相似度"""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+def snippet_signature_text(news_item):
+    """抓取前用于判重的文本：标题+摘要"""
+    return f"{news_item.get('title', '')} {news_item.get('snippet', '')}"
+
+def full_text_signature_text(news_item):
+    """抓取后用于判重的文本：标题+全文，抓取失败的新闻不参与判重"""
+    full_text = news_item.get('full_text', '')
+    if not full_text or full_text.startswith("❌"):
+        return None
+    return f"{news_item.get('title', '')} {full_text}"
+
+def get_dedup_keys(news_item, text_fn=snippet_signature_text):
+    """计算新闻的判重依据 (MinHash签名, 规范化标题)；text_fn 返回None时不参与判重，返回None"""
+    text = text_fn(news_item)
+    if text is None:
+        return None
+    return compute_minhash(text), DEDUP_NORMALIZE_PATTERN.sub('', news_item.get('title', '')).lower()
+
+def find_near_duplicate(representatives, dedup_keys, min_similarity):
+    """在 [(新闻, 判重依据)] 中查找与 dedup_keys 重复的第一条新闻，没有则返回None"""
+    if dedup_keys is None:
+        return None
+    signature, title_key = dedup_keys
+    for representative, rep_keys in representatives:
+        if rep_keys is None:
+            continue
+        rep_signature, rep_title_key = rep_keys
+        if (title_key and title_key == rep_title_key) or (
+            signature is not None and rep_signature is not None
+            and estimate_similarity(signature, rep_signature) >= min_similarity
+        ):
+            return representative
+    return None
+
+def add_alternate_source(representative, news_item):
+    """将重复新闻的来源（及其已合并的来源）记入代表新闻的 also_reported_by"""
+    alternates = representative.setdefault('also_reported_by', [])
+    alternates.append({"source": news_item.get('source', ''), "link": news_item.get('link', '')})
+    alternates.extend(news_item.get('also_reported_by') or [])
+
+@traced("dedupe")
+def collapse_near_duplicates(news_items, text_fn=snippet_signature_text, min_similarity=DEDUP_SNIPPET_MIN_SIMILARITY):
+    """将近似重复的新闻合并为一条：保留每组中排在最前的一条，其余来源记入 also_reported_by
+
+    标题规范化后相同，或 text_fn 文本的MinHash估计相似度不低于 min_similarity 即视为重复；
+    text_fn 返回None的新闻不参与合并。返回新的列表，不修改传入的新闻。
+    """
+    representatives = []    # (新闻, 判重依据)，不参与判重的新闻判重依据为None
+    for news_item in news_items:
+        dedup_keys = get_dedup_keys(news_item, text_fn)
+        duplicate_of = find_near_duplicate(representatives, dedup_keys, min_similarity)
+        
+        if duplicate_of is None:
+            representative = news_item.copy()
+            if news_item.get('also_reported_by'):
+                representative['also_reported_by'] = list(news_item['also_reported_by'])
+            representatives.append((representative, dedup_keys))
+            continue
+        
+        add_alternate_source(duplicate_of, news_item)
+    
+    set_span_attributes(items=len(news_items), kept=len(representatives))
+    return [representative for representative, _ in representatives]
+
+# 单次分析的最大新闻条数
+ANALYSIS_MAX_ARTICLES = 20
+
+# 流水线执行配置（搜索 → 抓取 → 分析 以有界队列相连，先抓取完成的新闻先分析）
+ANALYSIS_PIPELINED = True               # analyze_news_with_openai 默认以流水线方式执行
+PIPELINE_QUEUE_SIZE = 8                 # 阶段之间队列的容量，下游处理不过来时上游暂停
+PIPELINE_BATCH_LINGER_SECONDS = 0.3     # 批次未满时等待后续新闻的最长时间，超时即发送给模型
+
+def make_article_cache_key(prompt_skeleton, news_item):
+    """逐条分析缓存的键：不含 also_reported_by（缓存的片段不含转载来源，见 attach_alternate_sources）"""
+    item = {key: value for key, value in news_item.items() if key != 'also_reported_by'}
+    return make_llm_cache_key(ANALYSIS_MODEL, ANALYSIS_TEMPERATURE, prompt_skeleton, serialize_news_items([item]))
+
+@traced("filter_by_date")
+def filter_news_by_date(news_items, start_date_obj, end_date_obj, reference_time=None):
+    """保留发布时间在 [start_date_obj, end_date_obj] 范围内的新闻"""
+    # 批量解析发布时间，再用一个掩码过滤
+    news_dates = normalize_publish_times([news_item.get('date', '') for news_item in news_items], reference_time)
+    in_window = [news_date is not None and start_date_obj <= news_date <= end_date_obj for news_date in news_dates]
+    set_span_attributes(items=len(news_items), kept=sum(in_window))
+    return [news_item for news_item, keep in zip(news_items, in_window) if keep]
+
+@traced("analysis")
+def analyze_news_with_openai(news_results, keywords, companies, start_date, end_date, on_update=None,
+                             language=DEFAULT_LANGUAGE, on_scrape_progress=None, on_compaction=None, pipelined=None):
+    """使用OpenAI分析新闻搜索结果，重新根据时间范围进行筛选处理
+
+    news_results 可以是结果列表，也可以是 search_baidu_news(paginate=True) 返回的分页迭代器。
+    传入 on_update 时以流式方式生成，并用已修复HTML的部分结果反复回调 on_update。
+    on_scrape_progress(completed, total, item_number) 在每条新闻抓取完成时回调，
+    on_compaction(token_stats) 在提示词精简完成后回调。
+    pipelined 为 None 时按 ANALYSIS_PIPELINED 决定是否以流水线方式执行（见 analyze_news_pipelined）。
+    """
+    
+    # 将 start_date 和 end_date 转换为 date 对象进行比较
+    if isinstance(start_date, datetime):
+        start_date_obj = start_date.date()
+    else:
+        start_date_obj = start_date
+    
+    if isinstance(end_date, datetime):
+        end_date_obj = end_date.date()
+    else:
+        end_date_obj = end_date
+    
+    if ANALYSIS_PIPELINED if pipelined is None else pipelined:
+        return analyze_news_pipelined(
+            news_results, keywords, companies, start_date_obj, end_date_obj, on_update=on_update,
+            language=language, on_scrape_progress=on_scrape_progress, on_compaction=on_compaction
+        )
+    
+    # Filter news_results by Publish Time（分页结果逐页过滤，达到上限即停止翻页）
+    filtered_news = []
+    collected_news = []
+    pages = [news_results] if isinstance(news_results, list) else news_results
+    
+    for page in pages:
+        collected_news.extend(page)
+        # 按标题+摘要合并转载的同一新闻，重复的页面不会被抓取
+        filtered_news = collapse_near_duplicates(filtered_news + filter_news_by_date(page, start_date_obj, end_date_obj))
+        if len(filtered_news) >= ANALYSIS_MAX_ARTICLES:
+            filtered_news = filtered_news[:ANALYSIS_MAX_ARTICLES]
+            break
+
+    # Check if any news collected after filtering
+    if not filtered_news:
+        return ("未找到符合时间范围的新闻" if language == "zh" else "No news found within the time range")
+
+    # Proceed to analyze with OpenAI
+    try:
+        # The rest of the code remains the same, analysis continues...
+        enhanced_news_results = [news_item.copy() for news_item in filtered_news]
+        
+        # 只抓取有效链接，无效链接直接标记
+        scrape_indices = []
+        for i, enhanced_item in enumerate(enhanced_news_results):
+            news_url = enhanced_item.get('link', '')
+            if news_url and validate_url(news_url)[0]:
+                scrape_indices.append(i)
+            else:
+                enhanced_item['full_text'] = "❌ 无效链接或无法访问"
+        
+        # 每条抓取完成时报告进度
+        def report_progress(index, completed, total, text):
+            on_scrape_progress(completed, total, scrape_indices[index] + 1)
+        
+        full_texts = scrape_web_contents(
+            [enhanced_news_results[i]['link'] for i in scrape_indices],
+            on_progress=report_progress if on_scrape_progress else None
+        )
+        for i, full_text in zip(scrape_indices, full_texts):
+            enhanced_news_results[i]['full_text'] = full_text
+        
+        # 摘要不同但全文相同的转载在抓取后再合并一次
+        enhanced_news_results = collapse_near_duplicates(
+            enhanced_news_results, full_text_signature_text, DEDUP_TEXT_MIN_SIMILARITY
+        )
+
+        # Rebuild the prompt for language-specific analysis
+        current_lang = language
+        
+        # 按相关性排序并精简内容，再按token预算分批，各批并发分析
+        ranked_news = rank_search_results(enhanced_news_results, keywords, companies, current_lang)
+        compacted_news, token_stats = compact_news_items(ranked_news)
+        if on_compaction:
+            on_compaction(token_stats)
+        # 逐条缓存：与之前结果重叠的新闻直接复用分析结果，只分析新增新闻
+        prompt_skeleton = build_analysis_prompt([], keywords, companies, current_lang)
+        article_keys = [make_article_cache_key(prompt_skeleton, item) for item in compacted_news]
+        sections = [get_cached_llm_response(key) if ANALYSIS_PER_ARTICLE_CACHE else None for key in article_keys]
+        pending_indices = [i for i, section in enumerate(sections) if section is None]
+        set_span_attributes(articles=len(compacted_news), cached_articles=len(compacted_news) - len(pending_indices))
+        cached_text = "\n\n".join(
+            f"{attach_alternate_sources(section, news_item, current_lang)}\n\n---"
+            for section, news_item in zip(sections, ranked_news) if section is not None
+        )
+        
+        batches = split_news_into_batches([compacted_news[i] for i in pending_indices]) if pending_indices else []
+        prompts = [build_analysis_prompt(batch, keywords, companies, current_lang) for batch in batches]
+        
+        if not prompts:
+            batch_results = []
+        elif on_update:
+            # 先显示缓存命中的新闻，再流式显示新分析的内容
+            batch_results = [""] * len(prompts)
+            if cached_text:
+                on_update(fix_html_rendering(cached_text))
+            last_render = 0.0
+            for batch_index, chunk in stream_analysis_batches(prompts):
+                batch_results[batch_index] += chunk
+                if time.time() - last_render >= STREAM_RENDER_INTERVAL:
+                    partial_text = "\n\n".join(part.strip() for part in [cached_text] + batch_results if part.strip())
+                    on_update(fix_html_rendering(trim_incomplete_html(partial_text)))
+                    last_render = time.time()
+        else:
+            batch_results = run_analysis_batches(prompts)
+        
+        # 将新分析的内容拆分回逐条结果并写入缓存，按相关性顺序重新拼接
+        position = 0
+        for batch, batch_result in zip(batches, batch_results):
+            batch_indices = pending_indices[position:position + len(batch)]
+            position += len(batch)
+            batch_sections, split_ok = split_batch_result(batch_result, len(batch))
+            for i, section in zip(batch_indices, batch_sections):
+                sections[i] = section
+                if split_ok:
+                    save_cached_llm_response(article_keys[i], section)
+        
+        analysis_result = join_analysis_sections([
+            attach_alternate_sources(section, news_item, current_lang) for section, news_item in zip(sections, ranked_news)
+        ])
+        
+        # 修复HTML渲染问题
+        analysis_result = fix_html_rendering(analysis_result)
+        
+        return analysis_result
+    except Exception:
+        return format_news_results(collected_news, keywords, companies, language)
+
+def stream_openai_in_thread(loop, prompt, on_chunk):
+    """在工作线程中消费流式输出，每个片段通过 call_soon_threadsafe 交给事件循环线程处理，返回完整输出"""
+    parts = []
+    for chunk in call_openai_api_stream(prompt):
+        parts.append(chunk)
+        loop.call_soon_threadsafe(on_chunk, chunk)
+    return "".join(parts)
+
+async def analyze_news_pipelined_async(news_results, keywords, companies, start_date_obj, end_date_obj, on_update=None,
+                                       language=DEFAULT_LANGUAGE, on_scrape_progress=None, on_compaction=None):
+    """以流水线方式分析新闻：翻页过滤、抓取、分析三个阶段通过有界队列并发执行
+
+    抓取完成的新闻立即进入分析批次，批次已满或 PIPELINE_BATCH_LINGER_SECONDS 内没有新的新闻时发送给模型，
+    因此模型在较慢的网站仍在下载时就开始分析，总耗时接近最慢的一条新闻而不是各阶段之和。
+    参数和返回值与 analyze_news_with_openai 相同；翻页、抓取和模型调用在线程池中执行，
+    所有回调都在事件循环所在的线程中执行（Streamlit可直接更新页面）。
+    转载来源在拼接结果时按 also_reported_by 填写，分析之后才抓取到的转载也会列出。
+    与分阶段执行相同，翻页搜索的异常直接抛出，抓取和分析阶段的异常回退为显示原始搜索结果。
+    """
+    loop = asyncio.get_running_loop()
+    # 抓取使用独立的线程池：超时后仍在下载的网页不会占用翻页和模型调用的线程
+    executor = ThreadPoolExecutor(max_workers=ANALYSIS_MAX_PARALLEL + 1)
+    scrape_executor = ThreadPoolExecutor(max_workers=SCRAPE_MAX_WORKERS)
+    
+    def run_blocking(func, *args, pool=executor):
+        return loop.run_in_executor(pool, bind_trace_context(func), *args)
+    
+    scrape_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)     # 待抓取新闻的序号
+    ready_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)      # 已抓取新闻的序号
+    batch_queue = asyncio.Queue(maxsize=ANALYSIS_MAX_PARALLEL)    # (序号列表, 精简后的新闻, 缓存键)
+    
+    collected_news = []     # 搜索返回的全部结果（分析失败时回退显示）
+    accepted = []           # 通过时间过滤和摘要判重的新闻，序号即在此列表中的位置
+    analyzed = []           # 通过全文判重、参与分析的新闻序号
+    compacted = {}          # 序号 -> 精简后的新闻
+    sections = {}           # 序号 -> 分析片段
+    streaming = {}          # 批次号 -> 正在生成的输出
+    last_render = [0.0]
+    prompt_skeleton = build_analysis_prompt([], keywords, companies, language)
+    
+    def ordered_sections():
+        """已完成的分析片段按相关性排序（同分按搜索结果顺序，与分阶段执行一致）"""
+        done = sorted(index for index in analyzed if sections.get(index))
+        positions = {id(accepted[index]): index for index in done}
+        ranked = rank_search_results([accepted[index] for index in done], keywords, companies, language)
+        return [attach_alternate_sources(sections[positions[id(news_item)]], news_item, language) for news_item in ranked]
+    
+    def render(force=False):
+        if not on_update or (not force and time.time() - last_render[0] < STREAM_RENDER_INTERVAL):
+            return
+        partial_text = "\n\n".join(
+            part.strip() for part in [join_analysis_sections(ordered_sections())] + list(streaming.values()) if part.strip()
+        )
+        on_update(fix_html_rendering(trim_incomplete_html(partial_text)))
+        last_render[0] = time.time()
+    
+    async def produce():
+        """逐页获取搜索结果，按时间过滤并合并转载，新闻逐条进入抓取队列"""
+        pages = iter([news_results] if isinstance(news_results, list) else news_results)
+        snippet_representatives = []
+        try:
+            while len(accepted) < ANALYSIS_MAX_ARTICLES:
+                page = await run_blocking(next, pages, None)
+                if page is None:
+                    break
+                collected_news.extend(page)
+                for news_item in filter_news_by_date(page, start_date_obj, end_date_obj):
+                    dedup_keys = get_dedup_keys(news_item)
+                    duplicate_of = find_near_duplicate(snippet_representatives, dedup_keys, DEDUP_SNIPPET_MIN_SIMILARITY)
+                    if duplicate_of is not None:
+                        add_alternate_source(duplicate_of, news_item)
+                        continue
+                    enhanced_item = news_item.copy()
+                    if news_item.get('also_reported_by'):
+                        enhanced_item['also_reported_by'] = list(news_item['also_reported_by'])
+                    snippet_representatives.append((enhanced_item, dedup_keys))
+                    accepted.append(enhanced_item)
+                    await scrape_queue.put(len(accepted) - 1)
+                    if len(accepted) >= ANALYSIS_MAX_ARTICLES:
+                        break
+        finally:
+            for _ in range(SCRAPE_MAX_WORKERS):
+                await scrape_queue.put(None)
+    
+    host_semaphores = {}
+    scrape_deadline = loop.time() + SCRAPE_DEADLINE_SECONDS
+    scraped_count = 0
+    
+    async def scrape():
+        """抓取工作协程：同一站点的并发数受 SCRAPE_PER_HOST_LIMIT 限制，超过总时限的条目标记为超时"""
+        nonlocal scraped_count
+        while True:
+            index = await scrape_queue.get()
+            if index is None:
+                return
+            news_item = accepted[index]
+            news_url = news_item.get('link', '')
+            if news_url and validate_url(news_url)[0]:
+                host = urlparse(news_url).netloc.lower()
+                semaphore = host_semaphores.setdefault(host, asyncio.Semaphore(SCRAPE_PER_HOST_LIMIT))
+                with trace_span("scrape.url", url=news_url, host=host):
+                    wait_start = time.perf_counter()
+                    async with semaphore:
+                        set_span_attributes(queue_ms=round((time.perf_counter() - wait_start) * 1000, 2))
+                        remaining = scrape_deadline - loop.time()
+                        try:
+                            if remaining <= 0:
+                                raise asyncio.TimeoutError()
+                            full_text = await asyncio.wait_for(
+                                run_blocking(scrape_web_content, news_url, pool=scrape_executor), remaining
+                            )
+                        except asyncio.TimeoutError:
+                            full_text = "❌ 抓取超时"
+                    if full_text.startswith("❌"):
+                        set_span_attributes(error=full_text)
+            else:
+                full_text = "❌ 无效链接或无法访问"
+            news_item['full_text'] = full_text
+            scraped_count += 1
+            if on_scrape_progress:
+                on_scrape_progress(scraped_count, len(accepted), index + 1)
+            await ready_queue.put(index)
+    
+    async def scrape_all():
+        with trace_span("scrape"):
+            await asyncio.gather(*(scrape() for _ in range(SCRAPE_MAX_WORKERS)))
+        await ready_queue.put(None)
+    
+    async def batch():
+        """按全文合并转载、精简内容并组成批次；命中逐条缓存的新闻不再分析"""
+        text_representatives = []
+        batch_indices = []
+        batch_tokens = 0
+        
+        async def flush():
+            nonlocal batch_indices, batch_tokens
+            if not batch_indices:
+                return
+            batch_items = [compacted[index] for index in batch_indices]
+            batch_keys = [make_article_cache_key(prompt_skeleton, item) for item in batch_items]
+            await batch_queue.put((batch_indices, batch_items, batch_keys))
+            batch_indices = []
+            batch_tokens = 0
+        
+        while True:
+            try:
+                if batch_indices:
+                    index = await asyncio.wait_for(ready_queue.get(), PIPELINE_BATCH_LINGER_SECONDS)
+                else:
+                    index = await ready_queue.get()
+            except asyncio.TimeoutError:
+                await flush()
+                continue
+            if index is None:
+                break
+            
+            news_item = accepted[index]
+            dedup_keys = get_dedup_keys(news_item, full_text_signature_text)
+            duplicate_of = find_near_duplicate(text_representatives, dedup_keys, DEDUP_TEXT_MIN_SIMILARITY)
+            if duplicate_of is not None:
+                add_alternate_source(duplicate_of, news_item)
+                continue
+            text_representatives.append((news_item, dedup_keys))
+            analyzed.append(index)
+            compacted[index] = compact_news_item(news_item)
+            
+            if ANALYSIS_PER_ARTICLE_CACHE:
+                cached_section = get_cached_llm_response(make_article_cache_key(prompt_skeleton, compacted[index]))
+                if cached_section is not None:
+                    sections[index] = cached_section
+                    render(force=True)
+                    continue
+            
+            item_tokens = count_tokens(json.dumps(compacted[index], ensure_ascii=False, separators=(',', ':')))
+            if batch_indices and (batch_tokens + item_tokens > ANALYSIS_BATCH_TOKEN_BUDGET
+                                  or len(batch_indices) >= ANALYSIS_BATCH_MAX_ARTICLES):
+                await flush()
+            batch_indices.append(index)
+            batch_tokens += item_tokens
+            if len(batch_indices) >= ANALYSIS_BATCH_MAX_ARTICLES:
+                await flush()
+        
+        await flush()
+        for _ in range(ANALYSIS_MAX_PARALLEL):
+            await batch_queue.put(None)
+    
+    batch_counter = itertools.count()
+    
+    async def analyze():
+        """分析工作协程：逐批调用模型（有 on_update 时流式输出），结果拆分回逐条片段并写入缓存"""
+        while True:
+            job = await batch_queue.get()
+            if job is None:
+                return
+            batch_indices, batch_items, batch_keys = job
+            prompt = build_analysis_prompt(batch_items, keywords, companies, language)
+            if on_update:
+                batch_id = next(batch_counter)
+                streaming[batch_id] = ""
+                
+                def on_chunk(chunk, batch_id=batch_id):
+                    streaming[batch_id] += chunk
+                    render()
+                
+                batch_result = await run_blocking(stream_openai_in_thread, loop, prompt, on_chunk)
+                del streaming[batch_id]
+            else:
+                batch_result = await run_blocking(call_openai_api, prompt)
+            
+            batch_sections, split_ok = split_batch_result(batch_result, len(batch_indices))
+            for index, cache_key, section in zip(batch_indices, batch_keys, batch_sections):
+                sections[index] = section
+                if split_ok:
+                    save_cached_llm_response(cache_key, section)
+            render(force=True)
+    
+    produce_task = asyncio.ensure_future(produce())
+    tasks = [produce_task] + [
+        asyncio.ensure_future(stage) for stage in
+        [scrape_all(), batch()] + [analyze() for _ in range(ANALYSIS_MAX_PARALLEL)]
+    ]
+    try:
+        await asyncio.gather(*tasks)
+        
+        if not accepted:
+            return ("未找到符合时间范围的新闻" if language == "zh" else "No news found within the time range")
+        
+        if on_compaction:
+            analyzed_items = [accepted[index] for index in analyzed]
+            original_tokens = count_tokens(json.dumps(analyzed_items, ensure_ascii=False, indent=2))
+            compacted_tokens = count_tokens(serialize_news_items([compacted[index] for index in analyzed]))
+            on_compaction({
+                "original_tokens": original_tokens,
+                "compacted_tokens": compacted_tokens,
+                "saved_tokens": max(original_tokens - compacted_tokens, 0)
+            })
+        
+        return fix_html_rendering(join_analysis_sections(ordered_sections()))
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        # 翻页搜索失败与分阶段执行一样直接抛出
+        if produce_task.done() and not produce_task.cancelled() and produce_task.exception() is not None:
+            raise
+        return format_news_results(collected_news, keywords, companies, language)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        scrape_executor.shutdown(wait=False, cancel_futures=True)
+
+def analyze_news_pipelined(news_results, keywords, companies, start_date_obj, end_date_obj, on_update=None,
+                           language=DEFAULT_LANGUAGE, on_scrape_progress=None, on_compaction=None):
+    """在新的事件循环中运行 analyze_news_pipelined_async（调用线程中不能已有运行中的事件循环）"""
+    return asyncio.run(analyze_news_pipelined_async(
+        news_results, keywords, companies, start_date_obj, end_date_obj, on_update=on_update,
+        language=language, on_scrape_progress=on_scrape_progress, on_compaction=on_compaction
+    ))
+
+def format_news_results(news_results, keywords, companies, language=DEFAULT_LANGUAGE):
+    """格式化新闻搜索结果"""
+    formatted_results = []
+    
+    # 获取当前语言设置
+    current_lang = language
+    
+    for i, news in enumerate(news_results[:5]):  # 限制显示前5条新闻
+        # 计算相关性评分
+        relevance_score = calculate_relevance_score(news, keywords, companies, current_lang)
+        
+        # 根据语言设置格式化单条新闻
+        if current_lang == "zh":
+            news_item = f"""<span style="color: #ff0000; font-weight: bold;">**Title（标题）**</span>: {news.get('title', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Relevance（相关性）**</span>: {relevance_score:.2f}
+
+<span style="color: #ff0000; font-weight: bold;">**Source（来源）**</span>: {news.get('source', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Source Link（来源链接）**</span>: {news.get('link', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Publish Time（发布时间）**</span>: {news.get('date', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Summary（摘要）**</span>: {news.get('snippet', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Full Text（全文）**</span>: {news.get('snippet', 'N/A')}
+
+---
+"""
+        else:
+            news_item = f"""<span style="color: #ff0000; font-weight: bold;">**Title**</span>: {news.get('title', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Relevance**</span>: {relevance_score:.2f}
+
+<span style="color: #ff0000; font-weight: bold;">**Source**</span>: {news.get('source', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Source Link**</span>: {news.get('link', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Publish Time**</span>: {news.get('date', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Summary**</span>: {news.get('snippet', 'N/A')}
+
+<span style="color: #ff0000; font-weight: bold;">**Full Text**</span>: {news.get('snippet', 'N/A')}
+
+---
+"""
+        formatted_results.append(news_item)
+    
+    return "\n".join(formatted_results)
+
+def build_term_automaton(terms):
+    """构建Aho-Corasick多模式匹配自动机，返回 (goto, fail, output)"""
+    goto, fail, output = [{}], [0], [[]]
+    for term in terms:
+        node = 0
+        for ch in term:
+            if ch not in goto[node]:
+                goto.append({})
+                fail.append(0)
+                output.append([])
+                goto[node][ch] = len(goto) - 1
+            node = goto[node][ch]
+        if term not in output[node]:
+            output[node].append(term)
+    
+    # 广度优先计算失败指针，并合并后缀节点的输出
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for ch, child in goto[node].items():
+            queue.append(child)
+            state = fail[node]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            fail[child] = goto[state].get(ch, 0)
+            output[child] = output[child] + output[fail[child]]
+    return goto, fail, output
+
+def find_term_matches(automaton, text):
+    """一次扫描文本，返回所有匹配的 (起始位置, 术语)"""
+    goto, fail, output = automaton
+    node = 0
+    matches = []
+    for i, ch in enumerate(text):
+        while node and ch not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(ch, 0)
+        for term in output[node]:
+            matches.append((i - len(term) + 1, term))
+    return matches
+
+def build_relevance_terms():
+    """收集两种语言的关键词、公司名称及其映射名称（小写），用于构建自动机"""
+    terms = set()
+    for language in ("en", "zh"):
+        terms.update(keyword.lower() for keyword in KEYWORDS_MAPPING[language])
+        for company, mapped_name in COMPANIES_MAPPING[language].items():
+            terms.add(company.lower())
+            terms.add(mapped_name.lower())
+    return sorted(terms)
+
+# 导入时构建一次，供相关性评分和关键词提取共用
+RELEVANCE_TERMS = build_relevance_terms()
+RELEVANCE_TERM_SET = set(RELEVANCE_TERMS)
+RELEVANCE_AUTOMATON = build_term_automaton(RELEVANCE_TERMS)
+
+def match_terms_in_text(text, extra_terms=()):
+    """匹配文本（需已小写）中的预定义术语，返回 {术语: [出现位置, ...]}
+
+    不在自动机中的自定义术语（extra_terms）使用子串查找补充。
+    """
+    positions = {}
+    for position, term in find_term_matches(RELEVANCE_AUTOMATON, text):
+        positions.setdefault(term, []).append(position)
+    for term in extra_terms:
+        if term and term not in RELEVANCE_TERM_SET and term not in positions:
+            position = text.find(term)
+            while position != -1:
+                positions.setdefault(term, []).append(position)
+                position = text.find(term, position + 1)
+    return positions
+
+def score_news_batch(news_items, keywords, companies, language=DEFAULT_LANGUAGE):
+    """批量计算新闻相关性，每条新闻只扫描一次
+
+    返回与 news_items 等长的列表，每项包含 score（0.1-1）、matches（术语 -> 位置列表）
+    以及 keyword_matches/company_matches 命中数。
+    """
+    current_companies_mapping = COMPANIES_MAPPING[language]
+    keyword_terms = [keyword.lower() for keyword in keywords or []]
+    company_terms = [
+        (current_companies_mapping[company] if company in current_companies_mapping else company).lower()
+        for company in companies or []
+    ]
+    
+    results = []
+    for news in news_items:
+        content = f"{news.get('title', '')} {news.get('snippet', '')}".lower()
+        matches = match_terms_in_text(content, keyword_terms + company_terms)
+        keyword_matches = sum(1 for term in keyword_terms if term in matches)
+        company_matches = sum(1 for term in company_terms if term in matches)
+        
+        score = 0.0
+        if keyword_terms:
+            score += (keyword_matches / len(keyword_terms)) * 0.6
+        if company_terms:
+            score += (company_matches / len(company_terms)) * 0.4
+        
+        results.append({
+            "score": min(max(score, 0.1), 1.0),  # 确保评分在0-1之间
+            "matches": matches,
+            "keyword_matches": keyword_matches,
+            "company_matches": company_matches
+        })
+    return results
+
+def calculate_relevance_score(news, keywords, companies, language=DEFAULT_LANGUAGE):
+    """计算新闻相关性评分"""
+    return score_news_batch([news], keywords, companies, language)[0]["score"]
+
+def extract_search_terms_from_prompt(prompt, language=DEFAULT_LANGUAGE):
+    """从自定义prompt中提取关键词和公司信息"""
+    keywords = []
+    companies = []
+    
+    # 获取当前语言的关键词和公司列表
+    current_keywords = KEYWORDS_MAPPING[language]
+    current_companies = list(COMPANIES_MAPPING[language].keys())
+    
+    # 一次扫描匹配所有预定义术语
+    matched_terms = match_terms_in_text(prompt.lower())
+    
+    # 提取关键词
+    for keyword in current_keywords:
+        if keyword.lower() in matched_terms:
+            keywords.append(keyword)
+    
+    # 提取公司
+    for company in current_companies:
+        if company.lower() in matched_terms:
+            companies.append(company)
+    
+    # 如果没有找到预定义的关键词或公司，使用一些通用关键词
+    if not keywords and not companies:
+        keywords = ["关键矿产", "矿业"] if language == "zh" else ["critical minerals", "mining"]
+    
+    return keywords, companies
+
+# OpenAI客户端与限流调度配置（进程内共享）
+LLM_REQUESTS_PER_MINUTE = 500       # 每分钟请求数预算
+LLM_TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 30000))   # 每分钟token预算，按账户等级设置
+LLM_COMPLETION_TOKEN_ESTIMATE = 1500    # 预估的输出token数（不超过max_tokens），返回usage后按实际用量校正
+LLM_MAX_RETRIES = 4                 # 429/连接错误/5xx 的最大重试次数
+LLM_BACKOFF_BASE_SECONDS = 1.0      # 退避基数，实际等待为 base * 2^n 加随机抖动
+LLM_BACKOFF_MAX_SECONDS = 30.0
+
+_openai_client = None
+_openai_client_key = None
+_openai_client_lock = threading.Lock()
+_llm_request_log = deque()          # 最近60秒内的 [请求时间, token数]（先记预估值，返回usage后改为实际值）
+_llm_rate_lock = threading.Lock()
+
+def get_openai_client():
+    """获取进程内共享的OpenAI客户端，复用HTTP连接；重试由 create_chat_completion 统一调度"""
+    global _openai_client, _openai_client_key
+    with _openai_client_lock:
+        # 密钥变更（configure_api_keys）后重新创建客户端
+        if _openai_client is None or _openai_client_key != OPENAI_API_KEY:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+            _openai_client_key = OPENAI_API_KEY
+        return _openai_client
+
+def wait_for_llm_capacity(estimated_tokens):
+    """按每分钟请求数和token数预算排队，预算不足时阻塞等待；返回记录项，可用实际用量更新其token数"""
+    while True:
+        with _llm_rate_lock:
+            now = time.time()
+            while _llm_request_log and now - _llm_request_log[0][0] >= 60:
+                _llm_request_log.popleft()
+            used_tokens = sum(tokens for _, tokens in _llm_request_log)
+            if not _llm_request_log or (
+                len(_llm_request_log) < LLM_REQUESTS_PER_MINUTE
+                and used_tokens + estimated_tokens <= LLM_TOKENS_PER_MINUTE
+            ):
+                entry = [now, estimated_tokens]
+                _llm_request_log.append(entry)
+                return entry
+            wait_seconds = _llm_request_log[0][0] + 60 - now
+        time.sleep(min(max(wait_seconds, 0.05), 1.0))
+
+def get_retry_delay(error, attempt):
+    """计算重试等待时间：优先使用服务端的 retry-after，否则指数退避加抖动"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    delay = min(LLM_BACKOFF_BASE_SECONDS * (2 ** attempt), LLM_BACKOFF_MAX_SECONDS)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def create_chat_completion(**kwargs):
+    """经过限流调度调用 chat.completions.create，429和临时错误按抖动退避重试
+
+    配额用尽（insufficient_quota）不会重试，直接抛出。
+    排队时按输入token数加预估输出token数计算，非流式请求返回后按 usage 的实际用量校正。
+    """
+    prompt_text = "".join(message.get("content", "") for message in kwargs.get("messages", []))
+    max_tokens = kwargs.get("max_tokens") or LLM_COMPLETION_TOKEN_ESTIMATE
+    estimated_tokens = count_tokens(prompt_text) + min(max_tokens, LLM_COMPLETION_TOKEN_ESTIMATE)
+    
+    from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+    
+    rate_limit_wait = 0.0
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        wait_start = time.perf_counter()
+        log_entry = wait_for_llm_capacity(estimated_tokens)
+        rate_limit_wait += time.perf_counter() - wait_start
+        set_span_attributes(attempts=attempt + 1, rate_limit_wait_ms=round(rate_limit_wait * 1000, 2))
+        try:
+            completion = get_openai_client().chat.completions.create(**kwargs)
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                set_span_attributes(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+                with _llm_rate_lock:
+                    log_entry[1] = usage.prompt_tokens + usage.completion_tokens
+            return completion
+        except RateLimitError as e:
+            if "insufficient_quota" in str(e) or attempt == LLM_MAX_RETRIES:
+                raise
+            time.sleep(get_retry_delay(e, attempt))
+        except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            time.sleep(get_retry_delay(e, attempt))
+
+# 结构化提取配置（一次模型调用同时完成关键词提取、中文翻译和时间窗口规范化）
+SEARCH_PLAN_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "search_terms": {"type": "array", "items": {"type": "string"}},
+        "time_description": {"type": "string"},
+        "time_type": {"type": "string", "enum": ["relative", "absolute", "none"]},
+        "time_value": {"type": "string"},
+        "explanation": {"type": "string"}
+    },
+    "required": ["keywords", "search_terms", "time_description", "time_type", "time_value", "explanation"],
+    "additionalProperties": False
+}
+# 不支持 json_schema 结构化输出的模型改用 JSON 模式，再由 validate_search_plan 校验
+JSON_OBJECT_MODE_MODELS = {"gpt-3.5-turbo"}
+RELATIVE_TIME_VALUE_PATTERN = re.compile(r'^\s*(\d+)\s*(hour|day|week|month)s?\s*$', re.IGNORECASE)
+ABSOLUTE_TIME_VALUE_PATTERN = re.compile(r'^\s*(\d{4}-\d{2}-\d{2})\s*\.\.\s*(\d{4}-\d{2}-\d{2})?\s*$')
+
+def build_search_plan_prompt(prompt, language=DEFAULT_LANGUAGE):
+    """构建结构化提取的指令：关键词、对应的中文搜索词和规范化的时间窗口"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    if language == "zh":
+        return f"""你是一个专业的文本分析助手。请从用户输入的prompt中提取核心搜索关键词和时间信息，并给出用于百度新闻搜索的中文搜索词。
+
+用户输入的prompt: "{prompt}"
+今天的日期: {today}
+
+字段要求：
+1. keywords: 只提取最核心的1-2个关键词（关键矿产、矿业、公司、投资、项目等），保持原文，不要提取"news"、"latest"、"top"、"Chinese"等修饰词
+2. search_terms: 与 keywords 一一对应的中文搜索词，专业术语使用标准中文译名，公司使用官方中文名称；已是中文的关键词原样保留
+3. time_description: 原始prompt中的时间描述（如"最近2天"），没有则为空字符串
+4. time_type: "relative"表示相对时间，"absolute"表示绝对时间，"none"表示无时间限制
+5. time_value: relative 时为"数字 单位"（单位为 hours/days/weeks/months，如"2 days"）；absolute 时为"YYYY-MM-DD..YYYY-MM-DD"，截止到今天则为"YYYY-MM-DD.."；none 时为空字符串
+6. explanation: 简要说明提取的核心关键词和时间信息
+"""
+    return f"""You are a professional text analysis assistant. Extract the core search keywords and time information from the user prompt, and give the Chinese search terms to use on Baidu News.
+
+User prompt: "{prompt}"
+Today's date: {today}
+
+Field rules:
+1. keywords: only the 1-2 most core keywords (critical minerals, mining, companies, investments, projects, etc.) as written in the prompt; do NOT include modifiers like "news", "latest", "top", "Chinese"
+2. search_terms: Chinese search terms aligned one-to-one with keywords, using standard Chinese terminology and official Chinese company names; keep keywords that are already Chinese unchanged
+3. time_description: the original time description in the prompt (e.g. "last 2 days"), or an empty string
+4. time_type: "relative" for relative time, "absolute" for absolute time, "none" for no time limit
+5. time_value: for relative, "<number> <unit>" with unit hours/days/weeks/months (e.g. "2 days"); for absolute, "YYYY-MM-DD..YYYY-MM-DD", or "YYYY-MM-DD.." if it runs until today; empty string for none
+6. explanation: brief explanation of the extracted keywords and time information
+"""
+
+def validate_search_plan(data):
+    """校验并规范化结构化提取结果，不符合约定时抛出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("Search plan is not a JSON object")
+    keywords = [str(keyword).strip() for keyword in data.get("keywords") or [] if str(keyword).strip()]
+    search_terms = [str(term).strip() for term in data.get("search_terms") or [] if str(term).strip()]
+    if not keywords:
+        raise ValueError("No keywords extracted")
+    if len(search_terms) != len(keywords):
+        raise ValueError("search_terms must align with keywords")
+    
+    time_type = data.get("time_type")
+    time_value = str(data.get("time_value") or "").strip()
+    if time_type == "relative":
+        match = RELATIVE_TIME_VALUE_PATTERN.match(time_value)
+        if not match:
+            raise ValueError(f"Invalid relative time value: {time_value}")
+        time_value = f"{int(match.group(1))} {match.group(2).lower()}s"
+    elif time_type == "absolute":
+        match = ABSOLUTE_TIME_VALUE_PATTERN.match(time_value)
+        if not match:
+            raise ValueError(f"Invalid absolute time value: {time_value}")
+        start_str, end_str = match.group(1), match.group(2) or ""
+        start_date = datetime.strptime(start_str, '%Y-%m-%d')
+        if end_str and datetime.strptime(end_str, '%Y-%m-%d') < start_date:
+            raise ValueError(f"Time window ends before it starts: {time_value}")
+        time_value = f"{start_str}..{end_str}"
+    elif time_type == "none":
+        time_value = ""
+    else:
+        raise ValueError(f"Invalid time type: {time_type}")
+    
+    return {
+        "keywords": keywords,
+        "search_terms": search_terms,
+        "time_description": str(data.get("time_description") or "").strip(),
+        "time_type": time_type,
+        "time_value": time_value,
+        "explanation": str(data.get("explanation") or "").strip()
+    }
+
+@traced("llm.call", purpose="search_plan")
+def extract_search_plan_with_llm(prompt, model="gpt-4o", language=DEFAULT_LANGUAGE):
+    """一次模型调用（结构化输出）提取关键词、中文搜索词和时间窗口，结果不合规时抛出 ValueError"""
+    if model in JSON_OBJECT_MODE_MODELS:
+        response_format = {"type": "json_object"}
+    else:
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": "search_plan", "strict": True, "schema": SEARCH_PLAN_JSON_SCHEMA}
+        }
+    
+    completion = create_chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": "Respond only with a JSON object matching the requested fields."},
+            {"role": "user", "content": build_search_plan_prompt(prompt, language)}
+        ],
+        temperature=0.1,
+        max_tokens=600,
+        response_format=response_format,
+        stream=False
+    )
+    
+    try:
+        plan = validate_search_plan(json.loads(completion.choices[0].message.content))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in search plan: {str(e)}")
+    
+    # 精确匹配的已知术语以词表翻译为准，保证同一术语的搜索词一致；
+    # 只有去掉后缀才能匹配的术语保留模型给出的（更具体的）搜索词；新术语记入已学习词表
+    learned = {}
+    for i, keyword in enumerate(plan["keywords"]):
+        translation = lookup_term_translation(keyword, exact=True)
+        if translation:
+            plan["search_terms"][i] = translation
+        elif keyword != plan["search_terms"][i]:
+            learned[keyword] = plan["search_terms"][i]
+    if learned:
+        save_learned_translations(learned)
+    return plan
+
+def convert_time_to_date_range(time_description, time_type, time_value, language=DEFAULT_LANGUAGE):
+    """将时间描述转换为具体的日期范围"""
+    try:
+        current_date = datetime.now()
+        
+        if time_type == "none" or not time_value:
+            # 默认使用最近6个月
+            start_date = current_date - timedelta(days=180)  # 约6个月
+            end_date = current_date
+            return start_date, end_date, "最近6个月" if language == "zh" else "last 6 months"
+        
+        elif time_type == "absolute":
+            # 处理绝对时间："YYYY-MM-DD..YYYY-MM-DD"、"YYYY-MM-DD.."（至今）或单个日期
+            try:
+                start_str, _, end_str = time_value.strip().partition("..")
+                start_date = datetime.strptime(start_str.strip(), '%Y-%m-%d')
+                end_date = datetime.combine(datetime.strptime(end_str.strip(), '%Y-%m-%d').date(), datetime.max.time()) if end_str.strip() else current_date
+                if start_date <= end_date:
+                    return start_date, end_date, time_description or time_value
+            except ValueError:
+                pass
+        
+        elif time_type == "relative":
+            # 处理相对时间
+            time_value_lower = time_value.lower().strip()
+            
+            # 处理天数
+            if "day" in time_value_lower:
+                try:
+                    days = int(''.join(filter(str.isdigit, time_value_lower)))
+                    start_date = current_date - timedelta(days=days)
+                    end_date = current_date
+                    time_desc = f"最近{days}天" if language == "zh" else f"last {days} days"
+                    return start_date, end_date, time_desc
+                except ValueError:
+                    pass
+            
+            # 处理周数
+            elif "week" in time_value_lower:
+                try:
+                    weeks = int(''.join(filter(str.isdigit, time_value_lower)))
+                    start_date = current_date - timedelta(weeks=weeks)
+                    end_date = current_date
+                    time_desc = f"最近{weeks}周" if language == "zh" else f"last {weeks} weeks"
+                    return start_date, end_date, time_desc
+                except ValueError:
+                    pass
+            
+            # 处理月数
+            elif "month" in time_value_lower:
+                try:
+                    months = int(''.join(filter(str.isdigit, time_value_lower)))
+                    start_date = current_date - timedelta(days=months * 30)  # 近似处理
+                    end_date = current_date
+                    time_desc = f"最近{months}个月" if language == "zh" else f"last {months} months"
+                    return start_date, end_date, time_desc
+                except ValueError:
+                    pass
+            
+            # 处理小时
+            elif "hour" in time_value_lower:
+                try:
+                    hours = int(''.join(filter(str.isdigit, time_value_lower)))
+                    start_date = current_date - timedelta(hours=hours)
+                    end_date = current_date
+                    time_desc = f"最近{hours}小时" if language == "zh" else f"last {hours} hours"
+                    return start_date, end_date, time_desc
+                except ValueError:
+                    pass
+        
+        # 如果无法解析，使用默认值
+        start_date = current_date - timedelta(days=180)  # 约6个月
+        end_date = current_date
+        return start_date, end_date, "最近6个月" if language == "zh" else "last 6 months"
+        
+    except Exception:
+        # 异常情况下使用默认值
+        current_date = datetime.now()
+        start_date = current_date - timedelta(days=180)  # 约6个月
+        end_date = current_date
+        return start_date, end_date, "最近6个月" if language == "zh" else "last 6 months"
+
+# 双语术语索引（由关键词和公司映射构建，翻译时优先查表，未知术语才调用模型）
+GLOSSARY_PATH = os.path.join(CACHE_DIR, "glossary.db")
+GENERIC_TERMS = {"critical minerals": "关键矿产", "mining": "矿业"}
+COMPANY_SUFFIX_WORDS = {
+    "group", "co", "ltd", "limited", "corporation", "corp", "company", "holding", "holdings",
+    "mining", "industry", "industrial", "inc", "the"
+}
+
+GLOSSARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS glossary (
+    term_key TEXT PRIMARY KEY,
+    term TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+def normalize_term(term, strip_suffixes=False):
+    """规范化术语：小写、去标点、合并空白；可选去掉公司名称中的通用后缀词"""
+    words = re.sub(r'[^\w]+', ' ', term.lower()).split()
+    if strip_suffixes:
+        stripped = [word for word in words if word not in COMPANY_SUFFIX_WORDS]
+        words = stripped or words
+    return " ".join(words)
+
+def get_company_short_name(chinese_name):
+    """取中文公司名括号中的简称（如"宁德时代"），没有则返回全称"""
+    match = re.search(r'\(([^)]+)\)', chinese_name)
+    if match:
+        return match.group(1).split("/")[0].strip()
+    return chinese_name.strip()
+
+def build_term_translation_index():
+    """构建英文术语（含别名和大小写变体）索引：规范化术语 -> (标准英文名称, 中文翻译, 是否为公司)
+
+    只有公司名称额外登记去掉通用后缀词后的形式（如 "Zijin Mining Group" -> "zijin"），
+    关键词保持原样，避免 "Lithium Mining" 之类更具体的搜索词被归并为 "Lithium"。
+    """
+    index = {}
+    
+    def add(term, canonical, translation, is_company=False):
+        keys = [normalize_term(term)]
+        if is_company:
+            keys.append(normalize_term(term, strip_suffixes=True))
+        for key in keys:
+            if key and key not in index:
+                index[key] = (canonical, translation, is_company)
+    
+    for term, translation in GENERIC_TERMS.items():
+        add(term, term, translation)
+    for en_keyword, zh_keyword in zip(KEYWORDS_MAPPING["en"], KEYWORDS_MAPPING["zh"]):
+        add(en_keyword, en_keyword, zh_keyword)
+    for company, zh_name in COMPANIES_MAPPING["zh"].items():
+        translation = get_company_short_name(zh_name)
+        add(company, company, translation, is_company=True)
+        add(COMPANIES_MAPPING["en"].get(company, company), company, translation, is_company=True)
+        # 公司名中的别名，如 "CMOC China Molybdenum / Luoyang Molybdenum Industry"、"(BNMC)"
+        for alias in re.split(r'\s*[/()]\s*', company):
+            if alias.strip():
+                add(alias, company, translation, is_company=True)
+    return index
+
+TERM_TRANSLATION_INDEX = build_term_translation_index()
+
+def find_index_entry(key):
+    """在内置索引中查找规范化术语（兼容复数形式，如 "Rare Earths"），未找到返回None"""
+    if key in TERM_TRANSLATION_INDEX:
+        return TERM_TRANSLATION_INDEX[key]
+    if key.endswith("s") and key[:-1] in TERM_TRANSLATION_INDEX:
+        return TERM_TRANSLATION_INDEX[key[:-1]]
+    return None
+
+def lookup_term_translation(term, exact=False):
+    """在内置索引和已学习词表中查找术语的中文翻译，未找到返回None
+
+    先按原词精确查找；找不到时才去掉公司后缀词再查，且只接受公司条目。exact 为 True 时不去后缀。
+    """
+    entry = find_index_entry(normalize_term(term))
+    if entry is None and not exact:
+        entry = find_index_entry(normalize_term(term, strip_suffixes=True))
+        if entry is not None and not entry[2]:
+            entry = None
+    if entry is not None:
+        return entry[1]
+    try:
+        conn = get_db_connection(GLOSSARY_PATH, GLOSSARY_SCHEMA)
+        with _db_lock:
+            row = conn.execute("SELECT translation FROM glossary WHERE term_key = ?", (normalize_term(term),)).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Glossary read failed: {str(e)}")
+        return None
+
+def save_learned_translations(translations):
+    """将模型翻译的新术语写入已学习词表"""
+    try:
+        conn = get_db_connection(GLOSSARY_PATH, GLOSSARY_SCHEMA)
+        now = time.time()
+        with _db_lock:
+            conn.executemany(
+                "INSERT OR REPLACE INTO glossary (term_key, term, translation, created_at) VALUES (?, ?, ?, ?)",
+                [(normalize_term(term), term, translation, now) for term, translation in translations.items()]
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Glossary write failed: {str(e)}")
+
+def translate_keywords_to_chinese(keywords, model="gpt-4o"):
+    """将英文关键字翻译成中文（优先查表，只有未知术语才调用模型）"""
+    try:
+        if not keywords:
+            return []
+        
+        # 不含英文字符的关键字直接保留，已知术语查表翻译
+        translated = []
+        unknown_keywords = []
+        for keyword in keywords:
+            if not any(c.isalpha() and ord(c) < 128 for c in keyword):
+                translated.append(keyword)
+                continue
+            translation = lookup_term_translation(keyword)
+            translated.append(translation)
+            if translation is None:
+                unknown_keywords.append(keyword)
+        
+        if not unknown_keywords:
+            return translated
+        
+        # 构建翻译prompt
+        keywords_str = ", ".join(unknown_keywords)
+        translation_prompt = f"""请将以下英文关键词翻译成中文，保持专业术语的准确性：
+
+英文关键词: {keywords_str}
+
+翻译要求：
+1. 保持关键词的专业性和准确性
+2. 如果是矿业、矿产相关的专业术语，请使用标准的中文翻译
+3. 如果是公司名称，请使用该公司的官方中文名称
+4. 只返回翻译后的中文关键词，用逗号分隔
+5. 不要添加任何解释或其他内容
+
+请直接返回翻译结果："""
+        
+        # 调用OpenAI API进行翻译
+        with trace_span("llm.call", purpose="translate", model=model):
+            completion = create_chat_completion(
+                model=model,
+                messages=[
+                    {"role": "user", "content": translation_prompt}
+                ],
+                temperature=0.1,
+                max_tokens=500,
+                stream=False
+            )
+        
+        response_text = completion.choices[0].message.content.strip()
+        
+        # 解析翻译结果
+        llm_keywords = [keyword.strip() for keyword in re.split(r'[,，]', response_text) if keyword.strip()]
+        
+        if len(llm_keywords) == len(unknown_keywords):
+            # 一一对应时填回原位置，并记入已学习词表
+            save_learned_translations(dict(zip(unknown_keywords, llm_keywords)))
+            llm_iter = iter(llm_keywords)
+            return [translation if translation is not None else next(llm_iter) for translation in translated]
+        
+        # 数量对不上时无法确定对应关系：保留查表结果，追加模型结果（为空则保留原关键字）
+        known = [translation for translation in translated if translation is not None]
+        return known + (llm_keywords or unknown_keywords)
+        
+    except Exception as e:
+        # 如果翻译失败，已知术语仍使用查表结果，其余返回原关键字
+        print(f"Translation failed: {str(e)}")
+        return [lookup_term_translation(keyword) or keyword for keyword in keywords]
+
+# 本地规则解析配置（能可靠解析时跳过模型调用）
+LOCAL_EXTRACTION_MIN_CONFIDENCE = 0.8
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12,
+    "一": 1, "两": 2, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10
+}
+TIME_UNITS = {
+    "hour": "hours", "day": "days", "week": "weeks", "month": "months",
+    "小时": "hours", "天": "days", "日": "days", "周": "weeks", "星期": "weeks", "月": "months", "个月": "months"
+}
+EN_RELATIVE_TIME_PATTERN = re.compile(
+    r'\b(?:last|past|recent|previous|within(?: the)?(?: last| past)?)\s+'
+    r'(?:(\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|twelve)\s+)?(hour|day|week|month)s?\b',
+    re.IGNORECASE
+)
+ZH_RELATIVE_TIME_PATTERN = re.compile(r'(?:最近|过去|近)\s*(\d+|[一两二三四五六七八九十]+)?\s*(小时|天|日|周|星期|个月|月)')
+EN_FIXED_TIME_PATTERNS = [
+    (re.compile(r"\btoday(?:'s)?\b", re.IGNORECASE), "1 days"),
+    (re.compile(r'\byesterday\b', re.IGNORECASE), "2 days"),
+    (re.compile(r'\bthis week\b', re.IGNORECASE), "1 weeks"),
+    (re.compile(r'\bthis month\b', re.IGNORECASE), "1 months"),
+]
+ZH_FIXED_TIME_PATTERNS = [
+    (re.compile(r'今天|今日'), "1 days"),
+    (re.compile(r'昨天|昨日'), "2 days"),
+    (re.compile(r'本周|这周'), "1 weeks"),
+    (re.compile(r'本月|这个月'), "1 months"),
+]
+DATE_PATTERN = r'(\d{4})[-/年.](\d{1,2})[-/月.](\d{1,2})日?'
+ABSOLUTE_RANGE_PATTERN = re.compile(DATE_PATTERN + r'\s*(?:to|until|-|~|至|到|—)\s*' + DATE_PATTERN)
+ABSOLUTE_SINCE_PATTERN = re.compile(r'(?:since|after|from|自|从)\s*' + DATE_PATTERN)
+# 英文词（不论大小写，可能是公司、国家、项目等名称）和连续的中文片段
+ENTITY_TOKEN_PATTERN = re.compile(r"\b[A-Za-z][A-Za-z0-9&'.-]*")
+CJK_RUN_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+')
+# 请求中常见的英文词和行业通用词，不视为未识别的实体
+LOCAL_EXTRACTION_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "from", "with", "about", "by", "at", "any", "all",
+    "i", "me", "my", "we", "us", "please", "what", "which", "who", "how", "is", "are", "there",
+    "find", "show", "search", "get", "give", "list", "look", "looking", "want", "need", "tell", "summarize",
+    "news", "latest", "recent", "new", "update", "updates", "report", "reports", "article", "articles",
+    "related", "regarding", "concerning", "information", "info", "developments",
+    "today", "yesterday", "this", "last", "past", "week", "month", "year", "since", "until",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "q1", "q2", "q3", "q4", "days", "weeks", "months", "hours",
+    "price", "prices", "market", "markets", "supply", "chain", "demand", "export", "exports", "import", "imports",
+    "ban", "production", "output", "mine", "mines", "project", "projects", "plant", "financing", "investment",
+    "deal", "deals", "policy", "trade", "sector", "stocks", "shares", "companies"
+}
+# 中文请求中的虚词和行业通用词，去掉后仍剩余的中文片段视为未识别的实体
+ZH_LOCAL_EXTRACTION_STOPWORDS = [
+    "请", "帮我", "查找", "搜索", "查询", "看看", "一下", "关于", "有关", "相关", "最新", "新闻", "消息", "资讯", "报道",
+    "动态", "进展", "情况", "分析", "总结", "项目", "矿产", "矿业", "矿", "行业", "产业", "市场", "价格", "供应链",
+    "供应", "需求", "投资", "合作", "政策", "出口", "进口", "生产", "产量", "开采", "公司", "企业",
+    "的", "了", "在", "和", "与", "及", "以及", "对", "等", "中", "上"
+]
+# 出现这些词但没有解析出时间，说明可能存在规则无法识别的时间描述
+TIME_HINT_PATTERN = re.compile(
+    r'\b(?:last|past|recent|since|ago|before|after|between|during|january|february|march|april|may|june|'
+    r'july|august|september|october|november|december|q[1-4]|\d{4})\b|最近|过去|以来|之前|之后|期间|[0-9一二三四五六七八九十]+月',
+    re.IGNORECASE
+)
+
+def parse_number_word(value):
+    """解析数字或数字词（英文/中文），无法解析时返回1"""
+    if not value:
+        return 1
+    if value.isdigit():
+        return int(value)
+    return NUMBER_WORDS.get(value.lower(), 1)
+
+def parse_time_expression(prompt):
+    """用规则解析Prompt中的时间描述，返回 (time_description, time_type, time_value)，未找到返回None"""
+    match = ABSOLUTE_RANGE_PATTERN.search(prompt)
+    if match:
+        y1, m1, d1, y2, m2, d2 = (int(v) for v in match.groups())
+        try:
+            start, end = datetime(y1, m1, d1), datetime(y2, m2, d2)
+            return match.group(0), "absolute", f"{start.strftime('%Y-%m-%d')}..{end.strftime('%Y-%m-%d')}"
+        except ValueError:
+            pass
+    match = ABSOLUTE_SINCE_PATTERN.search(prompt)
+    if match:
+        y, m, d = (int(v) for v in match.groups())
+        try:
+            return match.group(0), "absolute", f"{datetime(y, m, d).strftime('%Y-%m-%d')}.."
+        except ValueError:
+            pass
+    
+    # 相对时间取最先出现的描述
+    candidates = []
+    for match in EN_RELATIVE_TIME_PATTERN.finditer(prompt):
+        candidates.append((match.start(), match.group(0), f"{parse_number_word(match.group(1))} {TIME_UNITS[match.group(2).lower()]}"))
+    for match in ZH_RELATIVE_TIME_PATTERN.finditer(prompt):
+        amount = match.group(1)
+        number = int(amount) if amount and amount.isdigit() else sum(NUMBER_WORDS.get(c, 0) for c in amount) if amount else 1
+        candidates.append((match.start(), match.group(0), f"{number or 1} {TIME_UNITS[match.group(2)]}"))
+    for pattern, value in EN_FIXED_TIME_PATTERNS + ZH_FIXED_TIME_PATTERNS:
+        match = pattern.search(prompt)
+        if match:
+            candidates.append((match.start(), match.group(0), value))
+    if candidates:
+        _, description, value = min(candidates)
+        return description, "relative", value
+    return None
+
+def match_predefined_terms(prompt):
+    """匹配Prompt中出现的预定义关键词和公司（中英文、别名），按出现顺序返回标准名称"""
+    matches = []
+    
+    # 英文：在规范化文本中按词边界匹配，优先匹配较长的术语并避免重叠
+    normalized_prompt = f" {normalize_term(prompt)} "
+    covered = [False] * len(normalized_prompt)
+    for key in sorted(TERM_TRANSLATION_INDEX, key=len, reverse=True):
+        start = normalized_prompt.find(f" {key} ")
+        while start != -1:
+            span = range(start + 1, start + 1 + len(key))
+            if not any(covered[i] for i in span):
+                for i in span:
+                    covered[i] = True
+                matches.append((start, TERM_TRANSLATION_INDEX[key][0]))
+                break
+            start = normalized_prompt.find(f" {key} ", start + 1)
+    
+    # 中文：直接匹配中文关键词和公司简称
+    for zh_keyword in KEYWORDS_MAPPING["zh"]:
+        position = prompt.find(zh_keyword)
+        if position != -1:
+            matches.append((position, zh_keyword))
+    for zh_name in COMPANIES_MAPPING["zh"].values():
+        short_name = get_company_short_name(zh_name)
+        position = prompt.find(short_name)
+        if position != -1:
+            matches.append((position, short_name))
+    
+    terms = []
+    for _, term in sorted(matches):
+        if term not in terms:
+            terms.append(term)
+    # 通用词只在没有更具体的术语时保留
+    specific_terms = [term for term in terms if term not in GENERIC_TERMS]
+    return specific_terms or terms
+
+def build_known_chinese_terms():
+    """本地规则可识别的中文术语（关键词、公司全称和简称、通用词），按长度从长到短排列"""
+    terms = set(KEYWORDS_MAPPING["zh"]) | set(GENERIC_TERMS.values())
+    for zh_name in COMPANIES_MAPPING["zh"].values():
+        terms.add(get_company_short_name(zh_name))
+        terms.add(re.sub(r'\s*\([^)]*\)', '', zh_name).strip())
+    return sorted(terms, key=len, reverse=True)
+
+KNOWN_CHINESE_TERMS = build_known_chinese_terms()
+
+def find_unrecognized_entities(prompt):
+    """找出Prompt中去掉时间描述、预定义术语和常用词后剩余的英文词和中文片段（如公司名、国家名）
+
+    先返回英文词，再返回中文片段，各自按出现顺序；单个汉字的残留不计。
+    """
+    for pattern in [ABSOLUTE_RANGE_PATTERN, ABSOLUTE_SINCE_PATTERN, EN_RELATIVE_TIME_PATTERN, ZH_RELATIVE_TIME_PATTERN] + [
+        pattern for pattern, _ in EN_FIXED_TIME_PATTERNS + ZH_FIXED_TIME_PATTERNS
+    ]:
+        prompt = pattern.sub(" ", prompt)
+    
+    normalized_prompt = f" {normalize_term(prompt)} "
+    known_words = set()
+    for key in TERM_TRANSLATION_INDEX:
+        if f" {key} " in normalized_prompt or f" {key}s " in normalized_prompt:
+            known_words.update(key.split())
+    
+    entities = []
+    for token in ENTITY_TOKEN_PATTERN.findall(prompt):
+        words = normalize_term(token).split()
+        if all(len(word) < 2 or word in known_words or word.rstrip("s") in known_words
+               or word in LOCAL_EXTRACTION_STOPWORDS or word in COMPANY_SUFFIX_WORDS for word in words):
+            continue
+        entities.append(token)
+    
+    chinese_residue = prompt
+    for term in KNOWN_CHINESE_TERMS + ZH_LOCAL_EXTRACTION_STOPWORDS:
+        chinese_residue = chinese_residue.replace(term, " ")
+    entities.extend(run for run in CJK_RUN_PATTERN.findall(chinese_residue) if len(run) >= 2)
+    return entities
+
+def extract_keywords_and_time_locally(prompt, language=DEFAULT_LANGUAGE):
+    """用规则从Prompt中提取关键词和时间信息，返回 (与模型提取相同结构的结果, 置信度0-1)
+
+    Prompt中还有未识别的专有名词时降低置信度，交给模型提取，避免这些实体被忽略。
+    """
+    keywords = match_predefined_terms(prompt)
+    time_info = parse_time_expression(prompt)
+    
+    confidence = 0.0
+    if keywords:
+        confidence += 0.3 if find_unrecognized_entities(prompt) else 0.6
+    if time_info or not TIME_HINT_PATTERN.search(prompt):
+        confidence += 0.4
+    
+    if time_info:
+        time_description, time_type, time_value = time_info
+    else:
+        time_description = "无时间限制" if language == "zh" else "no time limit"
+        time_type, time_value = "none", ""
+    
+    if language == "zh":
+        explanation = f"本地规则解析：匹配到关键词 {', '.join(keywords) or '无'}；时间：{time_description}"
+    else:
+        explanation = f"Local rule-based parsing: matched keywords {', '.join(keywords) or 'none'}; time: {time_description}"
+    
+    return {
+        "keywords": keywords,
+        "time_description": time_description,
+        "time_type": time_type,
+        "time_value": time_value,
+        "explanation": explanation
+    }, confidence
+
+@traced("extract_search_parameters")
+def extract_search_parameters(prompt, model="gpt-4o", language=DEFAULT_LANGUAGE):
+    """提取搜索参数：优先使用本地规则，置信度不足时调用一次模型（同时完成提取和翻译）
+
+    返回 (提取结果, 使用的路径 "local"/"llm", 耗时秒数)，提取结果中的 search_terms 为中文搜索词。
+    模型结果不合规时抛出 ValueError，由调用方决定回退方式。
+    """
+    start_time = time.perf_counter()
+    result, confidence = extract_keywords_and_time_locally(prompt, language)
+    if confidence >= LOCAL_EXTRACTION_MIN_CONFIDENCE:
+        # 本地匹配到的都是预定义术语，查表即可翻译，不会调用模型
+        result["search_terms"] = translate_keywords_to_chinese(result["keywords"], model)
+        set_span_attributes(path="local")
+        return result, "local", time.perf_counter() - start_time
+    set_span_attributes(path="llm")
+    result = extract_search_plan_with_llm(prompt, model, language)
+    return result, "llm", time.perf_counter() - start_time
+
+def format_openai_error(e):
+    """将OpenAI调用异常转换为用户可读的错误信息"""
+    error_msg = str(e)
+    if "401" in error_msg or "unauthorized" in error_msg.lower():
+        return "❌ API调用失败: 您的OpenAI API密钥已过期或无效，请检查API密钥设置。"
+    elif "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
+        return "❌ API调用失败: 已达到OpenAI API调用配额限制，请稍后再试。"
+    else:
+        return f"❌ API调用失败: {error_msg}"
+
+# 模型响应缓存配置（按模型、温度和Prompt内容寻址，跨会话共享）
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.db")
+LLM_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_BYTES = 20 * 1024 * 1024
+
+LLM_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(last_accessed);
+"""
+
+def make_llm_cache_key(*parts):
+    """根据模型、温度、Prompt等内容生成缓存键"""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def get_cached_llm_response(cache_key):
+    """读取缓存的模型响应，未命中或已过期返回None"""
+    try:
+        conn = get_db_connection(LLM_CACHE_PATH, LLM_CACHE_SCHEMA)
+        now = time.time()
+        with _db_lock:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE cache_key = ? AND created_at > ?",
+                (cache_key, now - LLM_CACHE_MAX_AGE_SECONDS)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE cache_key = ?", (now, cache_key))
+            conn.commit()
+        return row[0]
+    except sqlite3.Error as e:
+        print(f"LLM cache read failed: {str(e)}")
+        return None
+
+def save_cached_llm_response(cache_key, response):
+    """写入模型响应缓存，并按大小上限进行LRU淘汰"""
+    try:
+        conn = get_db_connection(LLM_CACHE_PATH, LLM_CACHE_SCHEMA)
+        now = time.time()
+        with _db_lock:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - LLM_CACHE_MAX_AGE_SECONDS,))
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, response, created_at, last_accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (cache_key, response, now, now, len(response.encode("utf-8")))
+            )
+            evict_lru_entries(conn, "llm_cache", "cache_key", LLM_CACHE_MAX_BYTES)
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"LLM cache write failed: {str(e)}")
+
+@traced("llm.call", purpose="analysis", stream=False)
+def call_openai_api(prompt, model=ANALYSIS_MODEL, use_cache=True):
+    """调用OpenAI API (用于语言转换和内容分析)"""
+    cache_key = make_llm_cache_key(model, ANALYSIS_TEMPERATURE, ANALYSIS_MAX_TOKENS, prompt)
+    set_span_attributes(model=model, cached=False)
+    if use_cache:
+        cached_response = get_cached_llm_response(cache_key)
+        if cached_response is not None:
+            set_span_attributes(cached=True)
+            return cached_response
+    
+    try:
+        completion = create_chat_completion(
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=ANALYSIS_TEMPERATURE,
+            max_tokens=ANALYSIS_MAX_TOKENS,
+            stream=False
+        )
+        
+        response_text = completion.choices[0].message.content
+        if use_cache and response_text:
+            save_cached_llm_response(cache_key, response_text)
+        return response_text
+        
+    except Exception as e:
+        set_span_attributes(error=str(e))
+        return format_openai_error(e)
+
+def call_openai_api_stream(prompt, model=ANALYSIS_MODEL, use_cache=True):
+    """以流式方式调用OpenAI API，逐段返回生成的文本"""
+    # 生成器在调用方的上下文中逐段执行，因此不切换当前步骤，只在创建请求时临时切换
+    span = start_span("llm.call", purpose="analysis", stream=True, model=model, cached=False)
+    cache_key = make_llm_cache_key(model, ANALYSIS_TEMPERATURE, ANALYSIS_MAX_TOKENS, prompt)
+    if use_cache:
+        cached_response = get_cached_llm_response(cache_key)
+        if cached_response is not None:
+            if span is not None:
+                span["attributes"]["cached"] = True
+            end_span(span)
+            yield cached_response
+            return
+    
+    request_start = time.perf_counter()
+    error = None
+    try:
+        with use_span(span):
+            stream = create_chat_completion(
+                model=model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=ANALYSIS_TEMPERATURE,
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        
+        response_parts = []
+        usage = None
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not response_parts and span is not None:
+                    span["attributes"]["ttft_ms"] = round((time.perf_counter() - request_start) * 1000, 2)
+                response_parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        
+        if span is not None:
+            # 服务端未返回用量时按本地分词估算
+            span["attributes"]["prompt_tokens"] = usage.prompt_tokens if usage else count_tokens(prompt)
+            span["attributes"]["completion_tokens"] = usage.completion_tokens if usage else count_tokens("".join(response_parts))
+        
+        if use_cache and response_parts:
+            save_cached_llm_response(cache_key, "".join(response_parts))
+        
+    except Exception as e:
+        error = e
+        yield format_openai_error(e)
+    finally:
+        end_span(span, error)
+
+
+# 搜索历史存储配置（SQLite持久化，结果压缩存储，FTS5全文索引）
+HISTORY_PATH = os.path.join(CACHE_DIR, "search_history.db")
+HISTORY_PAGE_SIZE = 20              # 历史记录每页条数
+HISTORY_COMPRESSION_LEVEL = 6       # zlib压缩级别
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    title TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    companies TEXT NOT NULL,
+    time_option TEXT,
+    language TEXT NOT NULL,
+    result BLOB NOT NULL,
+    prompt BLOB NOT NULL,
+    trace BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_history_created ON search_history(created_at);
+CREATE INDEX IF NOT EXISTS idx_history_language ON search_history(language, created_at);
+CREATE TABLE IF NOT EXISTS search_history_terms (
+    history_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_terms ON search_history_terms(kind, term, history_id);
+"""
+
+# 无内容FTS5表：只保存索引，正文以压缩形式保存在 search_history 中
+HISTORY_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_history_fts USING fts5(title, terms, content, content='');
+"""
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+CJK_CHAR_PATTERN = re.compile(r'([\u3400-\u9fff\uf900-\ufaff])')
+
+_history_fts_available = None
+
+def _get_history_db():
+    """获取历史记录数据库连接，首次调用时检测FTS5是否可用"""
+    global _history_fts_available
+    conn = get_db_connection(HISTORY_PATH, HISTORY_SCHEMA)
+    if _history_fts_available is None:
+        with _db_lock:
+            # 早期版本创建的表没有 trace 列
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(search_history)").fetchall()]
+            if "trace" not in columns:
+                conn.execute("ALTER TABLE search_history ADD COLUMN trace BLOB")
+                conn.commit()
+            try:
+                conn.executescript(HISTORY_FTS_SCHEMA)
+                conn.commit()
+                _history_fts_available = True
+            except sqlite3.OperationalError:
+                # SQLite未编译FTS5时退化为标题和关键词的LIKE匹配
+                _history_fts_available = False
+    return conn
+
+def segment_for_search(text):
+    """在中文字符之间插入空格，使FTS5按单字建立索引（支持任意长度的中文词查询）"""
+    return CJK_CHAR_PATTERN.sub(r' \1 ', text)
+
+def build_history_fts_query(query):
+    """将用户输入转换为FTS5查询：每个词作为短语匹配，多个词同时满足"""
+    phrases = []
+    for word in query.split():
+        tokens = segment_for_search(word.replace('"', ' ')).split()
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " ".join(phrases)
+
+def save_history_entry(keywords, companies, time_option, result, prompt, language, title=None, trace=None):
+    """保存一条搜索历史（结果、Prompt和执行追踪压缩存储），返回记录ID"""
+    keywords = list(keywords or [])
+    companies = list(companies or [])
+    created_at = time.time()
+    if title is None:
+        title = " - ".join([
+            datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M'),
+            ", ".join(keywords) or ("无关键词" if language == "zh" else "No Keywords"),
+            ", ".join(companies) or ("无公司" if language == "zh" else "No Companies")
+        ])
+    
+    conn = _get_history_db()
+    with _db_lock:
+        cursor = conn.execute(
+            "INSERT INTO search_history (created_at, title, keywords, companies, time_option, language, result, prompt, trace) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                created_at, title,
+                json.dumps(keywords, ensure_ascii=False), json.dumps(companies, ensure_ascii=False),
+                time_option, language,
+                zlib.compress((result or "").encode("utf-8"), HISTORY_COMPRESSION_LEVEL),
+                zlib.compress((prompt or "").encode("utf-8"), HISTORY_COMPRESSION_LEVEL),
+                zlib.compress(trace_to_json(trace).encode("utf-8"), HISTORY_COMPRESSION_LEVEL) if trace else None
+            )
+        )
+        history_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO search_history_terms (history_id, kind, term) VALUES (?, ?, ?)",
+            [(history_id, "keyword", term) for term in keywords] + [(history_id, "company", term) for term in companies]
+        )
+        if _history_fts_available:
+            conn.execute(
+                "INSERT INTO search_history_fts (rowid, title, terms, content) VALUES (?, ?, ?, ?)",
+                (
+                    history_id, segment_for_search(title), segment_for_search(" ".join(keywords + companies)),
+                    segment_for_search(HTML_TAG_PATTERN.sub(" ", result or ""))
+                )
+            )
+        conn.commit()
+    return history_id
+
+def _build_history_filter(query=None, language=None, keyword=None, company=None):
+    """构建历史记录查询的 WHERE 子句和参数"""
+    conditions, params = [], []
+    if language:
+        conditions.append("h.language = ?")
+        params.append(language)
+    for kind, term in (("keyword", keyword), ("company", company)):
+        if term:
+            conditions.append(
+                "h.id IN (SELECT history_id FROM search_history_terms WHERE kind = ? AND term = ?)"
+            )
+            params.extend([kind, term])
+    if query and query.strip():
+        fts_query = build_history_fts_query(query) if _history_fts_available else ""
+        if fts_query:
+            conditions.append("h.id IN (SELECT rowid FROM search_history_fts WHERE search_history_fts MATCH ?)")
+            params.append(fts_query)
+        else:
+            conditions.append("(h.title LIKE ? OR h.keywords LIKE ? OR h.companies LIKE ?)")
+            params.extend([f"%{query.strip()}%"] * 3)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+def count_history_entries(query=None, language=None, keyword=None, company=None):
+    """统计符合条件的历史记录数"""
+    try:
+        conn = _get_history_db()
+        where, params = _build_history_filter(query, language, keyword, company)
+        with _db_lock:
+            return conn.execute(f"SELECT COUNT(*) FROM search_history h{where}", params).fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"History read failed: {str(e)}")
+        return 0
+
+def list_history_entries(offset=0, limit=HISTORY_PAGE_SIZE, query=None, language=None, keyword=None, company=None):
+    """按时间倒序分页列出历史记录摘要（不加载结果正文）"""
+    try:
+        conn = _get_history_db()
+        where, params = _build_history_filter(query, language, keyword, company)
+        with _db_lock:
+            rows = conn.execute(
+                "SELECT h.id, h.created_at, h.title, h.keywords, h.companies, h.time_option, h.language "
+                f"FROM search_history h{where} ORDER BY h.created_at DESC, h.id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+    except sqlite3.Error as e:
+        print(f"History read failed: {str(e)}")
+        return []
+    return [
+        {
+            'id': row[0],
+            'date': datetime.fromtimestamp(row[1]).strftime('%Y-%m-%d %H:%M'),
+            'title': row[2],
+            'keywords': json.loads(row[3]),
+            'companies': json.loads(row[4]),
+            'time_option': row[5],
+            'language': row[6]
+        }
+        for row in rows
+    ]
+
+def get_history_entry(history_id):
+    """读取单条历史记录（解压结果、Prompt和执行追踪），不存在返回None"""
+    try:
+        conn = _get_history_db()
+        with _db_lock:
+            row = conn.execute(
+                "SELECT id, created_at, title, keywords, companies, time_option, language, result, prompt, trace "
+                "FROM search_history WHERE id = ?",
+                (history_id,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"History read failed: {str(e)}")
+        return None
+    if row is None:
+        return None
+    return {
+        'id': row[0],
+        'date': datetime.fromtimestamp(row[1]).strftime('%Y-%m-%d %H:%M'),
+        'title': row[2],
+        'keywords': json.loads(row[3]),
+        'companies': json.loads(row[4]),
+        'time_option': row[5],
+        'language': row[6],
+        'result': zlib.decompress(row[7]).decode("utf-8"),
+        'prompt': zlib.decompress(row[8]).decode("utf-8"),
+        'trace': json.loads(zlib.decompress(row[9]).decode("utf-8")) if row[9] else None
+    }
+
+def run_news_pipeline(keywords, companies, start_date, end_date, language=DEFAULT_LANGUAGE,
+                      serpapi_api_key=None, openai_api_key=None):
+    """无界面执行完整流程（搜索 → 抓取 → 分析），返回分析结果文本，供批处理任务调用"""
+    configure_api_keys(serpapi_api_key, openai_api_key)
+    news_results = search_baidu_news(keywords, companies, "custom", start_date, end_date, paginate=True, language=language)
+    if not news_results:
+        return "未找到相关新闻" if language == "zh" else "No relevant news found"
+    return analyze_news_with_openai(news_results, keywords, companies, start_date, end_date, language=language)
+
+if __name__ == "__main__":
+    # 作为独立的预取worker运行：python pipeline.py（API密钥从环境变量读取）
+    run_prefetch_loop()
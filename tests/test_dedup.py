@@ -0,0 +1,75 @@
+"""近似重复新闻合并（MinHash）的测试"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import pipeline  # noqa: E402
+import stubs  # noqa: E402
+
+RECORDED = stubs.load_recorded_search()["organic_results"]
+
+def test_shingles_ignore_case_and_punctuation():
+    assert pipeline.compute_minhash("Lithium, prices RISE!") == pipeline.compute_minhash("lithium prices rise")
+    assert pipeline.compute_minhash("锂") is None
+    assert pipeline.compute_minhash("") is None
+
+def test_syndicated_copies_with_small_edits_collapse():
+    original = {
+        "title": "刚果（金）延长钴出口禁令 国内钴价应声上涨", "source": "新浪财经", "link": "https://a.example.com/1",
+        "snippet": "刚果（金）宣布将钴出口禁令延长三个月，国内电解钴价格随即上涨，市场担忧原料供应持续偏紧。"
+    }
+    copy = {
+        "title": "刚果(金)延长钴出口禁令，国内钴价应声上涨——第一财经", "source": "第一财经", "link": "https://b.example.com/2",
+        "snippet": "刚果（金）宣布将钴出口禁令再延长三个月，国内电解钴价格随即上涨，市场担心原料供应持续偏紧。"
+    }
+    signature_similarity = pipeline.estimate_similarity(
+        pipeline.compute_minhash(pipeline.snippet_signature_text(original)),
+        pipeline.compute_minhash(pipeline.snippet_signature_text(copy))
+    )
+    assert signature_similarity >= pipeline.DEDUP_SNIPPET_MIN_SIMILARITY
+    
+    collapsed = pipeline.collapse_near_duplicates([original, copy])
+    assert len(collapsed) == 1
+    # 保留排在最前的一条作为代表，转载来源记入 also_reported_by，传入的新闻不被修改
+    assert collapsed[0]["link"] == original["link"]
+    assert collapsed[0]["also_reported_by"] == [{"source": "第一财经", "link": "https://b.example.com/2"}]
+    assert "also_reported_by" not in original
+
+def test_alternates_of_merged_duplicates_are_carried_over():
+    first = {"title": "锂价企稳反弹 碳酸锂期货周涨逾6%", "source": "第一财经", "link": "https://a.example.com/1"}
+    second = dict(first, source="财联社", link="https://b.example.com/2",
+                  also_reported_by=[{"source": "证券时报网", "link": "https://c.example.com/3"}])
+    collapsed = pipeline.collapse_near_duplicates([first, second])
+    assert [alternate["source"] for alternate in collapsed[0]["also_reported_by"]] == ["财联社", "证券时报网"]
+
+def test_recorded_syndication_pairs_collapse():
+    collapsed = pipeline.collapse_near_duplicates(RECORDED)
+    # 录制结果的后12条是前12条的转载
+    assert [item["link"] for item in collapsed] == [item["link"] for item in RECORDED[:12]]
+    assert all(len(item["also_reported_by"]) == 1 for item in collapsed)
+
+def test_distinct_stories_on_same_topic_are_kept():
+    stories = [
+        {"title": "刚果（金）延长钴出口禁令 国内钴价应声上涨", "snippet": "刚果（金）宣布将钴出口禁令延长三个月，国内钴价上涨。"},
+        {"title": "前三季度钴原料进口量同比下降18%", "snippet": "海关数据显示，前三季度我国钴原料进口量同比下降18%。"},
+        {"title": "锂价企稳反弹 碳酸锂期货周涨逾6%", "snippet": "碳酸锂期货本周上涨逾6%，锂价企稳反弹。"},
+        {"title": "天齐锂业发布三季度业绩预告", "snippet": "天齐锂业预计三季度净利润同比下降，锂价低迷拖累业绩。"},
+    ]
+    assert len(pipeline.collapse_near_duplicates(stories)) == len(stories)
+
+def test_full_text_pass_merges_rewritten_snippets_but_skips_failed_scrapes():
+    full_text = "刚果（金）政府周六宣布，将钴出口禁令延长三个月至明年一月，以缓解国际钴价长期低迷。" * 3
+    items = [
+        {"title": "钴出口禁令延长", "snippet": "摘要一", "full_text": full_text, "source": "新浪财经"},
+        {"title": "刚果金再度延长禁令", "snippet": "完全不同的摘要", "full_text": full_text, "source": "财联社"},
+        {"title": "抓取失败的一条", "snippet": "摘要", "full_text": "❌ 抓取超时", "source": "证券时报网"},
+        {"title": "抓取失败的另一条", "snippet": "摘要", "full_text": "❌ 抓取超时", "source": "中国新闻网"},
+    ]
+    collapsed = pipeline.collapse_near_duplicates(
+        items, pipeline.full_text_signature_text, pipeline.DEDUP_TEXT_MIN_SIMILARITY
+    )
+    assert [item["source"] for item in collapsed] == ["新浪财经", "证券时报网", "中国新闻网"]
+    assert collapsed[0]["also_reported_by"][0]["source"] == "财联社"
@@ -0,0 +1,51 @@
+"""搜索历史存储（压缩 + FTS5检索）的测试"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+
+RESULT = "<h3>锂价企稳反弹</h3><p>Albemarle raised its lithium price outlook. 碳酸锂期货周涨逾6%。</p>" * 20
+
+@pytest.fixture
+def history_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "HISTORY_PATH", str(tmp_path / "search_history.db"))
+    monkeypatch.setattr(pipeline, "_history_fts_available", None)
+    yield
+    conn = pipeline._db_connections.pop(pipeline.HISTORY_PATH, None)
+    if conn is not None:
+        conn.close()
+
+def save_entry():
+    with pipeline.start_trace("analysis", language="zh") as trace:
+        with pipeline.trace_span("search", results=24):
+            pass
+    history_id = pipeline.save_history_entry(
+        ["锂价"], ["天齐锂业"], "2_days", RESULT, "prompt 锂", "zh", trace=trace
+    )
+    return history_id, trace
+
+def test_entry_round_trips_decompressed(history_db):
+    history_id, trace = save_entry()
+    entry = pipeline.get_history_entry(history_id)
+    assert entry["result"] == RESULT
+    assert entry["prompt"] == "prompt 锂"
+    assert entry["keywords"] == ["锂价"] and entry["companies"] == ["天齐锂业"]
+    assert entry["trace"]["trace_id"] == trace["trace_id"]
+    assert [span["name"] for span in entry["trace"]["spans"]] == ["search"]
+    assert pipeline.get_history_entry(history_id + 1) is None
+
+def test_entry_found_by_chinese_and_english_terms(history_db):
+    history_id, _ = save_entry()
+    pipeline.save_history_entry(["钴"], [], "2_weeks", "<p>Cobalt exports resumed</p>", "", "en")
+    
+    assert pipeline._history_fts_available
+    for query in ("碳酸锂", "企稳", "天齐", "albemarle", "lithium outlook"):
+        assert [entry["id"] for entry in pipeline.list_history_entries(query=query)] == [history_id], query
+    assert pipeline.count_history_entries(query="锂价 cobalt") == 0
+    # HTML标签不进入索引
+    assert pipeline.count_history_entries(query="h3") == 0
+    assert pipeline.count_history_entries(keyword="钴") == 1
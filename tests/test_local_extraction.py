@@ -0,0 +1,42 @@
+"""本地规则解析（extract_keywords_and_time_locally）的置信度测试"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+
+def test_unrecognized_entities_send_prompt_to_llm():
+    prompt = "CITIC Guoan Bolivia lithium plant project financing"
+    result, confidence = pipeline.extract_keywords_and_time_locally(prompt, "en")
+    assert result["keywords"] == ["Lithium"]
+    assert pipeline.find_unrecognized_entities(prompt) == ["CITIC", "Guoan", "Bolivia"]
+    assert confidence < pipeline.LOCAL_EXTRACTION_MIN_CONFIDENCE
+
+def test_fully_recognized_prompt_stays_local():
+    result, confidence = pipeline.extract_keywords_and_time_locally("Latest Zijin Mining Group cobalt news in the past 2 weeks", "en")
+    assert result["keywords"] == ["Zijin", "Cobalt"]
+    assert result["time_value"] == "2 weeks"
+    assert confidence >= pipeline.LOCAL_EXTRACTION_MIN_CONFIDENCE
+
+def test_unrecognized_chinese_entities_send_prompt_to_llm():
+    for prompt, keywords, entities in [
+        ("比亚迪在巴西的锂矿项目最近两周", ["比亚迪", "锂"], ["巴西"]),
+        ("刚果金钴矿出口禁令最近2天", ["钴"], ["刚果金", "禁令"]),
+    ]:
+        result, confidence = pipeline.extract_keywords_and_time_locally(prompt, "zh")
+        assert result["keywords"] == keywords
+        assert pipeline.find_unrecognized_entities(prompt) == entities
+        assert confidence < pipeline.LOCAL_EXTRACTION_MIN_CONFIDENCE
+
+def test_unrecognized_lower_case_entities_send_prompt_to_llm():
+    prompt = "citic guoan bolivia lithium plant last 2 days"
+    result, confidence = pipeline.extract_keywords_and_time_locally(prompt, "en")
+    assert result["keywords"] == ["Lithium"]
+    assert pipeline.find_unrecognized_entities(prompt) == ["citic", "guoan", "bolivia"]
+    assert confidence < pipeline.LOCAL_EXTRACTION_MIN_CONFIDENCE
+
+def test_chinese_prompt_with_known_terms_stays_local():
+    result, confidence = pipeline.extract_keywords_and_time_locally("最近一周宁德时代和锂矿的最新消息", "zh")
+    assert result["keywords"] == ["宁德时代", "锂"]
+    assert confidence >= pipeline.LOCAL_EXTRACTION_MIN_CONFIDENCE
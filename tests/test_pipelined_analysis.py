@@ -0,0 +1,120 @@
+"""流水线分析（analyze_news_pipelined_async）的离线测试：使用 benchmarks/stubs.py 的本地网页和OpenAI桩服务"""
+import datetime
+import os
+import re
+import sys
+from collections import deque
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import pipeline  # noqa: E402
+import stubs  # noqa: E402
+
+from bench_pipeline import CACHE_PATH_NAMES, SEARCH_KEYWORDS  # noqa: E402
+
+TITLE_PATTERN = re.compile(r'\*\*Title\*\*</span>: (.*)')
+
+@pytest.fixture(scope="module")
+def page_servers():
+    servers = stubs.start_page_servers()
+    yield servers
+    for server in servers.values():
+        server.stop()
+
+@pytest.fixture(scope="module")
+def openai_stub():
+    server = stubs.start_openai_stub(latency=0.05, tokens_per_second=5000.0)
+    yield server
+    server.stop()
+
+@pytest.fixture
+def offline_pipeline(monkeypatch, tmp_path, openai_stub):
+    """将所有缓存指向临时目录，OpenAI客户端指向本地桩服务"""
+    for name in CACHE_PATH_NAMES:
+        monkeypatch.setattr(pipeline, name, str(tmp_path / os.path.basename(getattr(pipeline, name))))
+    monkeypatch.setattr(pipeline, "_extraction_rules", None)
+    monkeypatch.setattr(pipeline, "_openai_client", None)
+    # 每个测试使用独立的限流窗口（仍为默认预算），避免前面测试的用量拖慢后面的测试
+    monkeypatch.setattr(pipeline, "_llm_request_log", deque())
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{openai_stub.base_url}/v1")
+    monkeypatch.setattr(pipeline, "OPENAI_API_KEY", "offline-test")
+    return pipeline
+
+def search_results(page_servers):
+    return stubs.expand_search_results(stubs.load_recorded_search(), 24, page_servers)
+
+def analyze(news_results, pipelined):
+    today = datetime.date.today()
+    return pipeline.analyze_news_with_openai(
+        news_results, SEARCH_KEYWORDS, [], today - datetime.timedelta(days=3), today, pipelined=pipelined
+    )
+
+def count_llm_calls(monkeypatch):
+    calls = []
+    call_openai_api = pipeline.call_openai_api
+    
+    def counting_call(prompt, *args, **kwargs):
+        calls.append(prompt)
+        return call_openai_api(prompt, *args, **kwargs)
+    
+    monkeypatch.setattr(pipeline, "call_openai_api", counting_call)
+    return calls
+
+def test_pipelined_order_matches_staged(offline_pipeline, page_servers, tmp_path, monkeypatch):
+    staged = analyze(search_results(page_servers), pipelined=False)
+    # 分阶段和流水线分别使用冷缓存
+    for name in ("LLM_CACHE_PATH", "ARTICLE_CACHE_PATH"):
+        monkeypatch.setattr(pipeline, name, str(tmp_path / f"pipelined-{os.path.basename(getattr(pipeline, name))}"))
+    pipelined = analyze(search_results(page_servers), pipelined=True)
+    
+    staged_titles = TITLE_PATTERN.findall(staged)
+    assert staged_titles
+    assert TITLE_PATTERN.findall(pipelined) == staged_titles
+
+def test_second_run_uses_article_cache(offline_pipeline, page_servers, monkeypatch):
+    calls = count_llm_calls(monkeypatch)
+    first = analyze(search_results(page_servers), pipelined=True)
+    assert calls
+    # 录制结果中包含转载新闻，转载来源由代码填写，不影响逐条缓存命中
+    assert "同时报道" in first
+    
+    calls.clear()
+    second = analyze(search_results(page_servers), pipelined=True)
+    assert calls == []
+    assert TITLE_PATTERN.findall(second) == TITLE_PATTERN.findall(first)
+
+def test_search_errors_propagate(offline_pipeline, page_servers):
+    def pages():
+        yield search_results(page_servers)[:5]
+        raise RuntimeError("serpapi quota exhausted")
+    
+    with pytest.raises(RuntimeError, match="quota exhausted"):
+        analyze(pages(), pipelined=True)
+
+def test_scrape_deadline_cancels_slow_pages(offline_pipeline, monkeypatch):
+    slow_servers = stubs.start_page_servers(latency=2.0)
+    try:
+        monkeypatch.setattr(pipeline, "SCRAPE_DEADLINE_SECONDS", 0.3)
+        analysis = analyze(search_results(slow_servers)[:4], pipelined=True)
+    finally:
+        for server in slow_servers.values():
+            server.stop()
+    
+    assert len(TITLE_PATTERN.findall(analysis)) == 4
+    assert "抓取超时" in analysis
+
+def test_cached_sections_follow_current_duplicate_set(offline_pipeline, page_servers, monkeypatch):
+    calls = count_llm_calls(monkeypatch)
+    with_duplicates = analyze(search_results(page_servers), pipelined=True)
+    assert "同时报道" in with_duplicates
+    
+    # 录制结果的后12条是前12条的转载；只保留原稿时命中同一缓存，但不再列出转载来源
+    calls.clear()
+    originals_only = analyze(search_results(page_servers)[:12], pipelined=True)
+    assert calls == []
+    assert "同时报道" not in originals_only
+    assert TITLE_PATTERN.findall(originals_only) == TITLE_PATTERN.findall(with_duplicates)
@@ -0,0 +1,36 @@
+"""关注列表预取调度的测试（不发起真实查询）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+
+def test_one_sweep_fits_inside_max_age():
+    term_count = len(pipeline.get_watchlist_terms())
+    for time_option, interval in pipeline.PREFETCH_INTERVAL_SECONDS.items():
+        cycle_size = pipeline.get_prefetch_cycle_size(term_count, time_option)
+        cycles_per_sweep = -(-term_count // cycle_size)
+        assert cycles_per_sweep * interval <= (
+            pipeline.PREFETCH_MAX_AGE_SECONDS[time_option] - pipeline.PREFETCH_SWEEP_MARGIN_SECONDS
+        )
+
+def test_daily_budget_covers_schedule():
+    term_count = len(pipeline.get_watchlist_terms())
+    needed = sum(
+        pipeline.get_prefetch_cycle_size(term_count, time_option) * (24 * 3600 // interval)
+        for time_option, interval in pipeline.PREFETCH_INTERVAL_SECONDS.items()
+    )
+    assert pipeline.get_prefetch_daily_budget(term_count) >= needed
+
+def test_cycle_without_budget_is_not_marked_complete(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "PREFETCH_PATH", str(tmp_path / "prefetch.db"))
+    monkeypatch.setattr(pipeline, "PREFETCH_DAILY_QUERY_BUDGET", 0)
+    monkeypatch.setattr(pipeline, "run_baidu_news_query", fail_on_query)
+    
+    stats = pipeline.run_prefetch_cycle("2_days")
+    assert stats["queried"] == 0
+    assert pipeline.get_last_prefetch_time("2_days") == 0.0
+
+def fail_on_query(*args, **kwargs):
+    raise AssertionError("no query should be issued without budget")
@@ -0,0 +1,53 @@
+"""百度新闻发布时间批量解析（normalize_publish_times）的测试"""
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+
+REFERENCE_TIME = datetime.datetime(2025, 10, 16, 1, 30)
+
+CASES = [
+    ("3小时前", datetime.date(2025, 10, 15)),  # 跨过午夜
+    ("20分钟前", datetime.date(2025, 10, 16)),
+    ("45秒前", datetime.date(2025, 10, 16)),
+    ("3天前", datetime.date(2025, 10, 13)),
+    ("今天 08:15", datetime.date(2025, 10, 16)),
+    ("昨天 12:30", datetime.date(2025, 10, 15)),
+    ("前天 09:00", datetime.date(2025, 10, 14)),
+    ("9月27日", datetime.date(2025, 9, 27)),
+    ("10月16日", datetime.date(2025, 10, 16)),
+    ("12月31日", datetime.date(2024, 12, 31)),  # 未来日期视为去年
+    ("2025-10-03 18:51", datetime.date(2025, 10, 3)),
+    ("2024/2/29", datetime.date(2024, 2, 29)),
+    ("2025年1月5日", datetime.date(2025, 1, 5)),
+    ("2025-02-30", None),
+    ("2月30日", None),
+    ("", None),
+    ("刚刚发布", None),
+    (None, None),
+]
+
+@pytest.mark.parametrize("publish_time, expected", CASES)
+def test_parse_single_publish_time(publish_time, expected):
+    assert pipeline.normalize_publish_times([publish_time], REFERENCE_TIME) == [expected]
+
+def test_list_input_returns_list_in_order():
+    publish_times = [publish_time for publish_time, _ in CASES]
+    assert pipeline.normalize_publish_times(publish_times, REFERENCE_TIME) == [expected for _, expected in CASES]
+
+def test_series_input_keeps_index():
+    import pandas as pd
+    
+    publish_times = pd.Series(
+        [publish_time for publish_time, _ in CASES] + [float("nan")],
+        index=[f"row{i}" for i in range(len(CASES) + 1)]
+    )
+    dates = pipeline.normalize_publish_times(publish_times, REFERENCE_TIME)
+    assert isinstance(dates, pd.Series)
+    assert list(dates.index) == list(publish_times.index)
+    assert list(dates) == [expected for _, expected in CASES] + [None]
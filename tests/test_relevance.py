@@ -0,0 +1,63 @@
+"""相关性评分（Aho-Corasick自动机）与原子串查找评分的一致性测试"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import pipeline  # noqa: E402
+import stubs  # noqa: E402
+
+def substring_relevance_score(news, keywords, companies, language):
+    """改用自动机之前的评分实现：逐个术语做子串查找"""
+    score = 0.0
+    content = f"{news.get('title', '')} {news.get('snippet', '')}".lower()
+    if keywords:
+        keyword_matches = sum(1 for keyword in keywords if keyword.lower() in content)
+        score += (keyword_matches / len(keywords)) * 0.6
+    if companies:
+        company_matches = 0
+        current_companies_mapping = pipeline.COMPANIES_MAPPING[language]
+        for company in companies:
+            company_name = current_companies_mapping.get(company, company).lower()
+            if company_name in content:
+                company_matches += 1
+        score += (company_matches / len(companies)) * 0.4
+    return min(max(score, 0.1), 1.0)
+
+NEWS_ITEMS = stubs.load_recorded_search()["organic_results"] + [
+    # 嵌套术语："锂" 出现在 "锂矿"、"天齐锂业" 中
+    {"title": "天齐锂业股份有限公司 (天齐锂业) 锂矿扩产", "snippet": "锂精矿价格上涨"},
+    # 重叠术语："Rare Earth" 是 "Rare Earth US, China Rare Earth" 的一部分；大小写混合
+    {"title": "RARE EARTH US, China Rare Earth export curbs", "snippet": "LITHIUM and cobalt prices"},
+    {"title": "Tianqi Lithium Corporation results", "snippet": "Ganfeng Lithium Co., Ltd. and CATL"},
+    {"title": "", "snippet": ""},
+]
+
+SEARCHES = [
+    ("zh", ["锂", "钴", "稀土"], []),
+    ("zh", ["锂矿", "关键矿产"], ["Tianqi Lithium", "Zijin"]),
+    ("zh", [], ["Tianqi Lithium", "天齐锂业"]),
+    ("en", ["Lithium", "Rare Earth", "Rare Earth US, China Rare Earth"], ["Tianqi Lithium", "CATL"]),
+    ("en", ["lithium", "COBALT", "export curbs"], ["Ganfeng Lithium"]),
+]
+
+@pytest.mark.parametrize("language,keywords,companies", SEARCHES)
+def test_scores_match_substring_scorer(language, keywords, companies):
+    for news in NEWS_ITEMS:
+        expected = substring_relevance_score(news, keywords, companies, language)
+        assert pipeline.calculate_relevance_score(news, keywords, companies, language) == pytest.approx(expected)
+
+def find_all(text, term):
+    return [i for i in range(len(text)) if text.startswith(term, i)]
+
+def test_nested_and_overlapping_matches_are_all_reported():
+    text = "天齐锂业股份有限公司 (天齐锂业) 锂矿 rare earth us, china rare earth"
+    matches = pipeline.match_terms_in_text(text)
+    for term in ["锂", "天齐锂业股份有限公司 (天齐锂业)", "rare earth", "rare earth us, china rare earth"]:
+        assert matches[term] == find_all(text, term)
+    assert len(matches["锂"]) == 3
+    assert len(matches["rare earth"]) == 2
@@ -0,0 +1,43 @@
+"""百度新闻搜索（search_baidu_news）的离线测试：SerpApi由 benchmarks/stubs.py 的本地桩服务代替"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import pipeline  # noqa: E402
+import stubs  # noqa: E402
+
+@pytest.fixture
+def serpapi_stub(monkeypatch, tmp_path):
+    recorded = stubs.load_recorded_search()["organic_results"]
+    results = []
+    for i in range(60):
+        item = dict(recorded[i % len(recorded)])
+        item["title"] = f"{item['title']} {i}"
+        item["link"] = f"https://news.example.com/{i}.html"
+        results.append(item)
+    server = stubs.start_serpapi_stub(results)
+    
+    from serpapi.serp_api_client import SerpApiClient
+    monkeypatch.setattr(SerpApiClient, "BACKEND", server.base_url)
+    monkeypatch.setattr(pipeline, "SEARCH_CACHE_PATH", str(tmp_path / "search_cache.db"))
+    monkeypatch.setattr(pipeline, "PREFETCH_PATH", str(tmp_path / "prefetch.db"))
+    monkeypatch.setattr(pipeline, "SERPAPI_MIN_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(pipeline, "SERPAPI_API_KEY", "offline-test")
+    yield results
+    server.stop()
+
+def test_fan_out_pages_each_sub_query(serpapi_stub):
+    keywords = ["锂", "钴", "镍", "石墨", "锰", "铜", "铝"]
+    news = pipeline.search_baidu_news(keywords, [], "2_days", fan_out=True)
+    
+    groups = -(-len(keywords) // pipeline.SEARCH_FANOUT_GROUP_SIZE)
+    # 每个子查询翻页获取，不再限于首页的8条；桩服务对所有子查询返回相同结果，合并后按链接去重
+    assert len(news) == len(serpapi_stub)
+    assert len(news) > 8 * groups
+    assert len({item["link"] for item in news}) == len(news)
+    assert all(item["query_hits"] == groups for item in news)
@@ -0,0 +1,29 @@
+"""执行追踪（start_trace / traced）的测试"""
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline  # noqa: E402
+
+REFERENCE_TIME = datetime.datetime(2025, 10, 16, 12, 0)
+
+def test_filter_by_date_records_its_own_span():
+    news_items = [{"title": "a", "date": "3小时前"}, {"title": "b", "date": "2025-01-01"}]
+    with pipeline.start_trace("test") as trace:
+        with pipeline.trace_span("outer"):
+            kept = pipeline.filter_news_by_date(
+                news_items, datetime.date(2025, 10, 14), datetime.date(2025, 10, 16), REFERENCE_TIME
+            )
+    
+    assert [item["title"] for item in kept] == ["a"]
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert spans["filter_by_date"]["attributes"] == {"items": 2, "kept": 1}
+    assert spans["filter_by_date"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["outer"]["attributes"] == {}
+
+def test_article_cache_key_is_not_traced():
+    with pipeline.start_trace("test") as trace:
+        pipeline.make_article_cache_key("skeleton", {"title": "a", "also_reported_by": ["b"]})
+    assert trace["spans"] == []